@@ -1,26 +1,113 @@
-from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text import label
 import adafruit_il0373
+import alarm
+import binascii
 import busio
 import displayio
+from glyph_font import GlyphFont
 from pins import EPD_CS, EPD_DC, SCK, MOSI
+from sleep_memory import DISPLAY_OFFSET
+import struct
 
 DISPLAY_WIDTH = 296
 DISPLAY_HEIGHT = 128
 BACKGROUND_COLOR = 0xFFFFFF
 FOREGROUND_COLOR = 0x000000
-FONT = bitmap_font.load_font("/font/UpheavalTT-BRK--28.bdf")
-SMALL_FONT = bitmap_font.load_font("/font/UpheavalTT-BRK--16.bdf")
+# Built from the BDF fonts by support/glyph_atlas.py, see the Makefile. They
+# only hold the characters in glyph_atlas.GLYPHS.
+FONT = GlyphFont("/font/UpheavalTT-BRK--28.glyphs")
+SMALL_FONT = GlyphFont("/font/UpheavalTT-BRK--16.glyphs")
 
 
+# A CRC32 of the sensor readings on the panel, which holds its image without
+# power, so an unchanged reading after deep sleep doesn't need redrawing
+DISPLAY_MAGIC = 0x4450
+DISPLAY_STATE_FORMAT = "<HI"
+DISPLAY_STATE_SIZE = struct.calcsize(DISPLAY_STATE_FORMAT)
+
+# Positions and fonts of pH, DO, air temp, water temp and the update time
+SENSORS_LAYOUT = (
+    (20, 15, FONT),
+    (20, 45, FONT),
+    (20, 75, FONT),
+    (20, 105, FONT),
+    (120, 15, SMALL_FONT),
+)
+
+
+# The panel and its scene graph are only set up once something needs drawing,
+# and each layout's labels are kept and updated in place after that
 class Display:
-    def __init__(self):
+    def __init__(self, memory=None, offset=DISPLAY_OFFSET):
+        self.__memory = alarm.sleep_memory if memory is None else memory
+        self.__offset = offset
+        self.__display = None
+        self.__layouts = {}
+
+    # Returns False if the panel already shows these readings and was left alone.
+    # The update time isn't compared, so it shows when the readings last changed.
+    def show_sensors(self, updated_at, sensors):
+        texts = [
+            f"pH: {sensors.pH:.1f}",
+            f"DO: {sensors.DO_percent_saturation:.0f}% ({sensors.DO_mg_L:.1f} mg/L)",
+            f"Temp (Air): {sensors.air_temp:.0f}C",
+            f"Temp (Water): {sensors.water_temp:.0f}C",
+        ]
+        texts_hash = binascii.crc32("\n".join(texts).encode())
+        if texts_hash == self.__read_hash():
+            return False
+
+        if updated_at is None:
+            texts.append("")
+        else:
+            texts.append(
+                f"Updated: {updated_at.month}/{updated_at.day} {updated_at.hour}:{updated_at.minute:02}"
+            )
+        self.__show(SENSORS_LAYOUT, texts)
+        self.__write_hash(texts_hash)
+        return True
+
+    def show_message(self, message, sub_messages=[]):
+        layout = ((20, 15, FONT),) + tuple(
+            (20, 45 + (i * 30), SMALL_FONT) for i in range(len(sub_messages))
+        )
+        # Whatever the panel showed before is gone
+        self.__write_hash(0)
+        self.__show(layout, [message] + list(sub_messages))
+
+    def __show(self, layout, texts):
+        if self.__display is None:
+            self.__display = Display.__init_display()
+        if layout not in self.__layouts:
+            self.__layouts[layout] = Display.__build_layout(layout)
+        group, labels = self.__layouts[layout]
+        for text_area, text in zip(labels, texts):
+            if text_area.text != text:
+                text_area.text = text
+
+        self.__display.show(group)
+        self.__display.refresh()
+
+    def __read_hash(self):
+        magic, texts_hash = struct.unpack(
+            DISPLAY_STATE_FORMAT,
+            self.__memory[self.__offset : self.__offset + DISPLAY_STATE_SIZE],
+        )
+        return texts_hash if magic == DISPLAY_MAGIC else None
+
+    def __write_hash(self, texts_hash):
+        self.__memory[self.__offset : self.__offset + DISPLAY_STATE_SIZE] = struct.pack(
+            DISPLAY_STATE_FORMAT, DISPLAY_MAGIC, texts_hash
+        )
+
+    @staticmethod
+    def __init_display():
         displayio.release_displays()
         spi = busio.SPI(SCK, MOSI)
         display_bus = displayio.FourWire(
             spi, command=EPD_DC, chip_select=EPD_CS, baudrate=1000000
         )
-        self.__display = adafruit_il0373.IL0373(
+        return adafruit_il0373.IL0373(
             display_bus,
             width=DISPLAY_WIDTH,
             height=DISPLAY_HEIGHT,
@@ -31,50 +118,25 @@ class Display:
             refresh_time=1,
         )
 
-    def show_sensors(self, updated_at, sensors):
-        g = displayio.Group()
-        palette = displayio.Palette(1)
-        palette[0] = BACKGROUND_COLOR
-
-        background_bitmap = displayio.Bitmap(DISPLAY_WIDTH, DISPLAY_HEIGHT, 1)
-        t = displayio.TileGrid(background_bitmap, pixel_shader=palette)
-        g.append(t)
-
-        pH = f"pH: {sensors.pH:.1f}"
-        DO = f"DO: {sensors.DO_percent_saturation:.0f}% ({sensors.DO_mg_L:.1f} mg/L)"
-        air_temp = f"Temp (Air): {sensors.air_temp:.0f}C"
-        water_temp = f"Temp (Water): {sensors.water_temp:.0f}C"
-        Display.__add_text_to_group(g, pH, 20, 15)
-        Display.__add_text_to_group(g, DO, 20, 45)
-        Display.__add_text_to_group(g, air_temp, 20, 75)
-        Display.__add_text_to_group(g, water_temp, 20, 105)
-
-        if updated_at is not None:
-            updated = f"Updated: {updated_at.month}/{updated_at.day} {updated_at.hour}:{updated_at.minute:02}"
-            Display.__add_text_to_group(g, updated, 120, 15, SMALL_FONT)
-
-        self.__display.show(g)
-        self.__display.refresh()
-
-    def show_message(self, message, sub_messages=[]):
+    # The background is a single pixel scaled up to cover the panel, rather
+    # than a full size bitmap
+    @staticmethod
+    def __build_layout(layout):
         g = displayio.Group()
         palette = displayio.Palette(1)
         palette[0] = BACKGROUND_COLOR
 
-        background_bitmap = displayio.Bitmap(DISPLAY_WIDTH, DISPLAY_HEIGHT, 1)
-        t = displayio.TileGrid(background_bitmap, pixel_shader=palette)
-        g.append(t)
-
-        Display.__add_text_to_group(g, message, 20, 15)
-        for i, sub_message in enumerate(sub_messages):
-            Display.__add_text_to_group(g, sub_message, 20, 45 + (i * 30), SMALL_FONT)
-
-        self.__display.show(g)
-        self.__display.refresh()
+        background = displayio.Group(scale=max(DISPLAY_WIDTH, DISPLAY_HEIGHT))
+        background.append(
+            displayio.TileGrid(displayio.Bitmap(1, 1, 1), pixel_shader=palette)
+        )
+        g.append(background)
 
-    @staticmethod
-    def __add_text_to_group(group, text, x, y, font=FONT):
-        text_group = displayio.Group(scale=1, x=x, y=y)
-        text_area = label.Label(text=text, font=font, color=FOREGROUND_COLOR)
-        text_group.append(text_area)
-        group.append(text_group)
+        labels = []
+        for x, y, font in layout:
+            text_group = displayio.Group(scale=1, x=x, y=y)
+            text_area = label.Label(text="", font=font, color=FOREGROUND_COLOR)
+            text_group.append(text_area)
+            g.append(text_group)
+            labels.append(text_area)
+        return g, labels
@@ -0,0 +1,98 @@
+import displayio
+from fontio import Glyph
+import struct
+
+# Must match support/glyph_atlas.py
+MAGIC = b"GLYF"
+VERSION = 2
+# magic, version, glyph count, bounding box width, height, x and y offset,
+# ascent and descent
+HEADER_FORMAT = "<4sBBBBbbBB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# code point, width, height, x and y offset, x and y shift, offset of the
+# bitmap in the file
+ENTRY_FORMAT = "<HBBbbbbH"
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+
+
+# A font read from a glyph atlas built by support/glyph_atlas.py, holding only
+# the glyphs the display uses, already rasterized. Nothing is read until the
+# first glyph is needed, and each glyph's bitmap is only built the first time
+# it's drawn.
+class GlyphFont:
+    def __init__(self, path):
+        self.__path = path
+        self.__data = None
+        self.__count = 0
+        self.__bounding_box = None
+        self.__ascent = 0
+        self.__descent = 0
+        self.__glyphs = {}
+
+    # adafruit_display_text positions labels by these, and would otherwise
+    # measure glyphs that aren't in the atlas
+    @property
+    def ascent(self):
+        self.__load()
+        return self.__ascent
+
+    @property
+    def descent(self):
+        self.__load()
+        return self.__descent
+
+    def get_bounding_box(self):
+        self.__load()
+        return self.__bounding_box
+
+    def load_glyphs(self, code_points):
+        for code_point in code_points:
+            self.get_glyph(
+                ord(code_point) if isinstance(code_point, str) else code_point
+            )
+
+    def get_glyph(self, code_point):
+        if code_point in self.__glyphs:
+            return self.__glyphs[code_point]
+
+        data = self.__load()
+        glyph = None
+        # Entries are sorted by code point
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            entry = struct.unpack_from(
+                ENTRY_FORMAT, data, HEADER_SIZE + middle * ENTRY_SIZE
+            )
+            if entry[0] < code_point:
+                low = middle + 1
+            elif entry[0] > code_point:
+                high = middle
+            else:
+                glyph = GlyphFont.__build_glyph(data, *entry[1:])
+                break
+        self.__glyphs[code_point] = glyph
+        return glyph
+
+    def __load(self):
+        if self.__data is None:
+            with open(self.__path, "rb") as f:
+                self.__data = memoryview(f.read())
+            header = struct.unpack_from(HEADER_FORMAT, self.__data)
+            magic, version, self.__count = header[:3]
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.__path} is not a glyph atlas, rebuild it")
+            self.__bounding_box = header[3:7]
+            self.__ascent, self.__descent = header[7:]
+        return self.__data
+
+    @staticmethod
+    def __build_glyph(data, width, height, dx, dy, shift_x, shift_y, offset):
+        bitmap = displayio.Bitmap(width, height, 2)
+        row_bytes = (width + 7) // 8
+        for y in range(height):
+            row = offset + y * row_bytes
+            for x in range(width):
+                if data[row + (x >> 3)] & (0x80 >> (x & 7)):
+                    bitmap[x, y] = 1
+        return Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
@@ -1,9 +1,9 @@
-from adafruit_datetime import datetime
-import adafruit_minimqtt.adafruit_minimqtt as MQTT
-import adafruit_ntp
+# Only what every wake path needs is imported here. Everything else is
+# imported by the path that uses it, so e.g. a ULP wake doesn't pay for the
+# calibration code, or calibration for MQTT and the display.
+# support/benchmark_imports.py reports what each path imports.
 import alarm
-from button import wait_for_confirmation, wait_for_selection
-from buzzer import beep_confirm, beep_done, beep_error, beep_success, beep_morse
+import config
 from config import (
     MQTT_BROKER,
     MQTT_PORT,
@@ -12,23 +12,34 @@ from config import (
     WIFI_PASS,
     WIFI_SSID,
 )
-from display import Display
-import espadc
 from espulp import ULPAlarm
 import json
-from pins import (
-    button_a,
-    button_b,
-    BUTTON_C_PIN,
-)
-import rtc
-from sensors import Sensors
-import socketpool
+from profiler import Profiler
+from pins import BUTTON_C_PIN
 import supervisor
 import time
-from ulp import ULP, ULPRunMode
+from ulp import READING_TICK_SECONDS, SENSOR_IDS, ULP, ULPRunMode
 
 ulp = ULP()
+# Also estimate the largest free block of the heap after each phase. Slows
+# every wake down, so only for tracking down a MemoryError.
+MEMORY_BUDGET = getattr(config, "MEMORY_BUDGET", False)
+profiler = Profiler(measure_fragmentation=MEMORY_BUDGET)
+
+# Publish a summary of recent wake timings every N wakes, 0 to disable
+PROFILE_SUMMARY_EVERY = getattr(config, "PROFILE_SUMMARY_EVERY", 0)
+# Bounds of the ULP's adaptive sampling interval in seconds, and how much it
+# grows by each update the readings are stable
+SAMPLE_INTERVAL_MIN = getattr(config, "SAMPLE_INTERVAL_MIN", 15)
+SAMPLE_INTERVAL_MAX = getattr(config, "SAMPLE_INTERVAL_MAX", 180)
+SAMPLE_INTERVAL_BACKOFF = getattr(config, "SAMPLE_INTERVAL_BACKOFF", 1.5)
+# Overrides of the ULP's change detection per sensor, see ULP.configure_sensor
+ULP_SENSOR_SETTINGS = getattr(config, "ULP_SENSOR_SETTINGS", {})
+# DS18B20 resolution in bits, and how long the analog sensors settle for
+ONEWIRE_RESOLUTION = getattr(config, "ONEWIRE_RESOLUTION", 10)
+ANALOG_SETTLE_MS = getattr(config, "ANALOG_SETTLE_MS", 300)
+# ROMs of the air_temp and water_temp probes as hex, found by the ULP if unset
+ONEWIRE_PROBES = getattr(config, "ONEWIRE_PROBES", {})
 
 
 def get_calibration():
@@ -55,80 +66,172 @@ def set_calibration(calibration):
 
 def get_current_time():
     try:
+        from adafruit_datetime import datetime
+
         return datetime.now()
 
     except:
         return None
 
 
-def get_wifi_connection(attempts=0):
-    try:
-        # Sometimes importing the wifi module throws a MemoryError
-        import wifi
+def get_wifi_manager():
+    from wifi_manager import WiFiManager
 
-        print(f"Connecting to WiFi network {WIFI_SSID}...", end=" ")
-        wifi.radio.connect(WIFI_SSID, WIFI_PASS, timeout=3)
-        print("Done!")
+    return WiFiManager(reuse_lease=getattr(config, "WIFI_REUSE_LEASE", False))
 
-        return socketpool.SocketPool(wifi.radio)
 
-    except Exception as e:
-        if attempts < 3:
-            print("Exception encoutered:", e)
-            print(f"Trying again ({++attempts}/3)")
-            return get_wifi_connection()
-        else:
-            print("Giving up!")
-            return None
+def get_time_sync():
+    from time_sync import TimeSync
+
+    return TimeSync(budget=getattr(config, "TIME_ERROR_BUDGET", 30))
+
+
+# Each sensor's average and peak change between ULP samples since the last
+# summary, to tune the thresholds in ULP_SENSOR_SETTINGS against
+def get_noise_summary():
+    noise = ulp.shared_memory.noise
+    peaks = ulp.shared_memory.noise_peak
+    ulp.shared_memory.reset_noise_peak()
+    return " ".join(
+        f"{sensor}={average:.1f}/{peak}"
+        for sensor, average, peak in zip(SENSOR_IDS, noise, peaks)
+    )
 
 
 def init():
-    pool = get_wifi_connection()
+    wifi_manager = get_wifi_manager()
+    time_sync = get_time_sync()
+
+    with profiler.phase("wifi"):
+        pool = wifi_manager.connect(WIFI_SSID, WIFI_PASS)
     if pool is None:
         return
 
     print("Setting time...", end=" ")
-    ntp = adafruit_ntp.NTP(pool, tz_offset=TZ_OFFSET)
-    rtc.RTC().datetime = ntp.datetime
+    with profiler.phase("ntp"):
+        time_sync.sync(pool, TZ_OFFSET)
     print("Done!")
 
     print("Starting ULP...", end=" ")
-    ulp.start()
+    with profiler.phase("ulp"):
+        ulp.start()
+        ulp.set_sampling(
+            SAMPLE_INTERVAL_MIN, SAMPLE_INTERVAL_MAX, SAMPLE_INTERVAL_BACKOFF
+        )
+        for sensor, settings in ULP_SENSOR_SETTINGS.items():
+            ulp.configure_sensor(sensor, **settings)
+        ulp.configure_onewire(ONEWIRE_RESOLUTION, ANALOG_SETTLE_MS)
+        for sensor, rom in ONEWIRE_PROBES.items():
+            ulp.set_probe(sensor, rom)
     print("Done!")
 
 
 def update():
-    display = Display()
+    # Long-lived objects are allocated first, in the same order every wake,
+    # while the heap is least fragmented: the wifi module ahead of everything,
+    # then the socket pool, MQTT client and frame buffer. Parsing calibration,
+    # drawing and packing readings then only allocate around them.
+    with profiler.phase("buffers"):
+        wifi_manager = get_wifi_manager()
+        import adafruit_minimqtt.adafruit_minimqtt as MQTT
+        from telemetry import FrameEncoder
+
+        mqtt = MQTT.MQTT(
+            broker=MQTT_BROKER,
+            port=MQTT_PORT,
+            socket_pool=wifi_manager.socket_pool,
+        )
+        encoder = FrameEncoder()
+
+    from display import Display
+    from publish_queue import PublishQueue
+    from sensors import Sensors
+
+    time_sync = get_time_sync()
+
     now = get_current_time()
-    calibration = get_calibration()
-    sensors = Sensors(ulp.shared_memory, calibration)
+    with profiler.phase("calibration"):
+        calibration = get_calibration()
+    with profiler.phase("sensors"):
+        sensors = Sensors(ulp.shared_memory, calibration)
 
     sensors.print()
 
     if ulp.shared_memory.debug:
         ulp.set_run_mode(ULPRunMode.NORMAL)
     else:
-        display.show_sensors(now, sensors)
-
-    pool = get_wifi_connection()
+        with profiler.phase("display"):
+            if not Display().show_sensors(now, sensors):
+                print("Display already up to date")
+
+    # Everything the ULP buffered since the last upload, timed back from the
+    # newest, which it took just before waking us. If it woke us without
+    # buffering anything, send what's current.
+    timestamp = int(time.time()) - TZ_OFFSET * 3600
+    readings = ulp.shared_memory.drain_readings()
+    records = []
+    for reading in readings:
+        sensors.update(reading)
+        age = ((readings[-1].ticks - reading.ticks) & 0xFFFFFFFF) * READING_TICK_SECONDS
+        records.append(sensors.to_record(timestamp - int(age)))
+    if not records:
+        records.append(sensors.to_record(timestamp))
+
+    # Anything that can't be published now is spooled to flash and sent
+    # ahead of new readings in the next session that connects
+    queue = PublishQueue()
+
+    with profiler.phase("wifi"):
+        pool = wifi_manager.connect(WIFI_SSID, WIFI_PASS)
     if pool is None:
+        queue.append(records)
+        print(f"Queued {len(records)} readings, {len(queue)} waiting")
         return
 
-    mqtt = MQTT.MQTT(
-        broker=MQTT_BROKER,
-        port=MQTT_PORT,
-        socket_pool=pool,
+    # Only worth the round trip once the RTC has likely drifted too far
+    if time_sync.needed():
+        print("Resyncing time...", end=" ")
+        try:
+            with profiler.phase("ntp"):
+                offset = time_sync.sync(pool, TZ_OFFSET)
+            print(f"Done! (RTC was {offset}s off)")
+        except Exception as e:
+            print("Exception encountered:", e)
+
+    backlog = queue.records()
+    sent = 0
+    print(
+        f"Sending {len(backlog) + len(records)} readings to MQTT broker {MQTT_BROKER}...",
+        end=" ",
     )
-    payload = sensors.to_binary()
-
-    print(f"Sending data {payload} to MQTT broker {MQTT_BROKER}...", end=" ")
-    mqtt.connect()
-    mqtt.publish(MQTT_TOPIC, payload)
-    mqtt.disconnect()
+    try:
+        with profiler.phase("mqtt"):
+            mqtt.connect()
+            for frame in encoder.frames(backlog + records):
+                mqtt.publish(MQTT_TOPIC, frame)
+                sent += frame[1]
+            if PROFILE_SUMMARY_EVERY and profiler.wakes % PROFILE_SUMMARY_EVERY == 0:
+                mqtt.publish(
+                    f"{MQTT_TOPIC}/profile",
+                    f"{profiler.summary()},connect:{wifi_manager.summary()}"
+                    f",noise:{get_noise_summary()}",
+                )
+            mqtt.disconnect()
+    except Exception:
+        unsent = records[max(sent - len(backlog), 0) :]
+        queue.discard(sent)
+        queue.append(unsent)
+        print(f"Queued {len(queue)} unsent readings")
+        raise
+    queue.clear()
     print("Done!")
 
 
 def calibrate():
+    from buzzer import beep_confirm, beep_morse
+    from button import wait_for_selection
+    from pins import button_a, button_b
+
     try:
         ulp.set_run_mode(ULPRunMode.CALIBRATION)
         beep_confirm()
@@ -147,7 +250,43 @@ def calibrate():
         ulp.set_run_mode(ULPRunMode.NORMAL)
 
 
+# Light sleeps until the ULP's calibration window of `sensor` is stable and
+# returns its mean in raw units. Only windows sampled after the call count, so
+# a reading from before the probe moved isn't taken.
+def wait_for_stable_calibration(sensor, timeout=30):
+    from alarm.time import TimeAlarm
+
+    sensor_id = SENSOR_IDS[sensor]
+    shared_memory = ulp.shared_memory
+    start = shared_memory.read_calibration_stats().sequence
+    deadline = time.monotonic() + timeout
+    shared_memory.calibration_watch = 1 << sensor_id
+    try:
+        while True:
+            stats = shared_memory.read_calibration_stats()
+            spread = stats.maximum[sensor_id] - stats.minimum[sensor_id]
+            print(stats.mean[sensor_id], f"∆{spread}")
+            fresh = (stats.sequence - start) // 2 >= stats.count > 0
+            if fresh and stats.stable & (1 << sensor_id):
+                return stats.mean[sensor_id]
+            now = time.monotonic()
+            if now > deadline:
+                raise TimeoutError("Timed out waiting for stable reading!")
+            # The ULP wakes us while the window is stable, the time alarm only
+            # bounds each sleep so progress is printed and the timeout holds
+            alarm.light_sleep_until_alarms(
+                ulp.alarm, TimeAlarm(monotonic_time=min(deadline, now + 1))
+            )
+    finally:
+        shared_memory.calibration_watch = 0
+
+
 def calibrate_DO():
+    from button import wait_for_confirmation
+    from buzzer import beep_confirm, beep_done
+    import espadc
+    from pins import button_a
+
     print("Waiting for confirmation...")
     wait_for_confirmation(button_a, timeout=20)
     beep_confirm()
@@ -159,25 +298,9 @@ def calibrate_DO():
     print("Ready. Taking DO readings...")
 
     calibration = get_calibration()
-    sensors = Sensors(ulp.shared_memory, calibration)
-    stable_threshold = 80
-    stable_timeout = 30
-    readings = list((0,) * 10)
-    i = 0
-    start = time.monotonic()
-    while True:
-        if time.monotonic() - start > stable_timeout:
-            raise TimeoutError("Timed out waiting for stable reading!")
-        raw = sensors.raw["DO"]
-        readings[i] = raw
-        spread = max(readings) - min(readings)
-        i = (i + 1) % 10
-        print(raw, f"∆{spread}")
-        if len(readings) == 10 and spread < stable_threshold:
-            break
-        time.sleep(0.1)
-
-    saturation_mV = espadc.raw_to_voltage(round(sum(readings) / len(readings)))
+    raw = wait_for_stable_calibration("DO")
+
+    saturation_mV = espadc.raw_to_voltage(round(raw))
 
     if saturation_mV < 1:
         raise ValueError("Invalid saturation voltage!")
@@ -191,10 +314,14 @@ def calibrate_DO():
 
 
 def calibrate_pH():
+    from button import wait_for_confirmation
+    from buzzer import beep_confirm, beep_done, beep_success
+    import espadc
+    from pins import button_a
+    from sensors import Sensors
+
     calibration = get_calibration()
     sensors = Sensors(ulp.shared_memory, calibration)
-    stable_threshold = 80
-    stable_timeout = 30
 
     low_cal_mV = -1
     mid_cal_mV = -1
@@ -207,22 +334,9 @@ def calibrate_pH():
         beep_confirm()
 
         print("Ready. Taking pH readings...")
-        start = time.monotonic()
-        readings = list((0,) * 10)
-        i = 0
-        while True:
-            if time.monotonic() - start > stable_timeout:
-                raise TimeoutError("Timed out waiting for stable reading!")
-            raw = sensors.raw["pH"]
-            readings[i] = raw
-            spread = max(readings) - min(readings)
-            i = (i + 1) % 10
-            print(raw, f"∆{spread}")
-            if len(readings) == 10 and spread < stable_threshold:
-                break
-            time.sleep(0.1)
+        raw = wait_for_stable_calibration("pH")
 
-        cal_mV = espadc.raw_to_voltage(round(sum(readings) / len(readings)))
+        cal_mV = espadc.raw_to_voltage(round(raw))
 
         # auto-detect calibration point
         sensors.update()
@@ -257,17 +371,20 @@ def main():
         # Auto-reload and the ULP is a bad time. Use serial communication or hardware to reset.
         supervisor.runtime.autoreload = False
 
-        if alarm.wake_alarm == None:
-            print("No wake alarm detected, initializing...")
-            init()
-        elif isinstance(alarm.wake_alarm, ULPAlarm):
-            print("ULP requested wake-up, updating...")
-            update()
-        elif isinstance(alarm.wake_alarm, alarm.pin.PinAlarm):
-            print("Calibration button pressed, starting calibration...")
-            calibrate()
+        with profiler.phase("wake"):
+            if alarm.wake_alarm == None:
+                print("No wake alarm detected, initializing...")
+                init()
+            elif isinstance(alarm.wake_alarm, ULPAlarm):
+                print("ULP requested wake-up, updating...")
+                update()
+            elif isinstance(alarm.wake_alarm, alarm.pin.PinAlarm):
+                print("Calibration button pressed, starting calibration...")
+                calibrate()
 
     except Exception as e:
+        from buzzer import beep_error
+
         beep_error()
         print("Exception encountered:", e)
 
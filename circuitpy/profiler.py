@@ -0,0 +1,155 @@
+import alarm
+import gc
+import struct
+import time
+from sleep_memory import PROFILER_OFFSET, PROFILER_SLOTS
+
+# Phases are stored by index, only ever append to this list
+PHASES = (
+    "wake",
+    "wifi",
+    "ntp",
+    "ulp",
+    "calibration",
+    "sensors",
+    "display",
+    "mqtt",
+    "buffers",
+)
+
+# Changed along with RECORD_FORMAT, so older records are dropped
+MAGIC = 0x5047
+# magic, next slot, used slots, wakes
+HEADER_FORMAT = "<HBBI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# phase, wake (low byte), duration in ms, then gc.mem_free(), gc.mem_alloc() and
+# largest_free_block() at the end of the phase, the last 0 if it wasn't measured
+RECORD_FORMAT = "<BBHIII"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+# Estimates the largest single allocation the heap can still satisfy, by
+# bisecting on the size of a bytearray to within `resolution` bytes. The free
+# heap can be split into blocks too small for, e.g., the wifi module to load,
+# which gc.mem_free() doesn't show. Each probe allocates, so it's far slower
+# than gc.mem_free().
+def largest_free_block(resolution=256):
+    gc.collect()
+    low, high = 0, gc.mem_free()
+    while high - low > resolution:
+        size = (low + high) // 2
+        try:
+            block = bytearray(size)
+        except MemoryError:
+            high = size
+        else:
+            del block
+            low = size
+    return low
+
+
+# Records how long each phase of a wake takes, and the state of the heap after
+# it, in a ring buffer in sleep memory so it builds up across wakes. The
+# largest free block is only measured when `measure_fragmentation` is set.
+class Profiler:
+    def __init__(
+        self,
+        memory=None,
+        offset=PROFILER_OFFSET,
+        slots=PROFILER_SLOTS,
+        measure_fragmentation=False,
+    ):
+        self.__memory = alarm.sleep_memory if memory is None else memory
+        self.__offset = offset
+        self.__slots = slots
+        self.measure_fragmentation = measure_fragmentation
+        magic, self.__next, self.__used, self.wakes = struct.unpack(
+            HEADER_FORMAT, self.__memory[offset : offset + HEADER_SIZE]
+        )
+        if magic != MAGIC or self.__next >= slots or self.__used > slots:
+            self.__next = 0
+            self.__used = 0
+            self.wakes = 0
+        self.wakes += 1
+        self.__write_header()
+
+    def phase(self, name):
+        return _Phase(self, PHASES.index(name))
+
+    def record(self, phase, duration_ns, mem_free, mem_alloc, largest_block=0):
+        duration_ms = min(duration_ns // 1_000_000, 0xFFFF)
+        offset = self.__slot_offset(self.__next)
+        self.__memory[offset : offset + RECORD_SIZE] = struct.pack(
+            RECORD_FORMAT,
+            phase,
+            self.wakes & 0xFF,
+            duration_ms,
+            mem_free,
+            mem_alloc,
+            largest_block,
+        )
+        self.__next = (self.__next + 1) % self.__slots
+        self.__used = min(self.__used + 1, self.__slots)
+        self.__write_header()
+
+    # Oldest first, as (phase, wake, duration in ms, mem_free, mem_alloc,
+    # largest free block)
+    def records(self):
+        first = (self.__next - self.__used) % self.__slots
+        for i in range(self.__used):
+            offset = self.__slot_offset((first + i) % self.__slots)
+            # CircuitPython can't unpack into a tuple literal, so it's concatenated
+            values = struct.unpack(
+                RECORD_FORMAT, self.__memory[offset : offset + RECORD_SIZE]
+            )
+            yield (PHASES[values[0]],) + values[1:]
+
+    # One "phase:count/mean ms/max ms/min mem_free/min largest free block" entry
+    # per phase in the buffer, the last 0 unless fragmentation was measured
+    def summary(self):
+        stats = {}
+        for phase, _, duration_ms, mem_free, _, largest_block in self.records():
+            count, total, longest, lowest, smallest_block = stats.get(
+                phase, (0, 0, 0, mem_free, largest_block)
+            )
+            stats[phase] = (
+                count + 1,
+                total + duration_ms,
+                max(longest, duration_ms),
+                min(lowest, mem_free),
+                min(smallest_block, largest_block),
+            )
+        return ",".join(
+            f"{phase}:{count}/{total // count}/{longest}/{lowest}/{smallest_block}"
+            for phase, (count, total, longest, lowest, smallest_block) in stats.items()
+        )
+
+    def __slot_offset(self, slot):
+        return self.__offset + HEADER_SIZE + slot * RECORD_SIZE
+
+    def __write_header(self):
+        self.__memory[self.__offset : self.__offset + HEADER_SIZE] = struct.pack(
+            HEADER_FORMAT, MAGIC, self.__next, self.__used, self.wakes
+        )
+
+
+class _Phase:
+    def __init__(self, profiler, phase):
+        self.__profiler = profiler
+        self.__phase = phase
+
+    def __enter__(self):
+        self.__start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ns = time.monotonic_ns() - self.__start
+        profiler = self.__profiler
+        # Before the estimate collects garbage
+        mem_free = gc.mem_free()
+        mem_alloc = gc.mem_alloc()
+        largest_block = 0
+        if profiler.measure_fragmentation:
+            largest_block = largest_free_block()
+        profiler.record(self.__phase, duration_ns, mem_free, mem_alloc, largest_block)
+        return False
@@ -0,0 +1,139 @@
+import binascii
+import os
+import struct
+from telemetry import Record
+
+QUEUE_PATH = "/queue/records.bin"
+# About 10 KiB of flash at most
+QUEUE_CAPACITY = 512
+
+# The fields of a telemetry.Record, followed by a CRC32 of them
+RECORD_FORMAT = "<IhhhhhB"
+ENTRY_FORMAT = RECORD_FORMAT + "I"
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+
+
+# Records that couldn't be published, kept on flash until the next successful
+# MQTT session. Records are only ever appended, so a write cut short by a
+# crash or power loss leaves a torn or corrupt record at the end of the file,
+# which is dropped when the queue is loaded. When the queue is full the oldest
+# records are evicted by rewriting it to a temporary file which replaces the
+# original once it's complete, so a rewrite cut short can always be recovered.
+class PublishQueue:
+    def __init__(self, path=QUEUE_PATH, capacity=QUEUE_CAPACITY):
+        self.__path = path
+        self.__capacity = capacity
+        self.__records = None
+        # Whether the file holds anything past the last valid record
+        self.__dirty = False
+
+    def __len__(self):
+        return len(self.records())
+
+    # Oldest first
+    def records(self):
+        if self.__records is None:
+            self.__records = self.__load()
+        return self.__records
+
+    def append(self, records):
+        if not records:
+            return
+        queued = self.records()
+        if self.__dirty or len(queued) + len(records) > self.__capacity:
+            queued.extend(records)
+            del queued[: -self.__capacity]
+            self.__rewrite(queued)
+            return
+
+        self.__ensure_dir()
+        with open(self.__path, "ab") as f:
+            for record in records:
+                f.write(self.__pack(record))
+        queued.extend(records)
+
+    # Drops the oldest `count` records once they've been published
+    def discard(self, count):
+        if count <= 0:
+            return
+        queued = self.records()
+        if count >= len(queued):
+            self.clear()
+        else:
+            del queued[:count]
+            self.__rewrite(queued)
+
+    def clear(self):
+        self.__records = []
+        self.__dirty = False
+        try:
+            os.remove(self.__path)
+        except OSError:
+            pass
+
+    def __load(self):
+        self.__recover()
+        records = []
+        try:
+            with open(self.__path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return records
+
+        for offset in range(0, len(data) - ENTRY_SIZE + 1, ENTRY_SIZE):
+            *fields, crc32 = struct.unpack_from(ENTRY_FORMAT, data, offset)
+            if binascii.crc32(struct.pack(RECORD_FORMAT, *fields)) != crc32:
+                print("Dropping corrupt records from the publish queue")
+                self.__dirty = True
+                break
+            records.append(Record(*fields))
+        if len(data) % ENTRY_SIZE:
+            print("Dropping a partially written record from the publish queue")
+            self.__dirty = True
+        return records
+
+    # FAT can't rename over an existing file, so the original is removed once
+    # the temporary file is complete and then replaced by it
+    def __rewrite(self, records):
+        self.__ensure_dir()
+        temporary_path = self.__path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            for record in records:
+                f.write(self.__pack(record))
+        try:
+            os.remove(self.__path)
+        except OSError:
+            pass
+        os.rename(temporary_path, self.__path)
+        self.__dirty = False
+
+    # A temporary file alongside the original may be incomplete and is
+    # discarded. On its own, the original was already removed so it's complete.
+    def __recover(self):
+        temporary_path = self.__path + ".tmp"
+        if not self.__exists(temporary_path):
+            return
+        if self.__exists(self.__path):
+            os.remove(temporary_path)
+        else:
+            os.rename(temporary_path, self.__path)
+
+    def __ensure_dir(self):
+        try:
+            os.mkdir(self.__path.rsplit("/", 1)[0])
+        except OSError:
+            pass
+
+    @staticmethod
+    def __exists(path):
+        try:
+            os.stat(path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def __pack(record):
+        return struct.pack(
+            ENTRY_FORMAT, *record, binascii.crc32(struct.pack(RECORD_FORMAT, *record))
+        )
@@ -1,30 +1,86 @@
 # This module is added by the forked version of CircuitPython. It adds a function to
 # convert raw ADC values to voltages so we can use the values read by the ULP in Python.
 import espadc
+from telemetry import (
+    DO_MG_L_SCALE,
+    DO_PERCENT_SATURATION_SCALE,
+    PH_SCALE,
+    TEMP_SCALE,
+    Record,
+    to_fixed,
+)
 
 
+# Bits of the ULP's modified mask, see the sensor IDs in ulp/main.c
+class Modified(object):
+    PH = 1 << 0
+    DO = 1 << 1
+    AIR_TEMP = 1 << 2
+    WATER_TEMP = 1 << 3
+
+
+# Derived values are computed from a single snapshot of shared memory (or a
+# buffered reading from the ULP) the first time they're read, and reused until
+# the next update()
 class Sensors:
     def __init__(self, shared_memory, calibration):
         self.__shared_memory = shared_memory
         self.__calibration = calibration
         self.update()
 
-    def update(self):
-        self.air_temp = self.__ds18b20(self.__shared_memory.air_temp)
-        self.water_temp = self.__ds18b20(self.__shared_memory.water_temp)
-        self.pH = self.__pH()
-        self.DO_percent_saturation = self.__DO_percent_saturation()
-        self.DO_mg_L = self.__DO_mg_L(self.water_temp, self.DO_percent_saturation)
-        self.modified = self.__modified()
+    def update(self, raw=None):
+        self.__raw = self.__shared_memory.snapshot() if raw is None else raw
+        self.__air_temp = None
+        self.__water_temp = None
+        self.__pH = None
+        self.__DO_percent_saturation = None
+        self.__DO_mg_L = None
 
+    # The snapshot or reading the values are derived from
     @property
     def raw(self):
-        return {
-            "air_temp": self.__shared_memory.air_temp,
-            "water_temp": self.__shared_memory.water_temp,
-            "pH": self.__shared_memory.pH,
-            "DO": self.__shared_memory.DO,
-        }
+        return self.__raw
+
+    @property
+    def modified(self):
+        return self.__raw.modified
+
+    def is_modified(self, flag):
+        return bool(self.__raw.modified & flag)
+
+    @property
+    def air_temp(self):
+        if self.__air_temp is None:
+            self.__air_temp = self.__to_celsius(self.__raw.air_temp)
+        return self.__air_temp
+
+    @property
+    def water_temp(self):
+        if self.__water_temp is None:
+            self.__water_temp = self.__to_celsius(self.__raw.water_temp)
+        return self.__water_temp
+
+    @property
+    def pH(self):
+        if self.__pH is None:
+            self.__pH = self.__to_pH(self.__raw.pH)
+        return self.__pH
+
+    @property
+    def DO_percent_saturation(self):
+        if self.__DO_percent_saturation is None:
+            self.__DO_percent_saturation = self.__to_DO_percent_saturation(
+                self.__raw.DO
+            )
+        return self.__DO_percent_saturation
+
+    @property
+    def DO_mg_L(self):
+        if self.__DO_mg_L is None:
+            self.__DO_mg_L = self.__to_DO_mg_L(
+                self.water_temp, self.DO_percent_saturation
+            )
+        return self.__DO_mg_L
 
     def print(self):
         print("pH:", self.pH)
@@ -32,24 +88,23 @@ class Sensors:
         print("DO (% sat):", self.DO_percent_saturation)
         print("Air temp:", self.air_temp)
         print("Water temp:", self.water_temp)
-        print("Modified:", self.modified)
-
-    # Binary format to send across the wire
-    # 0x00: air_temp
-    # 0x01: water_temp
-    # 0x02: pH (in 0.1 increments)
-    # 0x03: DO_percent_saturation
-    def to_binary(self):
-        return (
-            (int(round(self.air_temp)) << 24)
-            | (int(round(self.water_temp)) << 16)
-            | (int(round(self.pH * 10)) << 8)
-            | int(round(self.DO_percent_saturation))
+        print("Modified:", f"{self.modified:04b}")
+
+    # Fixed-point record to send across the wire, see telemetry.py
+    def to_record(self, timestamp):
+        return Record(
+            timestamp,
+            to_fixed(self.pH, PH_SCALE),
+            to_fixed(self.DO_percent_saturation, DO_PERCENT_SATURATION_SCALE),
+            to_fixed(self.DO_mg_L, DO_MG_L_SCALE),
+            to_fixed(self.air_temp, TEMP_SCALE),
+            to_fixed(self.water_temp, TEMP_SCALE),
+            self.modified,
         )
 
     # https://files.atlas-scientific.com/Gravity-pH-datasheet.pdf
-    def __pH(self):
-        mV = espadc.raw_to_voltage(self.__shared_memory.pH)
+    def __to_pH(self, raw):
+        mV = espadc.raw_to_voltage(raw)
         cal = self.__calibration["pH"]
         if mV > cal["mid"]:  # high voltage = low pH
             return 7 - 3 / (cal["low"] - cal["mid"]) * (mV - cal["mid"])
@@ -57,13 +112,13 @@ class Sensors:
             return 7 - 3 / (cal["mid"] - cal["high"]) * (mV - cal["mid"])
 
     # https://files.atlas-scientific.com/Gravity-DO-datasheet.pdf
-    def __DO_percent_saturation(self):
+    def __to_DO_percent_saturation(self, raw):
         cal = self.__calibration["DO"]
-        mV = espadc.raw_to_voltage(self.__shared_memory.DO)
+        mV = espadc.raw_to_voltage(raw)
         return mV / cal * 100
 
     # Magic
-    def __DO_mg_L(self, water_temp, DO_percent_saturation):
+    def __to_DO_mg_L(self, water_temp, DO_percent_saturation):
         return (DO_percent_saturation / 100) * (
             14.641
             - 0.41022 * water_temp
@@ -72,13 +127,5 @@ class Sensors:
         )
 
     # https://www.analog.com/media/en/technical-documentation/data-sheets/DS18B20.pdf
-    def __ds18b20(self, raw):
+    def __to_celsius(self, raw):
         return raw / 16.0
-
-    def __modified(self):
-        return {
-            "pH": bool(self.__shared_memory.modified & (1 << 0)),
-            "DO": bool(self.__shared_memory.modified & (1 << 1)),
-            "air_temp": bool(self.__shared_memory.modified & (1 << 2)),
-            "water_temp": bool(self.__shared_memory.modified & (1 << 3)),
-        }
@@ -0,0 +1,11 @@
+# Offsets of the regions of alarm.sleep_memory used across deep sleep. Its
+# contents survive deep sleep but not a power cycle, so each region carries its
+# own magic number and is reset when it doesn't match.
+PROFILER_OFFSET = 0
+PROFILER_SLOTS = 64
+# A header and 16 bytes per slot, see profiler.py
+WIFI_OFFSET = PROFILER_OFFSET + 8 + PROFILER_SLOTS * 16
+# 30 bytes, see wifi_manager.py
+TIME_SYNC_OFFSET = WIFI_OFFSET + 30
+# 12 bytes, see time_sync.py
+DISPLAY_OFFSET = TIME_SYNC_OFFSET + 12
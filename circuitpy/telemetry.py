@@ -0,0 +1,71 @@
+from collections import namedtuple
+import struct
+
+# Bump when either format changes, see support/telemetry_decoder.py
+VERSION = 1
+# version, number of records, UTC timestamp the records' offsets are from
+HEADER_FORMAT = "<BBI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# seconds after the header's timestamp, pH, DO % saturation, DO mg/L, air temp,
+# water temp, modified mask
+RECORD_FORMAT = "<HhhhhhB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+MAX_RECORDS = 32
+
+# Fixed-point scale of each field, e.g. pH is sent in thousandths
+PH_SCALE = 1000
+DO_PERCENT_SATURATION_SCALE = 10
+DO_MG_L_SCALE = 100
+TEMP_SCALE = 100
+
+# A reading in fixed point, with an absolute UTC timestamp
+Record = namedtuple(
+    "Record",
+    [
+        "timestamp",
+        "pH",
+        "DO_percent_saturation",
+        "DO_mg_L",
+        "air_temp",
+        "water_temp",
+        "modified",
+    ],
+)
+
+
+# Rounds to fixed point, saturating at the limits of a signed 16-bit field
+def to_fixed(value, scale):
+    return max(-0x8000, min(int(round(value * scale)), 0x7FFF))
+
+
+# Packs records into frames of up to `max_records` through a single buffer. A
+# frame also ends early if a record is too far from its first to fit.
+class FrameEncoder:
+    def __init__(self, max_records=MAX_RECORDS):
+        self.__max_records = max_records
+        self.__buffer = bytearray(HEADER_SIZE + max_records * RECORD_SIZE)
+
+    def frames(self, records):
+        start = 0
+        while start < len(records):
+            yield self.__encode(records, start)
+            start += self.__buffer[1]
+
+    def __encode(self, records, start):
+        buffer = self.__buffer
+        base = records[start].timestamp
+        count = 0
+        for record in records[start : start + self.__max_records]:
+            offset = record.timestamp - base
+            if not 0 <= offset <= 0xFFFF:
+                break
+            struct.pack_into(
+                RECORD_FORMAT,
+                buffer,
+                HEADER_SIZE + count * RECORD_SIZE,
+                offset,
+                *record[1:],
+            )
+            count += 1
+        struct.pack_into(HEADER_FORMAT, buffer, 0, VERSION, count, base)
+        return bytes(memoryview(buffer)[: HEADER_SIZE + count * RECORD_SIZE])
@@ -0,0 +1,84 @@
+import alarm
+import struct
+import time
+from sleep_memory import TIME_SYNC_OFFSET
+
+MAGIC = 0x5453
+# magic, drift estimates so far, RTC time of the last sync, drift in ppm (how
+# far the RTC runs ahead of real time)
+STATE_FORMAT = "<HBxIf"
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+
+# Until two syncs have been far enough apart to estimate drift, assume the RTC
+# is this bad
+ASSUMED_DRIFT_PPM = 500
+# Added to the estimate, to cover its error and changes with temperature
+DRIFT_MARGIN_PPM = 20
+# Shorter intervals are dominated by the 1s resolution of the RTC and NTP
+MIN_ESTIMATE_INTERVAL = 3600
+MAX_SYNC_INTERVAL = 7 * 24 * 3600
+
+
+# Decides when the RTC needs setting from NTP again. Every sync compares the
+# RTC with NTP to estimate how fast it drifts, which predicts its error on
+# later wakes, so a sync is only worth its round trip once that prediction is
+# over the error budget.
+class TimeSync:
+    def __init__(self, budget=30, memory=None, offset=TIME_SYNC_OFFSET):
+        self.budget = budget
+        self.__memory = alarm.sleep_memory if memory is None else memory
+        self.__offset = offset
+        magic, self.samples, self.last_sync, self.drift_ppm = struct.unpack(
+            STATE_FORMAT, self.__memory[offset : offset + STATE_SIZE]
+        )
+        if magic != MAGIC:
+            self.samples = 0
+            self.last_sync = 0
+            self.drift_ppm = 0.0
+
+    # Seconds the RTC is likely to be off by now, or None if it was never set
+    def predicted_error(self):
+        if self.last_sync == 0:
+            return None
+        elapsed = max(time.time() - self.last_sync, 0)
+        if self.samples == 0:
+            drift_ppm = ASSUMED_DRIFT_PPM
+        else:
+            drift_ppm = abs(self.drift_ppm) + DRIFT_MARGIN_PPM
+        return elapsed * drift_ppm / 1_000_000
+
+    def needed(self):
+        error = self.predicted_error()
+        return (
+            error is None
+            or error > self.budget
+            or time.time() - self.last_sync > MAX_SYNC_INTERVAL
+        )
+
+    # Sets the RTC over `pool` and updates the drift estimate
+    def sync(self, pool, tz_offset=0):
+        # Most wakes only check whether a sync is needed
+        import adafruit_ntp
+        import rtc
+
+        ntp_time = adafruit_ntp.NTP(pool, tz_offset=tz_offset).datetime
+        rtc_seconds = time.time()
+        rtc.RTC().datetime = ntp_time
+        ntp_seconds = time.mktime(ntp_time)
+
+        elapsed = ntp_seconds - self.last_sync
+        if self.last_sync and elapsed >= MIN_ESTIMATE_INTERVAL:
+            drift_ppm = (rtc_seconds - ntp_seconds) / elapsed * 1_000_000
+            if self.samples == 0:
+                self.drift_ppm = drift_ppm
+            else:
+                self.drift_ppm += (drift_ppm - self.drift_ppm) / 2
+            self.samples = min(self.samples + 1, 0xFF)
+        self.last_sync = ntp_seconds
+        self.__write()
+        return rtc_seconds - ntp_seconds
+
+    def __write(self):
+        self.__memory[self.__offset : self.__offset + STATE_SIZE] = struct.pack(
+            STATE_FORMAT, MAGIC, self.samples, self.last_sync, self.drift_ppm
+        )
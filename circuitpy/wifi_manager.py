@@ -0,0 +1,169 @@
+import alarm
+import ipaddress
+import socketpool
+import struct
+import time
+from sleep_memory import WIFI_OFFSET
+
+# Loaded along with this module, which the wake path imports before anything
+# else allocates. Loading it into a fragmented heap can throw a MemoryError.
+import wifi
+
+MAGIC = 0x5746
+# magic, BSSID, channel, lease flag, address, netmask, gateway, DNS, latency
+# of the last connect in ms, attempts it took (0 if it gave up), whether the
+# cached access point was used
+STATE_FORMAT = "<H6sBB4s4s4s4sHBB"
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+
+# Connecting to a known BSSID and channel skips the scan, so it's either quick
+# or not going to work
+FAST_CONNECT_TIMEOUT = 2
+FULL_CONNECT_TIMEOUT = 8
+FULL_CONNECT_ATTEMPTS = 3
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 8
+
+
+# Remembers the access point (and optionally the DHCP lease) of the last good
+# connection in sleep memory, so the next wake can connect to it directly
+# instead of scanning every channel. Falls back to a full scan with a bounded
+# number of attempts and exponential backoff between them.
+class WiFiManager:
+    def __init__(self, reuse_lease=False, memory=None, offset=WIFI_OFFSET):
+        self.reuse_lease = reuse_lease
+        self.__memory = alarm.sleep_memory if memory is None else memory
+        self.__offset = offset
+        self.__socket_pool = None
+        (
+            magic,
+            self.__bssid,
+            self.__channel,
+            self.__has_lease,
+            self.__address,
+            self.__netmask,
+            self.__gateway,
+            self.__dns,
+            self.latency_ms,
+            self.attempts,
+            self.fast,
+        ) = struct.unpack(STATE_FORMAT, self.__memory[offset : offset + STATE_SIZE])
+        if magic != MAGIC:
+            self.forget()
+
+    # The pool connect() returns. It doesn't need a connection, so it can be
+    # allocated early and reused.
+    @property
+    def socket_pool(self):
+        if self.__socket_pool is None:
+            self.__socket_pool = socketpool.SocketPool(wifi.radio)
+        return self.__socket_pool
+
+    # Returns the socket pool, or None if every attempt failed
+    def connect(self, ssid, password):
+        radio = wifi.radio
+        start = time.monotonic_ns()
+        print(f"Connecting to WiFi network {ssid}...", end=" ")
+
+        if self.__channel and self.__try_fast_connect(radio, ssid, password):
+            self.__connected(radio, start, 1, True)
+            return self.socket_pool
+
+        delay = BACKOFF_INITIAL
+        for attempt in range(1, FULL_CONNECT_ATTEMPTS + 1):
+            try:
+                radio.connect(ssid, password, timeout=FULL_CONNECT_TIMEOUT)
+                self.__connected(radio, start, attempt, False)
+                return self.socket_pool
+            except Exception as e:
+                print("Exception encountered:", e)
+                if attempt == FULL_CONNECT_ATTEMPTS:
+                    break
+                print(f"Trying again in {delay}s ({attempt}/{FULL_CONNECT_ATTEMPTS})")
+                time.sleep(delay)
+                delay = min(delay * 2, BACKOFF_MAX)
+
+        print("Giving up!")
+        self.__record(self.__elapsed_ms(start), 0, False)
+        return None
+
+    # Forces the next connect to scan, e.g. after moving access points
+    def forget(self):
+        self.__bssid = bytes(6)
+        self.__channel = 0
+        self.__has_lease = 0
+        self.__address = self.__netmask = self.__gateway = self.__dns = bytes(4)
+        self.latency_ms = self.attempts = self.fast = 0
+        self.__write()
+
+    # "latency ms/attempts/fast or full" of the last connect
+    def summary(self):
+        return f"{self.latency_ms}/{self.attempts}/{'fast' if self.fast else 'full'}"
+
+    def __try_fast_connect(self, radio, ssid, password):
+        static = self.reuse_lease and self.__has_lease
+        if static:
+            radio.stop_dhcp()
+            radio.set_ipv4_address(
+                ipv4=ipaddress.IPv4Address(self.__address),
+                netmask=ipaddress.IPv4Address(self.__netmask),
+                gateway=ipaddress.IPv4Address(self.__gateway),
+                ipv4_dns=ipaddress.IPv4Address(self.__dns),
+            )
+        try:
+            radio.connect(
+                ssid,
+                password,
+                channel=self.__channel,
+                bssid=self.__bssid,
+                timeout=FAST_CONNECT_TIMEOUT,
+            )
+            return True
+        except Exception as e:
+            print("Cached access point failed:", e)
+            if static:
+                radio.start_dhcp()
+            # Kept in case the network is just down, a full scan that finds
+            # another access point replaces it
+            return False
+
+    def __connected(self, radio, start, attempts, fast):
+        ap_info = radio.ap_info
+        if ap_info is not None:
+            self.__bssid = bytes(ap_info.bssid)
+            self.__channel = ap_info.channel
+        if not fast or not self.__has_lease:
+            self.__has_lease = radio.ipv4_address is not None
+            if self.__has_lease:
+                self.__address = radio.ipv4_address.packed
+                self.__netmask = radio.ipv4_subnet.packed
+                self.__gateway = radio.ipv4_gateway.packed
+                self.__dns = radio.ipv4_dns.packed
+        latency_ms = self.__elapsed_ms(start)
+        print(f"Done! ({latency_ms} ms, {'fast' if fast else 'full'})")
+        self.__record(latency_ms, attempts, fast)
+
+    def __record(self, latency_ms, attempts, fast):
+        self.latency_ms = min(latency_ms, 0xFFFF)
+        self.attempts = attempts
+        self.fast = int(fast)
+        self.__write()
+
+    def __elapsed_ms(self, start):
+        return (time.monotonic_ns() - start) // 1_000_000
+
+    def __write(self):
+        self.__memory[self.__offset : self.__offset + STATE_SIZE] = struct.pack(
+            STATE_FORMAT,
+            MAGIC,
+            self.__bssid,
+            self.__channel,
+            self.__has_lease,
+            self.__address,
+            self.__netmask,
+            self.__gateway,
+            self.__dns,
+            self.latency_ms,
+            self.attempts,
+            self.fast,
+        )
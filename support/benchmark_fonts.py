@@ -0,0 +1,111 @@
+import argparse
+import glyph_atlas
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+project_root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+FONT_DIR = os.path.join(project_root, "circuitpy", "font")
+TEXTS = [
+    "pH: 7.0",
+    "DO: 98% (8.1 mg/L)",
+    "Temp (Air): 22C",
+    "Temp (Water): 25C",
+    "Updated: 11/14 9:05",
+]
+
+
+class FakeBitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.pixels = bytearray(width * height)
+
+    def __setitem__(self, xy, value):
+        x, y = xy
+        self.pixels[y * self.width + x] = value
+
+
+def load_glyph_font():
+    sys.modules["displayio"] = types.SimpleNamespace(Bitmap=FakeBitmap)
+    sys.modules["fontio"] = types.SimpleNamespace(Glyph=lambda *args: args)
+    sys.path.insert(0, os.path.join(project_root, "circuitpy"))
+    import glyph_font
+
+    return glyph_font.GlyphFont
+
+
+# Parses the whole BDF file and rasterizes every glyph the text uses, roughly
+# what adafruit_bitmap_font does when a font is loaded and then drawn
+def draw_bdf(path):
+    code_points = {ord(c) for text in TEXTS for c in text}
+    _, glyphs = glyph_atlas.read_bdf(path, code_points)
+    bitmaps = {}
+    for code_point, (width, height, _, _, _, _, rows) in glyphs.items():
+        bitmap = FakeBitmap(width, height, 2)
+        for y, row in enumerate(rows):
+            for x in range(width):
+                if row[x >> 3] & (0x80 >> (x & 7)):
+                    bitmap[x, y] = 1
+        bitmaps[code_point] = bitmap
+    return bitmaps
+
+
+def draw_atlas(font_class, path):
+    font = font_class(path)
+    for text in TEXTS:
+        font.load_glyphs(text)
+    return font
+
+
+def measure(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    elapsed = (time.perf_counter() - start) / number
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare loading the display fonts from BDF and from glyph atlases"
+    )
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    font_class = load_glyph_font()
+    print(f"{'font':<28}{'bytes':>8}{'ms':>10}{'peak KiB':>10}")
+    for name in sorted(os.listdir(FONT_DIR)):
+        if not name.endswith(".bdf"):
+            continue
+        bdf_path = os.path.join(FONT_DIR, name)
+        atlas = glyph_atlas.build_atlas(
+            *glyph_atlas.read_bdf(bdf_path, {ord(c) for c in glyph_atlas.GLYPHS})
+        )
+        atlas_path = os.path.join(
+            tempfile.gettempdir(), name[: -len(".bdf")] + ".glyphs"
+        )
+        with open(atlas_path, "wb") as f:
+            f.write(atlas)
+
+        for label, path, fn in (
+            ("bdf", bdf_path, lambda: draw_bdf(bdf_path)),
+            ("atlas", atlas_path, lambda: draw_atlas(font_class, atlas_path)),
+        ):
+            elapsed, peak = measure(fn, args.number)
+            print(
+                f"{name[:-4] + ' ' + label:<28}{os.path.getsize(path):>8}"
+                f"{elapsed * 1000:>10.2f}{peak / 1024:>10.1f}"
+            )
+        os.remove(atlas_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import builtins
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import time
+import tracemalloc
+import simulator
+from simulator import Simulator
+from simulator.scenarios import SCENARIOS
+
+# Modules each wake path must not import, so they don't creep back into it
+FORBIDDEN = {
+    "init": (
+        "adafruit_minimqtt.adafruit_minimqtt",
+        "button",
+        "display",
+        "sensors",
+    ),
+    "ulp_wake": ("adafruit_ntp", "button"),
+    "offline_replay": ("adafruit_ntp", "button"),
+    "calibrate_DO": (
+        "adafruit_minimqtt.adafruit_minimqtt",
+        "adafruit_ntp",
+        "display",
+        "publish_queue",
+        "wifi_manager",
+    ),
+    "calibrate_pH": (
+        "adafruit_minimqtt.adafruit_minimqtt",
+        "adafruit_ntp",
+        "display",
+        "publish_queue",
+        "wifi_manager",
+    ),
+}
+
+
+# Wraps __import__ to record the time and traced memory of each module's first
+# import, excluding the modules it imports in turn
+class ImportRecorder:
+    def __init__(self):
+        self.modules = {}
+        self.__stack = []
+        self.__host_import = None
+
+    def __enter__(self):
+        self.__host_import = builtins.__import__
+        builtins.__import__ = self.__import
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        tracemalloc.stop()
+        builtins.__import__ = self.__host_import
+
+    def __import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name in sys.modules:
+            return self.__host_import(name, globals, locals, fromlist, level)
+
+        self.__stack.append([0, 0])
+        memory_before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            return self.__host_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            memory_after, _ = tracemalloc.get_traced_memory()
+            memory = memory_after - memory_before
+            children_elapsed, children_memory = self.__stack.pop()
+            if self.__stack:
+                self.__stack[-1][0] += elapsed
+                self.__stack[-1][1] += memory
+            self.modules[name] = (
+                elapsed - children_elapsed,
+                memory - children_memory,
+            )
+
+
+def run(scenario):
+    with Simulator() as sim, contextlib.redirect_stdout(io.StringIO()):
+        boot = scenario(sim)
+        # Modules survive across boots on the host, but not across deep sleep
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None) or ""
+            if path.startswith(simulator.MODULES_DIR + os.sep):
+                del sys.modules[name]
+        # Fill the import system's directory caches and the compiler's internal
+        # state first, they're one-off host costs
+        importlib.util.find_spec("benchmark_imports_warm_up")
+        for path in os.listdir(simulator.CIRCUITPY_DIR):
+            if path.endswith(".py"):
+                with open(os.path.join(simulator.CIRCUITPY_DIR, path)) as f:
+                    compile(f.read(), path, "exec")
+        with ImportRecorder() as recorder:
+            boot()
+        return recorder.modules
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the modules each wake path of main.py imports"
+    )
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument(
+        "--all", action="store_true", help="also list standard library modules"
+    )
+    args = parser.parse_args()
+
+    violations = []
+    for name in args.scenarios:
+        modules = run(SCENARIOS[name])
+        print(f"{name:<36}{'ms':>8}{'KiB':>8}")
+        total_elapsed = total_memory = 0
+        for module, (elapsed, memory) in sorted(
+            modules.items(), key=lambda item: -item[1][0]
+        ):
+            total_elapsed += elapsed
+            total_memory += memory
+            if args.all or module.split(".")[0] not in sys.stdlib_module_names:
+                print(f"    {module:<32}{elapsed * 1000:8.2f}{memory / 1024:8.1f}")
+        print(f"    {'total':<32}{total_elapsed * 1000:8.2f}{total_memory / 1024:8.1f}")
+        violations += [
+            (name, module) for module in FORBIDDEN.get(name, ()) if module in modules
+        ]
+
+    for name, module in violations:
+        print(f"{name} imports {module}")
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
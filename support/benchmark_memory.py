@@ -0,0 +1,49 @@
+import argparse
+import contextlib
+import importlib
+import io
+import tracemalloc
+from simulator import Simulator
+from simulator.scenarios import SCENARIOS
+
+
+# Boots a wake path with MEMORY_BUDGET set and returns what the profiler
+# recorded for that boot, oldest phase first
+def run(scenario):
+    with Simulator() as sim, contextlib.redirect_stdout(io.StringIO()):
+        sim.config["MEMORY_BUDGET"] = True
+        boot = scenario(sim)
+        tracemalloc.start()
+        try:
+            boot()
+        finally:
+            tracemalloc.stop()
+        # A copy, as opening the profiler counts a wake
+        profiler = importlib.import_module("profiler").Profiler(
+            memory=bytearray(sim.sleep_memory)
+        )
+        wake = (profiler.wakes - 1) & 0xFF
+        return [record for record in profiler.records() if record[1] == wake]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the heap after each profiler phase of main.py's wake"
+        " paths under the simulator, in the order the phases end. Its heap doesn't"
+        " fragment, so the largest free block is only worth reading on the board,"
+        " see MEMORY_BUDGET in config.py.example."
+    )
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{'path':<16}{'phase':<13}{'ms':>7}{'alloc KiB':>11}{'free KiB':>10}")
+    for name in args.scenarios:
+        for phase, _, duration_ms, mem_free, mem_alloc, _ in run(SCENARIOS[name]):
+            print(
+                f"{name:<16}{phase:<13}{duration_ms:7}"
+                f"{mem_alloc / 1024:11.1f}{mem_free / 1024:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import importlib.util
+import os
+import struct
+import tempfile
+import timeit
+import minielf as minielf
+
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+
+LOOKUPS = [
+    "calibration_ready",
+    "debug",
+    "run_mode",
+    "modified",
+    "pH",
+    "DO",
+    "air_temp",
+    "water_temp",
+]
+
+
+class StringTableBuilder:
+    def __init__(self):
+        self.data = bytearray(b"\0")
+
+    def add(self, name):
+        offset = len(self.data)
+        self.data += name.encode() + b"\0"
+        return offset
+
+
+# Builds a synthetic ELF32 with a single PT_LOAD segment, `sections` PROGBITS
+# sections and `symbols` symbols spread across them. The names the builder
+# looks up are placed at the end of the symbol table (the worst case for a
+# linear scan).
+def synthesize_elf(sections, symbols):
+    ehsize = minielf.ElfHeader32.calcsize()
+    phentsize = minielf.HeaderTableEntry.calcsize()
+    shentsize = minielf.SectionHeader32.calcsize()
+    symentsize = minielf.SymbolTableEntry.calcsize()
+
+    shstrtab = StringTableBuilder()
+    strtab = StringTableBuilder()
+
+    body = bytearray()
+    offset = ehsize + phentsize
+    section_headers = [(0,) * 10]
+
+    code = bytes(range(16))
+    for i in range(sections):
+        section_headers.append(
+            (
+                shstrtab.add(f".text.fn{i}"),
+                SHT_PROGBITS,
+                6,
+                i * 16,
+                offset + len(body),
+                len(code),
+                0,
+                0,
+                4,
+                0,
+            )
+        )
+        body += code
+    load_size = len(body)
+
+    names = [f"sym_{i}" for i in range(symbols - len(LOOKUPS))] + LOOKUPS
+    symtab = bytearray(symentsize)
+    for i, name in enumerate(names):
+        symtab += struct.pack(
+            minielf.SymbolTableEntry._fmt,
+            strtab.add(name),
+            i * 4,
+            1,
+            0x11,
+            0,
+            1 + i % max(sections, 1),
+        )
+
+    strtab_index = len(section_headers) + 1
+    for name, sh_type, data, link, entsize in (
+        (".symtab", SHT_SYMTAB, symtab, strtab_index, symentsize),
+        (".strtab", SHT_STRTAB, strtab.data, 0, 0),
+        (".shstrtab", SHT_STRTAB, None, 0, 0),
+    ):
+        name_offset = shstrtab.add(name)
+        if data is None:
+            data = shstrtab.data
+        section_headers.append(
+            (
+                name_offset,
+                sh_type,
+                0,
+                0,
+                offset + len(body),
+                len(data),
+                link,
+                0,
+                4,
+                entsize,
+            )
+        )
+        body += data
+
+    shoff = offset + len(body)
+    header = struct.pack(
+        minielf.ElfHeader32._fmt,
+        b"\177ELF\1\1\1" + b"\0" * 9,
+        2,
+        243,
+        1,
+        0,
+        ehsize,
+        shoff,
+        0,
+        ehsize,
+        phentsize,
+        1,
+        shentsize,
+        len(section_headers),
+        len(section_headers) - 1,
+    )
+    program_header = struct.pack(
+        minielf.HeaderTableEntry._fmt,
+        minielf.PT_LOAD,
+        offset,
+        0,
+        0,
+        load_size,
+        load_size,
+        5,
+        4,
+    )
+    out = bytearray(header + program_header + body)
+    for sh in section_headers:
+        out += struct.pack(minielf.SectionHeader32._fmt, *sh)
+    return bytes(out)
+
+
+# The same work ULPBuilder does: find the code segment and resolve exports.
+# `module` is minielf, or a copy of it from an earlier revision.
+def load(module, elf):
+    code_header = elf.get_header_by_type(module.PT_LOAD)
+    symtab = elf.get_section_by_name(".symtab")
+    code = bytes(elf.pread(code_header.p_offset, code_header.p_filesz))
+    if hasattr(symtab, "get_symbols_by_name"):
+        symbols = symtab.get_symbols_by_name(LOOKUPS)
+    else:
+        symbols = {name: symtab.get_first_symbol_by_name(name) for name in LOOKUPS}
+    assert all(symbols.values())
+    return code, symbols
+
+
+def bench_stream(module, path):
+    with open(path, "rb") as f:
+        load(module, module.ELFFile(f))
+
+
+def bench_bytes(module, path):
+    with open(path, "rb") as f:
+        load(module, module.ELFFile(f.read()))
+
+
+def run(path, number, baseline):
+    modes = [("stream", minielf, bench_stream), ("bytes", minielf, bench_bytes)]
+    if baseline is not None:
+        modes.insert(0, ("baseline", baseline, bench_stream))
+    for label, module, fn in modes:
+        elapsed = min(timeit.repeat(lambda: fn(module, path), number=number, repeat=3))
+        print(f"  {label:<10}{elapsed / number * 1000:10.3f} ms")
+
+
+def load_baseline(path):
+    spec = importlib.util.spec_from_file_location("minielf_baseline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare minielf stream and buffer modes, and optionally an"
+        " earlier minielf"
+    )
+    parser.add_argument("elf", nargs="?", help="benchmark an existing ELF instead")
+    parser.add_argument(
+        "--baseline",
+        help="path to an earlier minielf.py to compare against, e.g. the output"
+        " of `git show <rev>:support/minielf.py`",
+    )
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+    baseline = load_baseline(args.baseline) if args.baseline else None
+
+    if args.elf:
+        print(f"{args.elf} ({os.path.getsize(args.elf)} bytes)")
+        run(args.elf, args.number, baseline)
+        return
+
+    for sections, symbols in ((16, 256), (256, 4096), (1024, 32768)):
+        with tempfile.NamedTemporaryFile(suffix=".elf") as f:
+            f.write(synthesize_elf(sections, symbols))
+            f.flush()
+            print(f"{sections} sections, {symbols} symbols ({f.tell()} bytes)")
+            run(f.name, args.number, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import ulp_builder
+
+HARNESS_DIR = os.path.join(ulp_builder.project_root, "support", "ulp_host")
+ULP_DIR = os.path.join(ulp_builder.project_root, "ulp")
+DAY = 24 * 3600
+# Seconds between rows of the synthetic traces
+TRACE_PERIOD = 60
+
+# Raw units: ADC counts for pH and DO, 1/16ths of a degree C for temperatures.
+# A pH of 7 reads about 4800, see PH_THRESHOLD in ulp/main.c.
+PH_PER_UNIT = 565
+DO_RAW = 2000
+DO_PER_MG_L = 120
+TEMP_PER_DEGREE = 16
+
+
+def diurnal(seconds, peak_hour=15):
+    return math.cos((seconds / 3600 - peak_hour) / 24 * 2 * math.pi)
+
+
+# Water that barely moves, everything seen is ADC noise
+def steady(days, rng):
+    for seconds in range(0, days * DAY + 1, TRACE_PERIOD):
+        yield seconds, 4800, DO_RAW, 22 * TEMP_PER_DEGREE, 25 * TEMP_PER_DEGREE
+
+
+# A planted tank over a day: photosynthesis raises pH and DO through the
+# afternoon and the air swings far more than the water
+def day_cycle(days, rng):
+    for seconds in range(0, days * DAY + 1, TRACE_PERIOD):
+        cycle = diurnal(seconds)
+        yield (
+            seconds,
+            4800 + 0.15 * PH_PER_UNIT * cycle,
+            DO_RAW + 1.0 * DO_PER_MG_L * cycle,
+            (22 + 4 * cycle + rng.gauss(0, 0.1)) * TEMP_PER_DEGREE,
+            (25 + 0.75 * diurnal(seconds, 18)) * TEMP_PER_DEGREE,
+        )
+
+
+# The day cycle with a CO2 dump each afternoon, crashing pH and DO within
+# minutes before they recover over a couple of hours
+def crash(days, rng):
+    for seconds, pH, DO, air_temp, water_temp in day_cycle(days, rng):
+        since = seconds % DAY - 14 * 3600
+        if since >= 0:
+            drop = min(since / 600, 1) * math.exp(-since / 5400)
+            pH -= 0.6 * PH_PER_UNIT * drop
+            DO -= 3 * DO_PER_MG_L * drop
+        yield seconds, pH, DO, air_temp, water_temp
+
+
+# The day cycle with the air probe outside on a winter night, so it reads below
+# freezing, which the DS18B20s report as negative values
+def frost(days, rng):
+    for seconds, pH, DO, air_temp, water_temp in day_cycle(days, rng):
+        yield seconds, pH, DO, air_temp - 24 * TEMP_PER_DEGREE, water_temp
+
+
+TRACES = {"steady": steady, "day_cycle": day_cycle, "crash": crash, "frost": frost}
+
+
+def write_trace(path, rows):
+    with open(path, "w") as f:
+        f.write("seconds,pH,DO,air_temp,water_temp\n")
+        for row in rows:
+            f.write(",".join(f"{value:.2f}" for value in row) + "\n")
+
+
+# Builds ulp/main.c against the stand-in HAL for the host
+def build(out_path, cc="gcc", defines=()):
+    subprocess.run(
+        [
+            cc,
+            "-O2",
+            "-Wall",
+            "-I",
+            os.path.join(HARNESS_DIR, "include"),
+            "-I",
+            ULP_DIR,
+            *(f"-D{define}" for define in defines),
+            os.path.join(HARNESS_DIR, "harness.c"),
+            "-o",
+            out_path,
+            "-lm",
+        ],
+        check=True,
+    )
+
+
+def replay(harness_path, trace_path, args):
+    output = subprocess.run(
+        [
+            harness_path,
+            "-n",
+            str(args.adc_noise),
+            "-e",
+            str(args.crc_error_rate),
+            "-c",
+            str(args.calibrate),
+            "-r",
+            str(args.seed),
+            *(["-x", str(args.swap_probe)] if args.swap_probe is not None else []),
+            *(["-p"] if args.parasite else []),
+            trace_path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return dict(line.split("=", 1) for line in output.splitlines())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay sensor traces through ulp/main.c built for the host and"
+        " report what it costs per simulated day"
+    )
+    parser.add_argument(
+        "traces",
+        nargs="*",
+        default=list(TRACES),
+        help=f"synthetic traces ({', '.join(TRACES)}) or CSV files of raw values",
+    )
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--adc-noise", type=int, default=4, help="± ADC counts")
+    parser.add_argument("--crc-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--calibrate", type=float, default=0, help="seconds of calibration first"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--swap-probe",
+        type=int,
+        choices=(0, 1),
+        help="swap the air (0) or water (1) probe for one the firmware doesn't know",
+    )
+    parser.add_argument(
+        "--parasite",
+        action="store_true",
+        help="parasite power the DS18B20s, so conversions are waited out",
+    )
+    parser.add_argument("--cc", default="gcc")
+    parser.add_argument(
+        "-D",
+        dest="defines",
+        action="append",
+        default=[],
+        help="define a macro when building, e.g. -D NAME=VALUE",
+    )
+    args = parser.parse_args()
+    # A DEBUG build waits for main.py to resume it after every update, see
+    # support/ulp_host/harness.c
+    if any(define.split("=")[0] == "DEBUG" for define in args.defines):
+        parser.error("a DEBUG build can't be benchmarked")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        harness_path = os.path.join(tmp, "ulp_host")
+        build(harness_path, args.cc, args.defines)
+
+        print(
+            f"{'trace':<16}{'wakes':>8}{'updates':>9}{'readings':>10}{'ADC':>9}"
+            f"{'1-Wire':>8}{'active s':>10}  changes pH/DO/air/water per day"
+        )
+        for name in args.traces:
+            if name in TRACES:
+                trace_path = os.path.join(tmp, f"{name}.csv")
+                write_trace(
+                    trace_path, TRACES[name](args.days, random.Random(args.seed))
+                )
+            elif os.path.exists(name):
+                trace_path = name
+            else:
+                sys.exit(f"No trace named {name}")
+
+            result = replay(harness_path, trace_path, args)
+            days = float(result["seconds"]) / DAY
+            per_day = lambda key: float(result[key]) / days
+            changes = "/".join(
+                f"{int(count) / days:.0f}" for count in result["modified"].split(",")
+            )
+            print(
+                f"{os.path.basename(name):<16}{per_day('wakes'):8.1f}"
+                f"{per_day('updates'):9.0f}{per_day('readings'):10.0f}"
+                f"{per_day('adc_reads'):9.0f}{per_day('onewire_resets'):8.0f}"
+                f"{per_day('active_seconds'):10.1f}  {changes}"
+            )
+            if args.calibrate:
+                print(
+                    f"{'':<16}calibration: DO {result['calibration_DO']}"
+                    f"{'' if result['calibration_stable'] == '1' else ' (timed out)'}"
+                    f" after {float(result['calibration_seconds']):.1f} s,"
+                    f" {result['calibration_adc_reads']} ADC reads"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import struct
+import timeit
+import tracemalloc
+import ulp_builder
+
+
+def measure(label, source, number):
+    tracemalloc.start()
+    compile(source, "ulp.py", "exec")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    elapsed = min(
+        timeit.repeat(
+            lambda: compile(source, "ulp.py", "exec"), number=number, repeat=3
+        )
+    )
+    print(
+        f"  {label:<8}{len(source):8} bytes{elapsed / number * 1000:10.3f} ms"
+        f"{peak / 1024:10.1f} KiB peak"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare ulp.py with the program inlined against loading ulp.bin"
+    )
+    parser.add_argument(
+        "--source", default=os.path.join(ulp_builder.project_root, "ulp/main.c")
+    )
+    parser.add_argument(
+        "--elf", default=os.path.join(ulp_builder.project_root, "build/ulp")
+    )
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    builder = ulp_builder.ULPBuilder(args.source, args.elf)
+    source = builder.render_python_code()
+    header_size = struct.calcsize(ulp_builder.FIRMWARE_HEADER_FORMAT)
+    code = builder.get_firmware()[header_size:]
+
+    # Before ulp.bin the program was a bytes literal inside ULP.start
+    inline_source = f"{source}\nCODE = {code!r}\n"
+
+    print(f"{args.elf} ({len(code)} bytes of code)")
+    measure("inline", inline_source, args.number)
+    measure("ulp.bin", source, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from simulator import Simulator
+from simulator.scenarios import SCENARIOS
+
+
+def run(scenario, profile=None, trace_memory=False):
+    with Simulator() as sim, contextlib.redirect_stdout(io.StringIO()):
+        boot = scenario(sim)
+        counters = sim.counters.copy()
+        started_at = sim.clock.now
+        if trace_memory:
+            tracemalloc.start()
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        boot()
+        elapsed = time.perf_counter() - start
+        if profile is not None:
+            profile.disable()
+        peak = 0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return {
+            "wall": elapsed,
+            "awake": sim.clock.now - started_at,
+            "peak": peak,
+            "counters": sim.counters - counters,
+        }
+
+
+def measure(scenario, repeat):
+    wall = min(run(scenario)["wall"] for _ in range(repeat))
+    result = run(scenario, trace_memory=True)
+    profile = cProfile.Profile()
+    run(scenario, profile=profile)
+    calls = pstats.Stats(profile).total_calls
+    return wall, calls, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run each wake path of main.py under the simulator"
+    )
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--counters", action="store_true", help="also print simulated hardware calls"
+    )
+    args = parser.parse_args()
+
+    print(f"{'path':<14}{'wall ms':>10}{'calls':>10}{'peak KiB':>10}{'awake s':>10}")
+    for name in args.scenarios:
+        wall, calls, result = measure(SCENARIOS[name], args.repeat)
+        print(
+            f"{name:<14}{wall * 1000:10.2f}{calls:10}"
+            f"{result['peak'] / 1024:10.1f}{result['awake']:10.2f}"
+        )
+        if args.counters:
+            for counter, n in sorted(result["counters"].items()):
+                print(f"    {counter:<30}{n:8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import struct
+
+# Every character the display renders, see circuitpy/display.py
+GLYPHS = " 0123456789.-%()/:CpHDOmgLTeAirWatUd"
+
+# Must match circuitpy/glyph_font.py
+MAGIC = b"GLYF"
+VERSION = 2
+# magic, version, glyph count, bounding box width, height, x and y offset,
+# ascent and descent
+HEADER_FORMAT = "<4sBBBBbbBB"
+# code point, width, height, x and y offset, x and y shift, offset of the
+# bitmap in the file. Bitmaps are 1 bit per pixel, each row padded to a byte.
+ENTRY_FORMAT = "<HBBbbbbH"
+
+
+# The font's metrics, as its bounding box's (width, height, dx, dy) followed by
+# its ascent and descent, and its rasterized glyphs, as
+# {code point: (width, height, dx, dy, shift_x, shift_y, rows)} where rows are
+# the packed bitmap rows as bytes
+def read_bdf(path, code_points=None):
+    glyphs = {}
+    bounding_box = None
+    ascent = descent = None
+    with open(path, "r") as f:
+        lines = iter(f)
+        for line in lines:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == "FONTBOUNDINGBOX":
+                bounding_box = tuple(int(value) for value in fields[1:5])
+            elif fields[0] == "FONT_ASCENT":
+                ascent = int(fields[1])
+            elif fields[0] == "FONT_DESCENT":
+                descent = int(fields[1])
+            elif fields[0] == "STARTCHAR":
+                code_point = None
+                shift = (0, 0)
+                bbx = (0, 0, 0, 0)
+                for line in lines:
+                    fields = line.split()
+                    if fields[0] == "ENCODING":
+                        code_point = int(fields[1])
+                    elif fields[0] == "DWIDTH":
+                        shift = (int(fields[1]), int(fields[2]))
+                    elif fields[0] == "BBX":
+                        bbx = tuple(int(value) for value in fields[1:5])
+                    elif fields[0] == "BITMAP":
+                        break
+                width, height, dx, dy = bbx
+                row_bytes = (width + 7) // 8
+                rows = []
+                for line in lines:
+                    if line.startswith("ENDCHAR"):
+                        break
+                    # BDF pads rows to whole bytes too, but may pad further
+                    rows.append(bytes.fromhex(line.strip())[:row_bytes])
+                if code_points is None or code_point in code_points:
+                    glyphs[code_point] = (width, height, dx, dy, *shift, rows)
+    # BDF doesn't require either, the bounding box is the next best guess
+    _, height, _, dy = bounding_box
+    if ascent is None:
+        ascent = height + dy
+    if descent is None:
+        descent = -dy
+    return (*bounding_box, ascent, descent), glyphs
+
+
+def build_atlas(metrics, glyphs):
+    code_points = sorted(glyphs)
+    header_size = struct.calcsize(HEADER_FORMAT)
+    entry_size = struct.calcsize(ENTRY_FORMAT)
+
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(code_points), *metrics)
+    entries = b""
+    bitmaps = b""
+    for code_point in code_points:
+        width, height, dx, dy, shift_x, shift_y, rows = glyphs[code_point]
+        offset = header_size + len(code_points) * entry_size + len(bitmaps)
+        entries += struct.pack(
+            ENTRY_FORMAT, code_point, width, height, dx, dy, shift_x, shift_y, offset
+        )
+        bitmaps += b"".join(rows)
+    return header + entries + bitmaps
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rasterize the glyphs the display uses from a BDF font"
+    )
+    parser.add_argument("bdf_path")
+    parser.add_argument("out_path")
+    parser.add_argument("--glyphs", default=GLYPHS)
+    args = parser.parse_args()
+
+    metrics, glyphs = read_bdf(args.bdf_path, {ord(c) for c in args.glyphs})
+    missing = set(args.glyphs) - {chr(code_point) for code_point in glyphs}
+    if missing:
+        print(f"Not in {args.bdf_path}: {''.join(sorted(missing))}")
+
+    atlas = build_atlas(metrics, glyphs)
+    with open(args.out_path, "wb") as f:
+        f.write(atlas)
+    print(f"Generated {os.path.basename(args.out_path)} ({len(atlas)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
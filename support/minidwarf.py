@@ -0,0 +1,324 @@
+import struct
+from collections import namedtuple
+
+# Just enough of DWARF 2 to 5 to find the types of an ELF file's global
+# variables, see read_variable_types. Only 32-bit DWARF is supported.
+
+DW_TAG_array_type = 0x01
+DW_TAG_enumeration_type = 0x04
+DW_TAG_pointer_type = 0x0F
+DW_TAG_compile_unit = 0x11
+DW_TAG_structure_type = 0x13
+DW_TAG_typedef = 0x16
+DW_TAG_union_type = 0x17
+DW_TAG_subrange_type = 0x21
+DW_TAG_base_type = 0x24
+DW_TAG_const_type = 0x26
+DW_TAG_variable = 0x34
+DW_TAG_volatile_type = 0x35
+DW_TAG_restrict_type = 0x37
+DW_TAG_atomic_type = 0x47
+
+DW_AT_name = 0x03
+DW_AT_byte_size = 0x0B
+DW_AT_upper_bound = 0x2F
+DW_AT_count = 0x37
+DW_AT_declaration = 0x3C
+DW_AT_encoding = 0x3E
+DW_AT_specification = 0x47
+DW_AT_type = 0x49
+
+DW_ATE_boolean = 0x02
+DW_ATE_float = 0x04
+DW_ATE_signed = 0x05
+DW_ATE_signed_char = 0x06
+DW_ATE_unsigned = 0x07
+DW_ATE_unsigned_char = 0x08
+
+# Types that only qualify or rename the type they refer to
+TRANSPARENT_TAGS = (
+    DW_TAG_typedef,
+    DW_TAG_const_type,
+    DW_TAG_volatile_type,
+    DW_TAG_restrict_type,
+    DW_TAG_atomic_type,
+)
+
+# Struct codes of base types by encoding and size, limited to those
+# CircuitPython's struct supports, so bools are bytes
+BASE_TYPE_CODES = {
+    DW_ATE_boolean: {1: "B"},
+    DW_ATE_float: {4: "f", 8: "d"},
+    DW_ATE_signed: {1: "b", 2: "h", 4: "i", 8: "q"},
+    DW_ATE_signed_char: {1: "b"},
+    DW_ATE_unsigned: {1: "B", 2: "H", 4: "I", 8: "Q"},
+    DW_ATE_unsigned_char: {1: "B"},
+}
+
+# Forms of a fixed size, in bytes, given 32-bit DWARF and 4-byte addresses
+FIXED_FORM_SIZES = {
+    0x01: 4,  # addr
+    0x05: 2,  # data2
+    0x06: 4,  # data4
+    0x07: 8,  # data8
+    0x0B: 1,  # data1
+    0x0C: 1,  # flag
+    0x0E: 4,  # strp
+    0x10: 4,  # ref_addr
+    0x11: 1,  # ref1
+    0x12: 2,  # ref2
+    0x13: 4,  # ref4
+    0x14: 8,  # ref8
+    0x17: 4,  # sec_offset
+    0x19: 0,  # flag_present
+    0x1C: 4,  # ref_sup4
+    0x1D: 4,  # strp_sup
+    0x1E: 16,  # data16
+    0x1F: 4,  # line_strp
+    0x20: 8,  # ref_sig8
+    0x24: 8,  # ref_sup8
+    0x25: 1,  # strx1
+    0x26: 2,  # strx2
+    0x27: 3,  # strx3
+    0x28: 4,  # strx4
+    0x29: 1,  # addrx1
+    0x2A: 2,  # addrx2
+    0x2B: 3,  # addrx3
+    0x2C: 4,  # addrx4
+    0x1F20: 4,  # GNU_ref_alt
+    0x1F21: 4,  # GNU_strp_alt
+}
+# Forms holding a ULEB128
+ULEB_FORMS = (0x0F, 0x15, 0x1A, 0x1B, 0x22, 0x23, 0x1F01, 0x1F02)
+# Forms holding an offset into the unit, which are turned into section offsets
+UNIT_REF_FORMS = (0x11, 0x12, 0x13, 0x14, 0x15)
+FORM_SDATA = 0x0D
+FORM_STRING = 0x08
+FORM_STRP = 0x0E
+FORM_LINE_STRP = 0x1F
+FORM_INDIRECT = 0x16
+FORM_IMPLICIT_CONST = 0x21
+# Forms with a ULEB128 or fixed length followed by that many bytes
+BLOCK_FORMS = {0x09: None, 0x18: None, 0x0A: 1, 0x03: 2, 0x04: 4}
+
+# A variable's type: the struct code of its elements (None for structs and
+# anything else struct can't read), their size, and their number if it's an
+# array (0 otherwise). Arrays of arrays are flattened.
+VariableType = namedtuple("VariableType", ["code", "size", "length"])
+
+_Die = namedtuple("_Die", ["tag", "attributes", "subranges"])
+
+
+def read_uleb128(data, offset):
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return result, offset
+
+
+def read_sleb128(data, offset):
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                result -= 1 << shift
+            return result, offset
+
+
+def _read_string(data, offset):
+    end = data.index(b"\0", offset)
+    return bytes(data[offset:end]).decode(), end + 1
+
+
+# Maps the names of the global variables in `elf`, a minielf.ELFFile, to their
+# VariableType. Returns None if it has no debug information.
+def read_variable_types(elf):
+    info = _read_section(elf, ".debug_info")
+    abbrev = _read_section(elf, ".debug_abbrev")
+    if info is None or abbrev is None:
+        return None
+    strings = {
+        FORM_STRP: _read_section(elf, ".debug_str"),
+        FORM_LINE_STRP: _read_section(elf, ".debug_line_str"),
+    }
+
+    dies = {}
+    variables = []
+    offset = 0
+    while offset < len(info):
+        offset = _read_unit(info, abbrev, strings, offset, dies, variables)
+
+    types = {}
+    for die in variables:
+        attributes = die.attributes
+        if DW_AT_specification in attributes:
+            attributes = dict(dies[attributes[DW_AT_specification]].attributes)
+            attributes.update(die.attributes)
+        name = attributes.get(DW_AT_name)
+        if name is None or attributes.get(DW_AT_declaration):
+            continue
+        variable_type = _resolve_type(dies, attributes.get(DW_AT_type))
+        if variable_type is not None:
+            types[name] = variable_type
+    return types
+
+
+def _read_section(elf, name):
+    section = elf.get_section_by_name(name)
+    if section is None:
+        return None
+    return bytes(section.readat(0, section._header.sh_size))
+
+
+def _read_abbreviations(abbrev, offset):
+    abbreviations = {}
+    while True:
+        code, offset = read_uleb128(abbrev, offset)
+        if code == 0:
+            return abbreviations
+        tag, offset = read_uleb128(abbrev, offset)
+        has_children = abbrev[offset]
+        offset += 1
+        specs = []
+        while True:
+            attribute, offset = read_uleb128(abbrev, offset)
+            form, offset = read_uleb128(abbrev, offset)
+            if attribute == 0 and form == 0:
+                break
+            implicit_const = None
+            if form == FORM_IMPLICIT_CONST:
+                implicit_const, offset = read_sleb128(abbrev, offset)
+            specs.append((attribute, form, implicit_const))
+        abbreviations[code] = (tag, has_children, specs)
+
+
+# Reads the unit at `offset` into `dies`, keyed by section offset, and appends
+# its file scope variables to `variables`. Returns the offset of the next unit.
+def _read_unit(info, abbrev, strings, offset, dies, variables):
+    unit_start = offset
+    (unit_length,) = struct.unpack_from("<I", info, offset)
+    if unit_length >= 0xFFFFFFF0:
+        raise ValueError("64-bit DWARF is not supported")
+    end = offset + 4 + unit_length
+    (version,) = struct.unpack_from("<H", info, offset + 4)
+    if version >= 5:
+        unit_type, address_size, abbrev_offset = struct.unpack_from(
+            "<BBI", info, offset + 6
+        )
+        offset += 12
+        # Skeleton and split units carry an ID, type units a signature and offset
+        offset += {1: 0, 2: 12, 3: 0, 4: 8, 5: 8, 6: 12}.get(unit_type, 0)
+    else:
+        abbrev_offset, address_size = struct.unpack_from("<IB", info, offset + 6)
+        offset += 11
+    if address_size != 4:
+        raise ValueError(f"Unsupported address size {address_size}")
+    abbreviations = _read_abbreviations(abbrev, abbrev_offset)
+
+    # The enclosing DIEs of the one being read, None for ones without children
+    parents = []
+    while offset < end:
+        die_offset = offset
+        code, offset = read_uleb128(info, offset)
+        if code == 0:
+            if parents:
+                parents.pop()
+            continue
+        tag, has_children, specs = abbreviations[code]
+        attributes = {}
+        for attribute, form, implicit_const in specs:
+            value, offset = _read_form(
+                info, strings, offset, form, implicit_const, unit_start
+            )
+            attributes[attribute] = value
+        die = _Die(tag, attributes, [])
+        dies[die_offset] = die
+
+        parent = parents[-1] if parents else None
+        if tag == DW_TAG_subrange_type and parent is not None:
+            parent.subranges.append(attributes)
+        elif tag == DW_TAG_variable and len(parents) == 1:
+            variables.append(die)
+        if has_children:
+            parents.append(die)
+    return end
+
+
+def _read_form(info, strings, offset, form, implicit_const, unit_start):
+    if form == FORM_INDIRECT:
+        form, offset = read_uleb128(info, offset)
+    if form == FORM_IMPLICIT_CONST:
+        return implicit_const, offset
+    if form == FORM_STRING:
+        return _read_string(info, offset)
+    if form in (FORM_STRP, FORM_LINE_STRP):
+        (string_offset,) = struct.unpack_from("<I", info, offset)
+        table = strings[form]
+        value = None if table is None else _read_string(table, string_offset)[0]
+        return value, offset + 4
+    if form == FORM_SDATA:
+        return read_sleb128(info, offset)
+    if form in ULEB_FORMS:
+        value, offset = read_uleb128(info, offset)
+    elif form in FIXED_FORM_SIZES:
+        size = FIXED_FORM_SIZES[form]
+        value = int.from_bytes(info[offset : offset + size], "little")
+        offset += size
+    elif form in BLOCK_FORMS:
+        size = BLOCK_FORMS[form]
+        if size is None:
+            length, offset = read_uleb128(info, offset)
+        else:
+            length = int.from_bytes(info[offset : offset + size], "little")
+            offset += size
+        return None, offset + length
+    else:
+        raise ValueError(f"Unsupported DWARF form {form:#x}")
+    if form in UNIT_REF_FORMS:
+        value += unit_start
+    return value, offset
+
+
+def _resolve_type(dies, offset):
+    die = dies.get(offset)
+    if die is None:
+        return None
+    tag, attributes = die.tag, die.attributes
+    if tag in TRANSPARENT_TAGS:
+        return _resolve_type(dies, attributes.get(DW_AT_type))
+    size = attributes.get(DW_AT_byte_size)
+    if tag == DW_TAG_base_type:
+        code = BASE_TYPE_CODES.get(attributes.get(DW_AT_encoding), {}).get(size)
+        return VariableType(code, size, 0)
+    if tag == DW_TAG_enumeration_type:
+        underlying = _resolve_type(dies, attributes.get(DW_AT_type))
+        if underlying is not None:
+            return underlying
+        return VariableType(BASE_TYPE_CODES[DW_ATE_unsigned].get(size), size, 0)
+    if tag == DW_TAG_pointer_type:
+        return VariableType("I", 4, 0)
+    if tag in (DW_TAG_structure_type, DW_TAG_union_type):
+        return VariableType(None, size, 0)
+    if tag == DW_TAG_array_type:
+        element = _resolve_type(dies, attributes.get(DW_AT_type))
+        if element is None:
+            return None
+        length = max(element.length, 1)
+        for subrange in die.subranges:
+            if DW_AT_count in subrange:
+                length *= subrange[DW_AT_count]
+            elif DW_AT_upper_bound in subrange:
+                length *= subrange[DW_AT_upper_bound] + 1
+            else:
+                # A flexible array member, or an extern array of unknown size
+                return None
+        return VariableType(element.code, element.size, length)
+    return None
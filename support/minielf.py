@@ -11,6 +11,10 @@ class StructMixin:
     def frombuffer(cls, buf):
         return cls(*struct.unpack(cls._fmt, buf))
 
+    @classmethod
+    def iterbuffer(cls, buf):
+        return map(cls._make, struct.iter_unpack(cls._fmt, buf))
+
 
 _ElfHeader32 = namedtuple(
     "_ElfHeader32",
@@ -49,24 +53,27 @@ class Section:
 
 
 class StringTable(Section):
+    def __init__(self, ef, sh):
+        super().__init__(ef, sh)
+        self._data = None
+
+    # The whole table is read on first use, names are then sliced out of memory
+    def get_data(self):
+        if self._data is None:
+            self._data = bytes(
+                self._elffile.read_table(self._header.sh_offset, self._header.sh_size)
+            )
+        return self._data
+
     def symbolat(self, offset):
-        result = b""
-        stream = self._elffile.stream
-        stream.seek(self._header.sh_offset + offset)
-        while (c := stream.read(1)) != b"\0" and c != b"":
-            result += c
-        return result
+        data = self.get_data()
+        end = data.find(b"\0", offset)
+        if end == -1:
+            end = len(data)
+        return data[offset:end]
 
     def symbolat_matches(self, offset, name):
-        stream = self._elffile.stream
-        stream.seek(self._header.sh_offset + offset)
-        name1 = stream.read(len(name))
-        if name1 != name:
-            return False
-        nul = stream.read(1)
-        if nul != b"\0":
-            return False
-        return True
+        return self.get_data().startswith(name + b"\0", offset)
 
 
 _SymbolTableEntry = namedtuple(
@@ -79,30 +86,68 @@ class SymbolTableEntry(_SymbolTableEntry, StructMixin):
     _fmt = "<3l2bh"
 
 
-class Symbol:
-    def __init__(self, name, entry):
-        self.name = name
-        self.entry = entry
+_Symbol = namedtuple("_Symbol", ["name", "entry"])
+
+
+class Symbol(_Symbol):
+    @property
+    def st_value(self):
+        return self.entry.st_value
+
+    @property
+    def st_size(self):
+        return self.entry.st_size
+
+    @property
+    def st_shndx(self):
+        return self.entry.st_shndx
 
 
 class SymbolTable(Section):
     def __init__(self, ef, sh):
         super().__init__(ef, sh)
         self.strtab = None
+        self._index = None
 
     def iter_symbols(self):
-        for i in range(0, self._header.sh_size, SymbolTableEntry.calcsize()):
-            yield self.constructat(i, SymbolTableEntry)
+        entsize = self._header.sh_entsize or SymbolTableEntry.calcsize()
+        return iter(
+            self._elffile.construct_table(
+                self._header.sh_offset,
+                self._header.sh_size // entsize,
+                entsize,
+                SymbolTableEntry,
+            )
+        )
 
     def get_first_symbol_by_name(self, name):
         if not isinstance(name, bytes):
             name = name.encode()
-        if self.strtab is None:
-            self.strtab = self._elffile.get_section_by_name(".strtab")
-        strtab = self.strtab
-        for sy in self.iter_symbols():
-            if strtab.symbolat_matches(sy.st_name, name):
-                return Symbol(name, sy)
+        return self.get_index().get(name)
+
+    def get_symbols_by_name(self, names):
+        index = self.get_index()
+        return {
+            name: index.get(name if isinstance(name, bytes) else name.encode())
+            for name in names
+        }
+
+    # Maps each name to the first symbol with that name. Built in a single pass
+    # over the table on first use so repeated lookups don't rescan it.
+    def get_index(self):
+        if self._index is None:
+            if self.strtab is None:
+                self.strtab = self._elffile.get_section(self._header.sh_link)
+            strtab = self.strtab
+            index = {}
+            for sy in self.iter_symbols():
+                if sy.st_name == 0:
+                    continue
+                name = strtab.symbolat(sy.st_name)
+                if name not in index:
+                    index[name] = Symbol(name, sy)
+            self._index = index
+        return self._index
 
 
 section_constructors = {
@@ -132,16 +177,36 @@ class HeaderTableEntry(_HeaderTableEntry, StructMixin):
 
 
 class ELFFile:
-    def __init__(self, stream):
-        self.stream = stream
+    # Accepts either a seekable stream, or anything supporting the buffer protocol
+    # (bytes, bytearray, memoryview). In buffer mode reads are slices of the
+    # underlying memory rather than copies.
+    def __init__(self, source):
+        try:
+            self.data = memoryview(source).cast("B")
+            self.stream = None
+        except TypeError:
+            self.data = None
+            self.stream = source
         self._buffer = ()
+        self._section_headers = None
+        self._program_headers = None
+        self._sections = {}
+        self._sections_by_name = None
         if self.pread(0, 4) != b"\177ELF":
             raise ValueError("Not an ELF file")
         if self.pread(4, 3) != b"\1\1\1":
             raise ValueError("Incompatible ELF file")
         self._header = self.construct_at(0, ElfHeader32)
 
+    def close(self):
+        if self.data is not None:
+            self.data.release()
+        else:
+            self.stream.close()
+
     def pread(self, offset, sz):
+        if self.stream is None:
+            return self.data[offset : offset + sz]
         if len(self._buffer) < sz:
             self._buffer = bytearray(sz)
             self._view = memoryview(self._buffer)
@@ -155,13 +220,52 @@ class ELFFile:
         mb = self.pread(offset, sz)
         return cls.frombuffer(mb)
 
+    # Unlike pread, the returned buffer is not reused by subsequent reads
+    def read_table(self, offset, sz):
+        if self.stream is None:
+            return self.data[offset : offset + sz]
+        self.stream.seek(offset)
+        return self.stream.read(sz)
+
+    def construct_table(self, offset, count, entsize, cls):
+        sz = cls.calcsize()
+        buf = self.read_table(offset, count * entsize)
+        if entsize == sz:
+            return list(cls.iterbuffer(buf))
+        return [
+            cls._make(struct.unpack_from(cls._fmt, buf, i * entsize))
+            for i in range(count)
+        ]
+
+    def get_section_headers(self):
+        if self._section_headers is None:
+            self._section_headers = self.construct_table(
+                self._header.e_shoff,
+                self._header.e_shnum,
+                self._header.e_shentsize,
+                SectionHeader32,
+            )
+        return self._section_headers
+
+    def get_program_headers(self):
+        if self._program_headers is None:
+            self._program_headers = self.construct_table(
+                self._header.e_phoff,
+                self._header.e_phnum,
+                self._header.e_phentsize,
+                HeaderTableEntry,
+            )
+        return self._program_headers
+
     def get_section(self, index):
         if not (0 <= index < self._header.e_shnum):
             raise IndexError("Invalid section number")
-        offset = self._header.e_shoff + index * self._header.e_shentsize
-        sh = self.construct_at(offset, SectionHeader32)
-        constructor = section_constructors.get(sh.sh_type, Section)
-        return constructor(self, sh)
+        section = self._sections.get(index)
+        if section is None:
+            sh = self.get_section_headers()[index]
+            constructor = section_constructors.get(sh.sh_type, Section)
+            section = self._sections[index] = constructor(self, sh)
+        return section
 
     def iter_sections(self):
         for i in range(self._header.e_shnum):
@@ -170,21 +274,23 @@ class ELFFile:
     def get_section_by_name(self, name):
         if not isinstance(name, bytes):
             name = name.encode()
-        idx = self.get_section(self._header.e_shstrndx)
-        for sec in self.iter_sections():
-            off = sec._header.sh_name
-            if idx.symbolat_matches(sec._header.sh_name, name):
-                return sec
+        if self._sections_by_name is None:
+            shstrtab = self.get_section(self._header.e_shstrndx)
+            sections_by_name = {}
+            for i, sh in enumerate(self.get_section_headers()):
+                sections_by_name.setdefault(shstrtab.symbolat(sh.sh_name), i)
+            self._sections_by_name = sections_by_name
+        index = self._sections_by_name.get(name)
+        if index is not None:
+            return self.get_section(index)
 
     def get_header(self, index):
         if not (0 <= index < self._header.e_phnum):
             raise IndexError("Invalid header number")
-        offset = self._header.e_phoff + index * self._header.e_phentsize
-        return self.construct_at(offset, HeaderTableEntry)
+        return self.get_program_headers()[index]
 
     def iter_headers(self):
-        for i in range(self._header.e_phnum):
-            yield self.get_header(i)
+        return iter(self.get_program_headers())
 
     def get_header_by_type(self, p_type):
         for h in self.iter_headers():
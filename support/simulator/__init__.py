@@ -0,0 +1,438 @@
+import builtins
+import calendar
+import collections
+import gc
+import importlib
+import importlib.util
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import glyph_atlas
+import ulp_builder
+from simulator import hardware
+from simulator.hardware import (
+    Broker,
+    Clock,
+    DeepSleep,
+    Network,
+    Panel,
+    Pins,
+    Trace,
+)
+
+# Runs circuitpy/main.py under CPython against stand-ins for the CircuitPython
+# modules it depends on. All hardware state (shared memory, sleep memory, the
+# filesystem, the clock) lives on the Simulator and survives across boots, so a
+# sequence of boots behaves like a board waking from deep sleep.
+
+CIRCUITPY_DIR = os.path.join(ulp_builder.project_root, "circuitpy")
+MODULES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "modules")
+
+# Shaped like the .bss of build/ulp, as ulp_builder lays out what the ULP exports
+SYMBOLS = {
+    "fields": {
+        "calibration_ready": {"address": 0x1000, "code": "B", "size": 1, "length": 0},
+        "debug": {"address": 0x1001, "code": "B", "size": 1, "length": 0},
+        "run_mode": {"address": 0x1004, "code": "I", "size": 4, "length": 0},
+        "modified": {"address": 0x1008, "code": "B", "size": 1, "length": 0},
+        "pH": {"address": 0x100A, "code": "h", "size": 2, "length": 0},
+        "DO": {"address": 0x100C, "code": "h", "size": 2, "length": 0},
+        "air_temp": {"address": 0x100E, "code": "h", "size": 2, "length": 0},
+        "water_temp": {"address": 0x1010, "code": "h", "size": 2, "length": 0},
+        "readings_head": {"address": 0x1014, "code": "I", "size": 4, "length": 0},
+        "readings_tail": {"address": 0x1018, "code": "I", "size": 4, "length": 0},
+        "readings": {"address": 0x1020, "code": None, "size": 16, "length": 32},
+        "sample_interval_min": {"address": 0x1220, "code": "H", "size": 2, "length": 0},
+        "sample_interval_max": {"address": 0x1222, "code": "H", "size": 2, "length": 0},
+        "sample_interval_backoff": {
+            "address": 0x1224,
+            "code": "H",
+            "size": 2,
+            "length": 0,
+        },
+        "sample_interval": {"address": 0x1226, "code": "H", "size": 2, "length": 0},
+        "thresholds": {"address": 0x1228, "code": "H", "size": 2, "length": 4},
+        "hysteresis": {"address": 0x1230, "code": "H", "size": 2, "length": 4},
+        "noise": {"address": 0x1238, "code": "H", "size": 2, "length": 4},
+        "noise_peak": {"address": 0x1240, "code": "H", "size": 2, "length": 4},
+        "filters": {"address": 0x1248, "code": "B", "size": 1, "length": 4},
+        "oversample": {"address": 0x124C, "code": "B", "size": 1, "length": 2},
+        "filter_ema_shift": {"address": 0x124E, "code": "B", "size": 1, "length": 0},
+        "onewire_roms": {"address": 0x1250, "code": "B", "size": 1, "length": 16},
+        "onewire_found": {"address": 0x1260, "code": "B", "size": 1, "length": 32},
+        "onewire_found_count": {"address": 0x1280, "code": "I", "size": 4, "length": 0},
+        "onewire_resolution": {"address": 0x1284, "code": "B", "size": 1, "length": 0},
+        "analog_settle_ms": {"address": 0x1286, "code": "H", "size": 2, "length": 0},
+        "calibration_stats": {"address": 0x1288, "code": None, "size": 20, "length": 0},
+        "calibration_threshold": {
+            "address": 0x129C,
+            "code": "H",
+            "size": 2,
+            "length": 0,
+        },
+        "calibration_watch": {"address": 0x129E, "code": "B", "size": 1, "length": 0},
+    },
+    "readings": {"address": 0x1020, "length": 32},
+}
+
+SHARED_MEMORY_START = 0x50000000
+SHARED_MEMORY_LENGTH = 0x2000
+SLEEP_MEMORY_LENGTH = 4096
+# Roughly the CircuitPython heap on a FeatherS2
+HEAP_SIZE = 2 * 1024 * 1024
+
+RUN_MODE_NORMAL = 0
+RUN_MODE_CALIBRATION = 2
+
+# Mirrors the sensor IDs in ulp/main.c
+SENSOR_IDS = {"pH": 0, "DO": 1, "air_temp": 2, "water_temp": 3}
+
+# Mirrors the Calibration defines in ulp/main.c
+CALIBRATION_SAMPLE_SECONDS = 0.1
+CALIBRATION_WINDOW = 10
+CALIBRATION_THRESHOLD = 80
+
+
+class Simulator:
+    def __init__(self, symbols=SYMBOLS, calibration_trace=None, code=b"\0" * 16):
+        self.symbols = symbols
+        self.calibration_trace = calibration_trace
+        self.clock = Clock()
+        self.network = Network()
+        self.broker = Broker()
+        self.panel = Panel()
+        self.pins = Pins()
+        self.counters = collections.Counter()
+        self.shared_memory = bytearray(SHARED_MEMORY_LENGTH)
+        self.sleep_memory = bytearray(SLEEP_MEMORY_LENGTH)
+        self.ulp_program = None
+        self.wake_alarm = None
+        self.sleep_alarms = ()
+        self.config = {
+            "WIFI_SSID": "mayfly",
+            "WIFI_PASS": "mayfly",
+            "TZ_OFFSET": 0,
+            "MQTT_TOPIC": "mayfly",
+            "MQTT_BROKER": "localhost",
+            "MQTT_PORT": 1883,
+        }
+        self.__calibration_started_at = None
+        self.__calibration_samples = 0
+        self.__calibration_windows = {}
+        self.__patches = []
+        # Initialized in the ULP's .data
+        self.write_value("calibration_threshold", CALIBRATION_THRESHOLD)
+
+        # The board's filesystem, seeded from circuitpy/
+        self.root = tempfile.mkdtemp(prefix="mayfly-circuitpy-")
+        for name in ("calibration", "font"):
+            shutil.copytree(
+                os.path.join(CIRCUITPY_DIR, name), os.path.join(self.root, name)
+            )
+        # Glyph atlases are built from the BDF fonts, as `make` would
+        for name in os.listdir(os.path.join(self.root, "font")):
+            if name.endswith(".bdf"):
+                path = os.path.join(self.root, "font", name)
+                with open(path[: -len(".bdf")] + ".glyphs", "wb") as f:
+                    f.write(
+                        glyph_atlas.build_atlas(
+                            *glyph_atlas.read_bdf(
+                                path, {ord(c) for c in glyph_atlas.GLYPHS}
+                            )
+                        )
+                    )
+        with open(os.path.join(self.root, "ulp.bin"), "wb") as f:
+            f.write(ulp_builder.build_firmware(code))
+
+        # ulp.py rendered for the simulated memory layout
+        self.__generated_dir = tempfile.mkdtemp(prefix="mayfly-generated-")
+        with open(os.path.join(self.__generated_dir, "ulp.py"), "w") as f:
+            f.write(
+                ulp_builder.render_python_code(
+                    ulp_builder.get_template_environment(),
+                    code,
+                    symbols,
+                    "simulator",
+                )
+            )
+
+    def __enter__(self):
+        if hardware.current is not None:
+            raise RuntimeError("Another simulator is already running")
+        hardware.current = self
+        sys.path[0:0] = [MODULES_DIR, self.__generated_dir, CIRCUITPY_DIR]
+
+        host_open = builtins.open
+        self.__patch(
+            builtins,
+            "open",
+            lambda f, *a, **kw: host_open(self.device_path(f), *a, **kw),
+        )
+        for name in ("listdir", "mkdir", "remove", "stat", "rmdir"):
+            host_fn = getattr(os, name)
+            self.__patch(
+                os,
+                name,
+                lambda path, *a, host_fn=host_fn, **kw: host_fn(
+                    self.device_path(path), *a, **kw
+                ),
+            )
+        host_rename = os.rename
+        self.__patch(
+            os,
+            "rename",
+            lambda src, dst: host_rename(self.device_path(src), self.device_path(dst)),
+        )
+        # CircuitPython's gc reports on its own heap. The closest CPython has is
+        # whatever tracemalloc is tracking, if anything.
+        self.__patch(gc, "mem_alloc", self.mem_alloc)
+        self.__patch(gc, "mem_free", lambda: HEAP_SIZE - self.mem_alloc())
+        self.__patch(time, "sleep", self.clock.sleep)
+        self.__patch(time, "monotonic", self.clock.monotonic)
+        self.__patch(time, "monotonic_ns", self.clock.monotonic_ns)
+        self.__patch(time, "time", lambda: int(self.clock.rtc_time()))
+        # CircuitPython has no timezones, localtime is whatever the RTC holds
+        self.__patch(time, "mktime", calendar.timegm)
+        host_gmtime = time.gmtime
+        self.__patch(
+            time,
+            "localtime",
+            lambda secs=None: host_gmtime(
+                int(self.clock.rtc_time()) if secs is None else secs
+            ),
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.__purge_modules(include_stand_ins=True)
+        for target, name, value in reversed(self.__patches):
+            if value is None:
+                delattr(target, name)
+            else:
+                setattr(target, name, value)
+        self.__patches = []
+        for path in (MODULES_DIR, self.__generated_dir, CIRCUITPY_DIR):
+            sys.path.remove(path)
+        hardware.current = None
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.__generated_dir, ignore_errors=True)
+
+    def mem_alloc(self):
+        if not tracemalloc.is_tracing():
+            return 0
+        current, _ = tracemalloc.get_traced_memory()
+        return current
+
+    # Paths on the board's filesystem are mapped into self.root. Anything whose
+    # top-level directory exists on the host (and not on the board) is left alone.
+    def device_path(self, path):
+        if not isinstance(path, str) or not path.startswith("/"):
+            return path
+        top = path.split("/")[1]
+        if top and (
+            os.path.lexists(os.path.join(self.root, top))
+            or not os.path.lexists("/" + top)
+        ):
+            return os.path.join(self.root, path[1:])
+        return path
+
+    # Boots the board as if woken by `wake_alarm` and runs main.py until it
+    # enters deep sleep. Returns the alarms it will sleep until.
+    def boot(self, wake_alarm=None):
+        self.wake_alarm = wake_alarm
+        self.network.reset()
+        self.counters["boots"] += 1
+        self.__purge_modules()
+        try:
+            self.__exec_main()
+        except DeepSleep as sleep:
+            self.sleep_alarms = sleep.alarms
+            return sleep.alarms
+        raise RuntimeError("main.py returned without entering deep sleep")
+
+    # Imports main.py without taking any of its wake paths, so functions such as
+    # update() or calibrate_DO() can be called directly
+    def load_main(self):
+        self.wake_alarm = object()
+        self.network.reset()
+        self.__purge_modules()
+        try:
+            return self.__exec_main()
+        except DeepSleep as sleep:
+            return sleep.module
+
+    def init(self):
+        return self.boot(None)
+
+    # Exposes `sample` in shared memory and appends it to the readings buffer as
+    # the ULP would, without waking the main CPU
+    def buffer_reading(self, sample):
+        modified = sample.get("modified")
+        if modified is None:
+            modified = 0
+            for name, sensor_id in SENSOR_IDS.items():
+                if name in sample and sample[name] != self.read_value(name):
+                    modified |= 1 << sensor_id
+        self.write_sample(dict(sample, modified=modified))
+
+        readings = self.symbols["readings"]
+        head = self.read_value("readings_head")
+        size = struct.calcsize(ulp_builder.READING_FORMAT)
+        struct.pack_into(
+            ulp_builder.READING_FORMAT,
+            self.shared_memory,
+            readings["address"] + (head % readings["length"]) * size,
+            # The RTC slow clock runs at about 90kHz from power on
+            (int(self.clock.now * 90000) >> 16) & 0xFFFFFFFF,
+            *(self.read_value(name) for name in hardware.SENSORS),
+            modified,
+        )
+        self.write_value("readings_head", (head + 1) & 0xFFFFFFFF)
+
+    # Buffers `sample` and wakes the main CPU as the ULP would
+    def wake_ulp(self, sample):
+        self.buffer_reading(sample)
+        return self.boot(importlib.import_module("espulp").ULPAlarm(self.ulp_program))
+
+    def press_calibration_button(self):
+        alarm = importlib.import_module("alarm")
+        board = importlib.import_module("board")
+        return self.boot(alarm.pin.PinAlarm(pin=board.IO11, value=False, pull=True))
+
+    def press(self, pin_name, at, duration=0.2):
+        self.pins.press(pin_name, self.clock.now + at, duration)
+
+    def read_value(self, name):
+        field = self.symbols["fields"][name]
+        return struct.unpack_from(
+            f"<{field['code']}", self.shared_memory, field["address"]
+        )[0]
+
+    def write_value(self, name, value):
+        field = self.symbols["fields"][name]
+        struct.pack_into(
+            f"<{field['code']}", self.shared_memory, field["address"], value
+        )
+
+    def write_sample(self, sample):
+        for name, value in sample.items():
+            self.write_value(name, value)
+
+    # Called by memorymap.AddressRange before shared memory is read, to play the
+    # part of the ULP
+    def on_shared_memory_read(self):
+        if self.read_value("run_mode") == RUN_MODE_CALIBRATION:
+            if self.__calibration_started_at is None:
+                self.__calibration_started_at = self.clock.now
+                self.__calibration_samples = 0
+                self.__calibration_windows = {
+                    name: collections.deque(maxlen=CALIBRATION_WINDOW)
+                    for name in ("pH", "DO")
+                }
+            self.write_value("calibration_ready", 1)
+            self.__run_calibration(self.clock.now)
+        elif self.__calibration_started_at is not None:
+            self.__calibration_started_at = None
+            self.write_value("calibration_ready", 0)
+
+    # Called by alarm.light_sleep_until_alarms. Only the ULP's calibration
+    # wakes the main CPU early, otherwise the time alarm fires.
+    def light_sleep(self, alarms):
+        deadline = min(
+            alarm.monotonic_time
+            for alarm in alarms
+            if getattr(alarm, "monotonic_time", None) is not None
+        )
+        ulp_alarm = next((alarm for alarm in alarms if hasattr(alarm, "ulp")), None)
+        self.on_shared_memory_read()
+        if ulp_alarm is not None and self.__calibration_started_at is not None:
+            while True:
+                next_sample = (
+                    self.__calibration_started_at
+                    + self.__calibration_samples * CALIBRATION_SAMPLE_SECONDS
+                )
+                if next_sample > deadline:
+                    break
+                self.clock.now = max(self.clock.now, next_sample)
+                if self.__run_calibration(next_sample):
+                    return ulp_alarm
+        self.clock.now = max(self.clock.now, deadline)
+        return next(alarm for alarm in alarms if alarm is not ulp_alarm)
+
+    # Takes the calibration samples the ULP would have by `until` and returns
+    # whether it woke the main CPU for any of them
+    def __run_calibration(self, until):
+        woke = False
+        while (
+            self.__calibration_started_at
+            + self.__calibration_samples * CALIBRATION_SAMPLE_SECONDS
+            <= until
+        ):
+            if self.calibration_trace is not None:
+                sample = self.calibration_trace.sample_at(
+                    self.__calibration_samples * CALIBRATION_SAMPLE_SECONDS
+                )
+                self.write_sample(
+                    {name: sample[name] for name in ("pH", "DO") if name in sample}
+                )
+            for name, window in self.__calibration_windows.items():
+                window.append(self.read_value(name))
+            self.__calibration_samples += 1
+            stable = self.__publish_calibration_stats()
+            woke = woke or bool(stable & self.read_value("calibration_watch"))
+        return woke
+
+    def __publish_calibration_stats(self):
+        threshold = self.read_value("calibration_threshold")
+        stats = {"mean": [0, 0], "minimum": [0, 0], "maximum": [0, 0]}
+        stable = 0
+        count = 0
+        for name, window in self.__calibration_windows.items():
+            sensor_id = SENSOR_IDS[name]
+            count = len(window)
+            stats["mean"][sensor_id] = (sum(window) + count // 2) // count
+            stats["minimum"][sensor_id] = min(window)
+            stats["maximum"][sensor_id] = max(window)
+            if count == CALIBRATION_WINDOW and max(window) - min(window) < threshold:
+                stable |= 1 << sensor_id
+        struct.pack_into(
+            ulp_builder.CALIBRATION_STATS_FORMAT,
+            self.shared_memory,
+            self.symbols["fields"]["calibration_stats"]["address"],
+            self.__calibration_samples * 2,
+            *stats["mean"],
+            *stats["minimum"],
+            *stats["maximum"],
+            count,
+            stable,
+        )
+        return stable
+
+    def __exec_main(self):
+        spec = importlib.util.spec_from_file_location(
+            "main", os.path.join(CIRCUITPY_DIR, "main.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except DeepSleep as sleep:
+            sleep.module = module
+            raise
+        return module
+
+    def __purge_modules(self, include_stand_ins=False):
+        dirs = [CIRCUITPY_DIR, self.__generated_dir]
+        if include_stand_ins:
+            dirs.append(MODULES_DIR)
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None) or ""
+            if any(path.startswith(d + os.sep) for d in dirs):
+                del sys.modules[name]
+
+    def __patch(self, target, name, value):
+        self.__patches.append((target, name, getattr(target, name, None)))
+        setattr(target, name, value)
@@ -0,0 +1,173 @@
+import collections
+import csv
+
+# The simulator whose hardware the stand-in modules are currently bound to
+current = None
+
+SENSORS = ("pH", "DO", "air_temp", "water_temp")
+
+
+class DeepSleep(BaseException):
+    def __init__(self, alarms):
+        super().__init__(alarms)
+        self.alarms = alarms
+
+
+class Clock:
+    # Wall clock time when the simulation starts
+    EPOCH = 1_700_000_000
+
+    def __init__(self, busy_tick=0.001):
+        self.now = 0.0
+        self.epoch = Clock.EPOCH
+        # Every read of the monotonic clock costs this much virtual time, so
+        # busy-wait loops make progress
+        self.busy_tick = busy_tick
+        # CircuitPython's RTC starts at 2000-01-01 until it's set
+        self.rtc_base = 946684800
+        self.rtc_set_at = 0.0
+        self.rtc_drift_ppm = 0
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def monotonic(self):
+        self.now += self.busy_tick
+        return self.now
+
+    def monotonic_ns(self):
+        return int(self.monotonic() * 1_000_000_000)
+
+    # Actual wall clock time, e.g. what an NTP server would report
+    def time(self):
+        return self.epoch + self.now
+
+    # What the board's RTC thinks the time is
+    def rtc_time(self):
+        elapsed = self.now - self.rtc_set_at
+        return self.rtc_base + elapsed * (1 + self.rtc_drift_ppm / 1_000_000)
+
+    def set_rtc(self, seconds):
+        self.rtc_base = seconds
+        self.rtc_set_at = self.now
+
+
+class Network:
+    def __init__(self):
+        self.ssid = None
+        self.password = None
+        self.available = True
+        # Fail this many of the next connection attempts
+        self.failures = 0
+        # A full connect scans every channel, associates and then waits on
+        # DHCP. Connecting to a known BSSID and channel skips the scan, and a
+        # static address skips DHCP.
+        self.scan_time = 1.0
+        self.associate_time = 0.2
+        self.dhcp_time = 0.3
+        self.bssid = b"\x02\x00\x00\x00\x00\x01"
+        self.channel = 6
+        self.rssi = -60
+        self.ipv4_address = "192.168.1.50"
+        self.ipv4_subnet = "255.255.255.0"
+        self.ipv4_gateway = "192.168.1.1"
+        self.ipv4_dns = "192.168.1.1"
+        self.static_ipv4 = None
+        self.connected = False
+        self.enabled = True
+
+    @property
+    def connect_time(self):
+        return self.scan_time + self.associate_time + self.dhcp_time
+
+    def reset(self):
+        self.connected = False
+        self.enabled = True
+        self.static_ipv4 = None
+
+    def connect(self, clock, ssid, password, channel, bssid, timeout):
+        if not self.enabled:
+            raise RuntimeError("Radio disabled")
+        if self.failures > 0 or not self.available:
+            self.failures = max(self.failures - 1, 0)
+            clock.sleep(timeout or 8)
+            raise ConnectionError("No network with that ssid")
+        if self.ssid is not None and ssid != self.ssid:
+            clock.sleep(timeout or 8)
+            raise ConnectionError("No network with that ssid")
+        if (bssid and bytes(bssid) != self.bssid) or (
+            channel and channel != self.channel
+        ):
+            clock.sleep(timeout or 8)
+            raise ConnectionError("No network with that ssid")
+        if self.password is not None and password != self.password:
+            clock.sleep(timeout or 8)
+            raise ConnectionError("Authentication failure")
+        if not (bssid and channel):
+            clock.sleep(self.scan_time)
+        clock.sleep(self.associate_time)
+        if self.static_ipv4 is None:
+            clock.sleep(self.dhcp_time)
+        self.connected = True
+
+
+class Broker:
+    def __init__(self):
+        self.available = True
+        self.connect_time = 0.3
+        self.messages = []
+
+    def publish(self, topic, payload):
+        self.messages.append((topic, payload))
+
+
+class Panel:
+    def __init__(self):
+        self.refresh_time = 3.0
+        self.frames = []
+
+
+# Sensor readings for the ULP to expose, either one sample per wake or, during
+# calibration, one sample every `period` seconds of virtual time
+class Trace:
+    def __init__(self, samples, period=0.1):
+        self.samples = samples
+        self.period = period
+
+    def sample_at(self, seconds):
+        index = min(int(seconds / self.period), len(self.samples) - 1)
+        return self.samples[index]
+
+    @classmethod
+    def from_csv(cls, path, period=0.1):
+        with open(path, newline="") as f:
+            samples = [
+                {name: int(value) for name, value in row.items() if value != ""}
+                for row in csv.DictReader(f)
+            ]
+        return cls(samples, period)
+
+
+class Pins:
+    def __init__(self):
+        self.outputs = {}
+        self.presses = collections.defaultdict(list)
+
+    def press(self, pin, at, duration=0.2):
+        self.presses[pin].append((at, at + duration))
+
+    def is_pressed(self, pin, now):
+        return any(start <= now < end for start, end in self.presses[pin])
+
+
+# Counts calls into simulated hardware, e.g. shared memory reads or refreshes
+def count(name, n=1):
+    if current is not None:
+        current.counters[name] += n
+
+
+def get():
+    if current is None:
+        raise RuntimeError("No simulator is running")
+    return current
@@ -0,0 +1,14 @@
+from simulator import hardware
+
+
+class Font:
+    def __init__(self, path):
+        self.path = path
+
+
+def load_font(filename, bitmap=None):
+    hardware.count("bitmap_font.load_font")
+    # Parsing is what costs time on the board, the simulator only checks the file
+    with open(filename, "rb"):
+        pass
+    return Font(filename)
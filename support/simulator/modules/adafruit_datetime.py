@@ -0,0 +1,10 @@
+import datetime as _datetime
+import time
+from datetime import date, timedelta, timezone
+
+
+class datetime(_datetime.datetime):
+    # The board's RTC has no timezone, it holds whatever NTP set it to
+    @classmethod
+    def now(cls, tz=None):
+        return cls(*time.localtime()[:6])
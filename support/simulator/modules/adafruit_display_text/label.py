@@ -0,0 +1,23 @@
+from simulator import hardware
+
+
+class Label:
+    def __init__(self, font, *, text="", color=0xFFFFFF, **kwargs):
+        hardware.count("label.Label")
+        self.font = font
+        self.font.get_bounding_box()
+        self.text = text
+        self.color = color
+        self.x = kwargs.get("x", 0)
+        self.y = kwargs.get("y", 0)
+
+    @property
+    def text(self):
+        return self.__text
+
+    # Looks up each glyph as the real label does when laying out its text
+    @text.setter
+    def text(self, value):
+        for c in value:
+            self.font.get_glyph(ord(c))
+        self.__text = value
@@ -0,0 +1,30 @@
+from simulator import hardware
+
+
+def _texts(group):
+    for item in group:
+        if isinstance(item, list):
+            yield from _texts(item)
+        elif hasattr(item, "text"):
+            yield item.text
+
+
+class IL0373:
+    def __init__(self, bus, *, width, height, refresh_time=1, **kwargs):
+        self.width = width
+        self.height = height
+        self.root_group = None
+
+    def show(self, group):
+        self.root_group = group
+
+    @property
+    def time_to_refresh(self):
+        return 0
+
+    # Records the text on the panel and takes as long as the panel would
+    def refresh(self):
+        sim = hardware.get()
+        hardware.count("display.refresh")
+        sim.panel.frames.append(list(_texts(self.root_group or [])))
+        sim.clock.sleep(sim.panel.refresh_time)
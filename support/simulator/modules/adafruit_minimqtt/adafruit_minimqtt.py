@@ -0,0 +1,50 @@
+from simulator import hardware
+
+
+class MMQTTException(Exception):
+    pass
+
+
+# Delivers straight to the simulator's in-process broker
+class MQTT:
+    def __init__(
+        self,
+        *,
+        broker,
+        port=None,
+        username=None,
+        password=None,
+        socket_pool=None,
+        keep_alive=60,
+        **kwargs
+    ):
+        self.broker = broker
+        self.port = port
+        self._connected = False
+
+    def connect(self, clean_session=True, host=None, port=None, keep_alive=None):
+        sim = hardware.get()
+        hardware.count("mqtt.connect")
+        if not sim.network.connected or not sim.broker.available:
+            raise MMQTTException("Repeated connect failures")
+        sim.clock.sleep(sim.broker.connect_time)
+        self._connected = True
+
+    def is_connected(self):
+        return self._connected
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        if not self._connected:
+            raise MMQTTException("MiniMQTT is not connected")
+        if isinstance(msg, (int, float)):
+            msg = str(msg).encode("ascii")
+        elif isinstance(msg, str):
+            msg = msg.encode("utf-8")
+        hardware.count("mqtt.publish")
+        hardware.get().broker.publish(topic, bytes(msg))
+
+    def disconnect(self):
+        if not self._connected:
+            raise MMQTTException("MiniMQTT is not connected")
+        hardware.count("mqtt.disconnect")
+        self._connected = False
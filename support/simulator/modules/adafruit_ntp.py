@@ -0,0 +1,24 @@
+import time
+from simulator import hardware
+
+
+class NTP:
+    def __init__(
+        self,
+        socketpool,
+        *,
+        server="0.adafruit.pool.ntp.org",
+        port=123,
+        tz_offset=0,
+        socket_timeout=10
+    ):
+        self._tz_offset = tz_offset
+
+    @property
+    def datetime(self):
+        sim = hardware.get()
+        if not sim.network.connected:
+            raise OSError("Network unreachable")
+        hardware.count("ntp.request")
+        sim.clock.sleep(0.1)
+        return time.gmtime(int(sim.clock.time() + self._tz_offset * 3600))
@@ -0,0 +1,21 @@
+from simulator import hardware
+from . import pin, time
+
+
+def exit_and_deep_sleep_until_alarms(*alarms, preserve_dios=()):
+    hardware.count("alarm.deep_sleep")
+    raise hardware.DeepSleep(alarms)
+
+
+# Returns the alarm that ended the sleep, see Simulator.light_sleep
+def light_sleep_until_alarms(*alarms):
+    hardware.count("alarm.light_sleep")
+    return hardware.get().light_sleep(alarms)
+
+
+def __getattr__(name):
+    if name == "wake_alarm":
+        return hardware.get().wake_alarm
+    if name == "sleep_memory":
+        return hardware.get().sleep_memory
+    raise AttributeError(name)
@@ -0,0 +1,15 @@
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+for _number in range(47):
+    globals()[f"IO{_number}"] = Pin(f"IO{_number}")
+
+# FeatherS2
+SCK = IO36
+MOSI = IO35
+MISO = IO37
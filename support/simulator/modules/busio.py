@@ -0,0 +1,5 @@
+class SPI:
+    def __init__(self, clock, MOSI=None, MISO=None):
+        self.clock = clock
+        self.MOSI = MOSI
+        self.MISO = MISO
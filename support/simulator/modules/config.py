@@ -0,0 +1,8 @@
+from simulator import hardware
+
+
+def __getattr__(name):
+    try:
+        return hardware.get().config[name]
+    except KeyError:
+        raise AttributeError(name)
@@ -0,0 +1,42 @@
+from simulator import hardware
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+# Inputs read high unless the simulator is pressing the button on that pin
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.__value = False
+
+    @property
+    def value(self):
+        sim = hardware.get()
+        if self.direction == Direction.OUTPUT:
+            return self.__value
+        hardware.count("digitalio.read")
+        return not sim.pins.is_pressed(self.pin.name, sim.clock.now)
+
+    @value.setter
+    def value(self, value):
+        self.__value = value
+        hardware.count("digitalio.write")
+        hardware.get().pins.outputs[self.pin.name] = value
+
+    def deinit(self):
+        pass
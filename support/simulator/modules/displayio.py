@@ -0,0 +1,52 @@
+from simulator import hardware
+
+
+def release_displays():
+    pass
+
+
+class FourWire:
+    def __init__(self, spi_bus, *, command, chip_select, reset=None, baudrate=24000000):
+        self.spi_bus = spi_bus
+
+
+class Group(list):
+    def __init__(self, *, scale=1, x=0, y=0):
+        super().__init__()
+        hardware.count("displayio.Group")
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+
+class Palette(list):
+    def __init__(self, color_count):
+        super().__init__([0] * color_count)
+        hardware.count("displayio.Palette")
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        hardware.count("displayio.Bitmap")
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self.pixels = bytearray(width * height)
+
+    def __getitem__(self, xy):
+        x, y = xy
+        return self.pixels[y * self.width + x]
+
+    def __setitem__(self, xy, value):
+        x, y = xy
+        self.pixels[y * self.width + x] = value
+
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, x=0, y=0, **kwargs):
+        hardware.count("displayio.TileGrid")
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
@@ -0,0 +1,7 @@
+from simulator import hardware
+
+
+# Roughly the ESP32-S2's ADC1 at 11dB attenuation
+def raw_to_voltage(raw):
+    hardware.count("espadc.raw_to_voltage")
+    return round(raw / 3.19)
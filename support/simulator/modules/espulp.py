@@ -0,0 +1,23 @@
+from simulator import hardware
+
+
+class Architecture:
+    FSM = "FSM"
+    RISCV = "RISCV"
+
+
+class ULP:
+    def __init__(self, arch=Architecture.FSM):
+        self.arch = arch
+
+    def run(self, program, *, entrypoint=0, pins=(), adc_pins=()):
+        hardware.count("espulp.run")
+        hardware.get().ulp_program = bytes(program)
+
+    def halt(self):
+        hardware.get().ulp_program = None
+
+
+class ULPAlarm:
+    def __init__(self, ulp):
+        self.ulp = ulp
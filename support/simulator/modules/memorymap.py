@@ -0,0 +1,25 @@
+from simulator import hardware
+
+
+# Only the ULP's RTC memory is mapped
+class AddressRange:
+    def __init__(self, *, start, length):
+        sim = hardware.get()
+        if start != 0x50000000 or length > len(sim.shared_memory):
+            raise ValueError("Only RTC slow memory is simulated")
+        self.__memory = sim.shared_memory
+        self.__length = length
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, index):
+        hardware.count("memorymap.read")
+        hardware.get().on_shared_memory_read()
+        if isinstance(index, slice):
+            return bytearray(self.__memory[: self.__length][index])
+        return self.__memory[index]
+
+    def __setitem__(self, index, value):
+        hardware.count("memorymap.write")
+        self.__memory[index] = value
@@ -0,0 +1,14 @@
+import calendar
+import time
+from simulator import hardware
+
+
+class RTC:
+    @property
+    def datetime(self):
+        return time.localtime()
+
+    @datetime.setter
+    def datetime(self, value):
+        hardware.count("rtc.set")
+        hardware.get().clock.set_rtc(calendar.timegm(value))
@@ -0,0 +1,13 @@
+from simulator import hardware
+
+
+# As on the board it can be made before the radio connects, the stand-ins that
+# use it check for a connection
+class SocketPool:
+    AF_INET = 2
+    SOCK_STREAM = 1
+    SOCK_DGRAM = 2
+
+    def __init__(self, radio):
+        hardware.count("socketpool.SocketPool")
+        self.radio = radio
@@ -0,0 +1,2 @@
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    pass
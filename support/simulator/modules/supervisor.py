@@ -0,0 +1,13 @@
+from simulator import hardware
+
+
+class _Runtime:
+    autoreload = True
+    serial_connected = True
+
+
+runtime = _Runtime()
+
+
+def ticks_ms():
+    return int(hardware.get().clock.monotonic() * 1000) & ((1 << 29) - 1)
@@ -0,0 +1,75 @@
+import ipaddress
+from simulator import hardware
+
+
+class Network:
+    def __init__(self, ssid, bssid, channel, rssi):
+        self.ssid = ssid
+        self.bssid = bssid
+        self.channel = channel
+        self.rssi = rssi
+
+
+class Radio:
+    @property
+    def enabled(self):
+        return hardware.get().network.enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        network = hardware.get().network
+        network.enabled = value
+        if not value:
+            network.connected = False
+
+    @property
+    def connected(self):
+        return hardware.get().network.connected
+
+    @property
+    def ap_info(self):
+        network = hardware.get().network
+        if not network.connected:
+            return None
+        return Network(network.ssid, network.bssid, network.channel, network.rssi)
+
+    @property
+    def ipv4_address(self):
+        return self.__ipv4("ipv4_address")
+
+    @property
+    def ipv4_subnet(self):
+        return self.__ipv4("ipv4_subnet")
+
+    @property
+    def ipv4_gateway(self):
+        return self.__ipv4("ipv4_gateway")
+
+    @property
+    def ipv4_dns(self):
+        return self.__ipv4("ipv4_dns")
+
+    def set_ipv4_address(self, *, ipv4, netmask, gateway, ipv4_dns=None):
+        hardware.get().network.static_ipv4 = ipv4
+
+    def start_dhcp(self):
+        hardware.get().network.static_ipv4 = None
+
+    def stop_dhcp(self):
+        pass
+
+    def connect(self, ssid, password="", *, channel=0, bssid=None, timeout=None):
+        sim = hardware.get()
+        hardware.count("wifi.connect")
+        sim.network.connect(sim.clock, ssid, password, channel, bssid, timeout)
+
+    def __ipv4(self, name):
+        network = hardware.get().network
+        if not network.connected:
+            return None
+        if name == "ipv4_address" and network.static_ipv4 is not None:
+            return network.static_ipv4
+        return ipaddress.IPv4Address(getattr(network, name))
+
+
+radio = Radio()
@@ -0,0 +1,73 @@
+import random
+from simulator.hardware import Trace
+
+# Wake paths of circuitpy/main.py. Each scenario prepares a fresh simulator and
+# returns the boot to measure.
+
+SAMPLE = {"pH": 4785, "DO": 1400, "air_temp": 22 * 16, "water_temp": 25 * 16}
+
+# Raw ADC readings for the buffer solutions with the default calibration
+PH_BUFFERS = {4: 6476, 7: 4785, 10: 3110}
+
+
+def noisy(value, noise, count, rng):
+    return [value + rng.randint(-noise, noise) for _ in range(count)]
+
+
+def init(sim):
+    return sim.init
+
+
+def ulp_wake(sim):
+    sim.init()
+    return lambda: sim.wake_ulp(SAMPLE)
+
+
+# Wakes that can't reach the broker spool their readings to the publish queue,
+# and the first wake that connects replays the backlog
+def offline_replay(sim):
+    sim.init()
+    sim.broker.available = False
+    for i in range(10):
+        sim.clock.sleep(60)
+        sim.wake_ulp(dict(SAMPLE, pH=SAMPLE["pH"] + (i % 2) * 100))
+    sim.broker.available = True
+    return lambda: sim.wake_ulp(SAMPLE)
+
+
+def calibrate_DO(sim):
+    rng = random.Random(0)
+    sim.init()
+    sim.calibration_trace = Trace(
+        [{"DO": value} for value in noisy(SAMPLE["DO"], 20, 300, rng)]
+    )
+    # select DO, then confirm the probe is out of the water
+    sim.press("IO7", at=0.5)
+    sim.press("IO7", at=3)
+    return sim.press_calibration_button
+
+
+def calibrate_pH(sim):
+    rng = random.Random(0)
+    sim.init()
+    sim.calibration_trace = Trace(
+        [
+            {"pH": value}
+            for buffer in (4, 7, 10)
+            for value in noisy(PH_BUFFERS[buffer], 10, 200, rng)
+        ]
+    )
+    # select pH, then confirm each buffer once the probe has been moved
+    sim.press("IO10", at=0.5)
+    for at in (2, 21, 41):
+        sim.press("IO7", at=at)
+    return sim.press_calibration_button
+
+
+SCENARIOS = {
+    "init": init,
+    "ulp_wake": ulp_wake,
+    "offline_replay": offline_replay,
+    "calibrate_DO": calibrate_DO,
+    "calibrate_pH": calibrate_pH,
+}
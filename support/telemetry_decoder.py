@@ -0,0 +1,93 @@
+import argparse
+from collections import namedtuple
+import csv
+import struct
+import sys
+
+# Must match circuitpy/telemetry.py. Only depends on the standard library so it
+# can be copied to whatever subscribes to MQTT_TOPIC.
+VERSION = 1
+HEADER_FORMAT = "<BBI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = "<HhhhhhB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+PH_SCALE = 1000
+DO_PERCENT_SATURATION_SCALE = 10
+DO_MG_L_SCALE = 100
+TEMP_SCALE = 100
+
+Reading = namedtuple(
+    "Reading",
+    [
+        "timestamp",
+        "pH",
+        "DO_percent_saturation",
+        "DO_mg_L",
+        "air_temp",
+        "water_temp",
+        "modified",
+    ],
+)
+
+
+class DecodeError(ValueError):
+    pass
+
+
+# Returns the readings in a frame, with UTC timestamps and values in their
+# usual units
+def decode_frame(frame):
+    if len(frame) < HEADER_SIZE:
+        raise DecodeError(f"Frame is {len(frame)} bytes, too short for a header")
+    version, count, base = struct.unpack_from(HEADER_FORMAT, frame)
+    if version != VERSION:
+        raise DecodeError(f"Unsupported frame version {version}")
+    if len(frame) != HEADER_SIZE + count * RECORD_SIZE:
+        raise DecodeError(
+            f"Frame is {len(frame)} bytes, expected {HEADER_SIZE + count * RECORD_SIZE}"
+            f" for {count} records"
+        )
+
+    readings = []
+    for i in range(count):
+        offset, pH, saturation, mg_L, air_temp, water_temp, modified = (
+            struct.unpack_from(RECORD_FORMAT, frame, HEADER_SIZE + i * RECORD_SIZE)
+        )
+        readings.append(
+            Reading(
+                base + offset,
+                pH / PH_SCALE,
+                saturation / DO_PERCENT_SATURATION_SCALE,
+                mg_L / DO_MG_L_SCALE,
+                air_temp / TEMP_SCALE,
+                water_temp / TEMP_SCALE,
+                modified,
+            )
+        )
+    return readings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Decode telemetry frames published by the board to CSV"
+    )
+    parser.add_argument(
+        "frames",
+        nargs="*",
+        help="frames as hex, or a single binary frame on stdin if none are given",
+    )
+    args = parser.parse_args()
+
+    frames = [bytes.fromhex(frame) for frame in args.frames]
+    if not frames:
+        frames = [sys.stdin.buffer.read()]
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(Reading._fields)
+    for frame in frames:
+        writer.writerows(decode_frame(frame))
+
+
+if __name__ == "__main__":
+    main()
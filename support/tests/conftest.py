@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The tests import the host tools in support/ and the device modules in
+# circuitpy/ that don't depend on CircuitPython, as the benchmarks do
+SUPPORT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+sys.path[0:0] = [
+    os.path.join(SUPPORT_DIR, "..", "circuitpy"),
+    SUPPORT_DIR,
+]
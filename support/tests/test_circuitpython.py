@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import pytest
+import ulp_builder
+from simulator import SYMBOLS
+
+# MicroPython's mpy-cross, from `pip install mpy-cross`. It rejects the same
+# CPython-only syntax CircuitPython's does.
+pytest.importorskip("mpy_cross")
+
+CIRCUITPY_DIR = os.path.join(ulp_builder.project_root, "circuitpy")
+
+
+def mpy_cross(path, tmp_path):
+    return subprocess.run(
+        [sys.executable, "-m", "mpy_cross", "-o", str(tmp_path / "out.mpy"), path],
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "name", sorted(name for name in os.listdir(CIRCUITPY_DIR) if name.endswith(".py"))
+)
+def test_device_module_compiles(name, tmp_path):
+    result = mpy_cross(os.path.join(CIRCUITPY_DIR, name), tmp_path)
+    assert result.returncode == 0, result.stderr
+
+
+def test_generated_ulp_module_compiles(tmp_path):
+    path = tmp_path / "ulp.py"
+    path.write_text(
+        ulp_builder.render_python_code(
+            ulp_builder.get_template_environment(), b"", SYMBOLS, "test"
+        )
+    )
+    result = mpy_cross(str(path), tmp_path)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,45 @@
+import os
+import pytest
+import glyph_atlas
+import ulp_builder
+
+# Blinka's displayio and the CPython builds of the Adafruit libraries, from
+# `pip install adafruit-circuitpython-display-text adafruit-circuitpython-bitmap-font`
+label = pytest.importorskip("adafruit_display_text.label")
+bitmap_font = pytest.importorskip("adafruit_bitmap_font.bitmap_font")
+
+from glyph_font import GlyphFont
+
+FONT_DIR = os.path.join(ulp_builder.project_root, "circuitpy", "font")
+FONTS = sorted(name for name in os.listdir(FONT_DIR) if name.endswith(".bdf"))
+
+
+def build_glyph_font(bdf_path, tmp_path):
+    path = tmp_path / "font.glyphs"
+    path.write_bytes(
+        glyph_atlas.build_atlas(
+            *glyph_atlas.read_bdf(bdf_path, {ord(c) for c in glyph_atlas.GLYPHS})
+        )
+    )
+    return GlyphFont(str(path))
+
+
+@pytest.mark.parametrize("name", FONTS)
+def test_metrics_match_bdf(name, tmp_path):
+    bdf_path = os.path.join(FONT_DIR, name)
+    bdf = bitmap_font.load_font(bdf_path)
+    font = build_glyph_font(bdf_path, tmp_path)
+    assert (font.ascent, font.descent) == (bdf.ascent, bdf.descent)
+    assert font.get_bounding_box() == bdf.get_bounding_box()
+
+
+# Labels are laid out from the font's ascent and descent, so text drawn from
+# the atlas must land exactly where it would from the BDF font
+@pytest.mark.parametrize("name", FONTS)
+@pytest.mark.parametrize("text", ["7.04 pH", "-12.5 C", "Updated 10/18 23:59"])
+def test_label_bounding_box_matches_bdf(name, text, tmp_path):
+    bdf_path = os.path.join(FONT_DIR, name)
+    font = build_glyph_font(bdf_path, tmp_path)
+    expected = label.Label(bitmap_font.load_font(bdf_path), text=text)
+    actual = label.Label(font, text=text)
+    assert actual.bounding_box == expected.bounding_box
@@ -0,0 +1,102 @@
+import os
+import struct
+import pytest
+from publish_queue import ENTRY_SIZE, PublishQueue
+from telemetry import Record
+
+
+def make_records(count, start=1700000000):
+    return [
+        Record(start + i * 60, 7000 + i, 950, 820, 2200 - i, 2500, i & 0xF)
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue" / "records.bin")
+
+
+def write_queue(path, records):
+    queue = PublishQueue(path)
+    queue.append(records)
+    return queue
+
+
+def test_appended_records_survive_a_reload(path):
+    records = make_records(5)
+    write_queue(path, records)
+    assert PublishQueue(path).records() == records
+
+
+def test_torn_tail_record_is_dropped_and_valid_prefix_kept(path):
+    records = make_records(4)
+    write_queue(path, records)
+    # A write cut short part way through the last record
+    with open(path, "r+b") as f:
+        f.truncate(3 * ENTRY_SIZE + ENTRY_SIZE // 2)
+
+    queue = PublishQueue(path)
+    assert queue.records() == records[:3]
+
+    # The next append rewrites the file rather than appending after the tear
+    queue.append(make_records(1, start=1800000000))
+    assert os.path.getsize(path) == 4 * ENTRY_SIZE
+    assert PublishQueue(path).records() == queue.records()
+
+
+def test_crc_mismatch_discards_the_record(path):
+    records = make_records(3)
+    write_queue(path, records)
+    # Flip a byte of the last record's CRC
+    with open(path, "r+b") as f:
+        f.seek(3 * ENTRY_SIZE - 1)
+        byte = f.read(1)[0]
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte ^ 0xFF]))
+
+    assert PublishQueue(path).records() == records[:2]
+
+
+def test_corrupt_field_discards_the_record(path):
+    records = make_records(3)
+    write_queue(path, records)
+    # Corrupt the pH of the second record, leaving its CRC as written
+    with open(path, "r+b") as f:
+        f.seek(ENTRY_SIZE + struct.calcsize("<I"))
+        f.write(b"\xff\xff")
+
+    assert PublishQueue(path).records() == records[:1]
+
+
+def test_temporary_file_left_before_the_rename_is_discarded(path):
+    records = make_records(3)
+    write_queue(path, records)
+    # A rewrite cut short before the original was removed: the temporary file
+    # may be incomplete, so the original is kept
+    with open(path + ".tmp", "wb") as f:
+        f.write(b"\0" * (ENTRY_SIZE // 2))
+
+    assert PublishQueue(path).records() == records
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_temporary_file_left_after_removing_the_original_replaces_it(path):
+    records = make_records(3)
+    write_queue(path, records)
+    # A rewrite cut short after the original was removed but before the
+    # temporary file was renamed over it
+    os.rename(path, path + ".tmp")
+
+    assert PublishQueue(path).records() == records
+    assert os.path.exists(path)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_full_queue_evicts_the_oldest_records(path):
+    records = make_records(6)
+    queue = PublishQueue(path, capacity=4)
+    queue.append(records[:3])
+    queue.append(records[3:])
+    assert queue.records() == records[2:]
+    assert PublishQueue(path, capacity=4).records() == records[2:]
@@ -0,0 +1,121 @@
+import struct
+import pytest
+import telemetry
+from telemetry import FrameEncoder, Record, to_fixed
+import telemetry_decoder
+from telemetry_decoder import DecodeError, decode_frame
+
+
+def make_record(timestamp, pH=7.0, saturation=95.0, mg_L=8.2, air=22.0, water=25.0):
+    return Record(
+        timestamp,
+        to_fixed(pH, telemetry.PH_SCALE),
+        to_fixed(saturation, telemetry.DO_PERCENT_SATURATION_SCALE),
+        to_fixed(mg_L, telemetry.DO_MG_L_SCALE),
+        to_fixed(air, telemetry.TEMP_SCALE),
+        to_fixed(water, telemetry.TEMP_SCALE),
+        0b0101,
+    )
+
+
+# What decode_frame should return for `record`
+def expected_reading(record):
+    return telemetry_decoder.Reading(
+        record.timestamp,
+        record.pH / telemetry.PH_SCALE,
+        record.DO_percent_saturation / telemetry.DO_PERCENT_SATURATION_SCALE,
+        record.DO_mg_L / telemetry.DO_MG_L_SCALE,
+        record.air_temp / telemetry.TEMP_SCALE,
+        record.water_temp / telemetry.TEMP_SCALE,
+        record.modified,
+    )
+
+
+def round_trip(records, max_records=telemetry.MAX_RECORDS):
+    frames = list(FrameEncoder(max_records).frames(records))
+    return frames, [reading for frame in frames for reading in decode_frame(frame)]
+
+
+def test_decoder_matches_the_encoder_formats():
+    assert telemetry_decoder.VERSION == telemetry.VERSION
+    assert telemetry_decoder.HEADER_FORMAT == telemetry.HEADER_FORMAT
+    assert telemetry_decoder.RECORD_FORMAT == telemetry.RECORD_FORMAT
+    for name in ("PH", "DO_PERCENT_SATURATION", "DO_MG_L", "TEMP"):
+        assert getattr(telemetry_decoder, f"{name}_SCALE") == getattr(
+            telemetry, f"{name}_SCALE"
+        )
+
+
+def test_records_round_trip():
+    records = [
+        make_record(1700000000 + i * 90, pH=6.5 + i / 10, air=-4.25 + i, water=24.5)
+        for i in range(10)
+    ]
+    frames, readings = round_trip(records)
+    assert len(frames) == 1
+    assert readings == [expected_reading(record) for record in records]
+
+
+def test_records_split_across_frames_at_max_records():
+    records = [make_record(1700000000 + i) for i in range(70)]
+    frames, readings = round_trip(records)
+    assert [frame[1] for frame in frames] == [32, 32, 6]
+    assert readings == [expected_reading(record) for record in records]
+
+
+def test_values_saturate_at_the_limits_of_a_field():
+    record = make_record(1700000000, pH=100.0, saturation=-5000.0, air=-400.0)
+    assert record.pH == 0x7FFF
+    assert record.DO_percent_saturation == -0x8000
+    assert record.air_temp == -0x8000
+
+    _, readings = round_trip([record])
+    assert readings[0].pH == 0x7FFF / telemetry.PH_SCALE
+    assert readings[0].DO_percent_saturation == -3276.8
+    assert readings[0].air_temp == -327.68
+
+
+def test_offset_overflow_starts_a_new_frame():
+    base = 1700000000
+    records = [
+        make_record(base),
+        make_record(base + 0xFFFF),
+        make_record(base + 0x10000),
+        make_record(base + 0x10001),
+    ]
+    frames, readings = round_trip(records)
+    assert [struct.unpack_from("<BBI", frame)[1:] for frame in frames] == [
+        (2, base),
+        (2, base + 0x10000),
+    ]
+    assert readings == [expected_reading(record) for record in records]
+
+
+def test_timestamp_before_the_frame_base_starts_a_new_frame():
+    records = [make_record(1700000100), make_record(1700000000)]
+    frames, readings = round_trip(records)
+    assert len(frames) == 2
+    assert readings == [expected_reading(record) for record in records]
+
+
+def test_version_mismatch_is_rejected():
+    (frame,) = FrameEncoder().frames([make_record(1700000000)])
+    frame = bytes([telemetry.VERSION + 1]) + frame[1:]
+    with pytest.raises(DecodeError, match="version"):
+        decode_frame(frame)
+
+
+@pytest.mark.parametrize("length", [0, telemetry.HEADER_SIZE - 1])
+def test_frame_shorter_than_a_header_is_rejected(length):
+    (frame,) = FrameEncoder().frames([make_record(1700000000)])
+    with pytest.raises(DecodeError, match="header"):
+        decode_frame(frame[:length])
+
+
+def test_truncated_frame_is_rejected():
+    records = [make_record(1700000000 + i) for i in range(3)]
+    (frame,) = FrameEncoder().frames(records)
+    with pytest.raises(DecodeError, match="3 records"):
+        decode_frame(frame[:-1])
+    with pytest.raises(DecodeError, match="3 records"):
+        decode_frame(frame + b"\0")
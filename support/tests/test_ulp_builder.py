@@ -0,0 +1,36 @@
+import re
+import minidwarf
+import ulp_builder
+from simulator import SYMBOLS
+
+# The format characters CircuitPython's struct module understands
+CIRCUITPYTHON_STRUCT_CODES = set("bBhHiIlLqQfdsPx")
+
+
+def assert_circuitpython_format(fmt):
+    codes = set(re.sub(r"^[<>!=@]|\d", "", fmt))
+    assert (
+        codes <= CIRCUITPYTHON_STRUCT_CODES
+    ), f"{fmt} uses {codes - CIRCUITPYTHON_STRUCT_CODES}"
+
+
+def test_type_codes_are_supported_by_circuitpython():
+    for code in ulp_builder.C_TYPE_CODES.values():
+        assert_circuitpython_format(code)
+    for codes in minidwarf.BASE_TYPE_CODES.values():
+        for code in codes.values():
+            assert_circuitpython_format(code)
+    for code in ulp_builder.UNSIGNED_CODES.values():
+        assert_circuitpython_format(code)
+
+
+def test_generated_formats_are_supported_by_circuitpython():
+    source = ulp_builder.render_python_code(
+        ulp_builder.get_template_environment(), b"", SYMBOLS, "test"
+    )
+    formats = re.findall(r'_FORMAT = "([^"]*)"', source)
+    formats += re.findall(r'struct\.(?:un)?pack(?:_from|_into)?\(\s*"([^"]*)"', source)
+    formats += re.findall(r'\(\d+, "(\w)", \d+\)', source)
+    assert any(fmt.startswith("<") and "h" in fmt for fmt in formats)
+    for fmt in formats:
+        assert_circuitpython_format(fmt)
@@ -1,62 +1,325 @@
-import base64
-from collections import defaultdict
+import argparse
+import hashlib
 from jinja2 import Environment, FileSystemLoader
 import os
 import re
+import struct
+import sys
+import zlib
+import minidwarf
 import minielf as minielf
 
 project_root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
 
+# Length and CRC32 of the code that follows, see ULP.start in ulp.py.j2
+FIRMWARE_HEADER_FORMAT = "<II"
 
+# One entry of the ULP's readings ring buffer, must match reading_t in ulp/main.c
+READING_FORMAT = "<IhhhhB3x"
+
+# Exported variables: C type, name and any array dimensions
+EXPORT_PATTERN = r"EXPORT volatile (\w+) (\w+)((?:\[[^\]]*\])*)"
+
+# Struct codes of the C types ulp/main.c exports, for when there's no DWARF.
+# CircuitPython's struct has no "?", so bools are read as 0 or 1.
+C_TYPE_CODES = {
+    "bool": "B",
+    "int8_t": "b",
+    "uint8_t": "B",
+    "int16_t": "h",
+    "uint16_t": "H",
+    "int32_t": "i",
+    "uint32_t": "I",
+}
+# Other scalars, such as enums, are read as unsigned integers of their size
+UNSIGNED_CODES = {1: "B", 2: "H", 4: "I"}
+
+# What ulp.py needs the ULP to export
+REQUIRED_SYMBOLS = [
+    "calibration_ready",
+    "debug",
+    "run_mode",
+    "modified",
+    "pH",
+    "DO",
+    "air_temp",
+    "water_temp",
+    "readings",
+    "readings_head",
+    "readings_tail",
+    "sample_interval",
+    "sample_interval_min",
+    "sample_interval_max",
+    "sample_interval_backoff",
+    "filter_ema_shift",
+    "onewire_roms",
+    "onewire_found",
+    "onewire_found_count",
+    "onewire_resolution",
+    "analog_settle_ms",
+    "calibration_stats",
+    "calibration_threshold",
+    "calibration_watch",
+]
+
+# Fields of SharedMemorySnapshot in ulp.py, read with a single copy
+SNAPSHOT_SYMBOLS = [
+    "calibration_ready",
+    "debug",
+    "run_mode",
+    "modified",
+    "pH",
+    "DO",
+    "air_temp",
+    "water_temp",
+]
+
+# Per-sensor arrays of change detection settings and noise statistics, indexed
+# by the sensor IDs in ulp/main.c
+SENSOR_ARRAY_SYMBOLS = [
+    "thresholds",
+    "hysteresis",
+    "filters",
+    "oversample",
+    "noise",
+    "noise_peak",
+]
+
+# Must match ONEWIRE_ROM_SIZE in ulp/main.c
+ONEWIRE_ROM_SIZE = 8
+
+# Summary of the ULP's calibration window, must match calibration_stats_t in
+# ulp/main.c: sequence, mean, minimum and maximum of pH and DO, count, stable
+CALIBRATION_STATS_FORMAT = "<IHHHHHHHBx"
+
+
+# Lays out what the ULP exports from the symbols of `bin_path`, typed by the
+# DWARF in `debug_path` if there is one, or else by the declarations in
+# `source_path`
 class ULPBuilder:
-    def __init__(self, source_path, bin_path):
+    def __init__(self, source_path, bin_path, debug_path=None):
+        variable_types = None
+        if debug_path is not None and os.path.exists(debug_path):
+            debug_elf = minielf.ELFFile(open(debug_path, "rb"))
+            try:
+                variable_types = minidwarf.read_variable_types(debug_elf)
+            finally:
+                debug_elf.close()
+
         elf = minielf.ELFFile(open(bin_path, "rb"))
-        code_header = elf.get_header_by_type(minielf.PT_LOAD)
-        symtab = elf.get_section_by_name(".symtab")
-        self.__code = bytes(elf.pread(code_header.p_offset, code_header.p_filesz))
-        self.__symbols = self.__get_symbols(source_path, symtab)
+        try:
+            code_header = elf.get_header_by_type(minielf.PT_LOAD)
+            symtab = elf.get_section_by_name(".symtab")
+            self.__code = bytes(elf.pread(code_header.p_offset, code_header.p_filesz))
+            self.__symbols = self.__get_symbols(source_path, symtab, variable_types)
+        finally:
+            elf.close()
 
-    def generate_python_code(self, out_path):
-        env = Environment(
-            loader=FileSystemLoader(os.path.join(project_root, "templates"))
+        self.__env = get_template_environment()
+
+    # Identifies the generated output by what it's made of: the code segment and
+    # ulp.py as rendered without a hash, so a change to anything the template
+    # is given (symbols, formats, sizes or the template itself) changes it
+    def get_build_hash(self):
+        h = hashlib.sha256()
+        h.update(self.__code)
+        h.update(
+            render_python_code(self.__env, self.__code, self.__symbols, "").encode()
+        )
+        return h.hexdigest()
+
+    def get_firmware(self):
+        return build_firmware(self.__code)
+
+    def is_up_to_date(self, out_path, firmware_path):
+        return (
+            read_build_hash(out_path) == self.get_build_hash()
+            and read_bytes(firmware_path) == self.get_firmware()
+        )
+
+    def render_python_code(self):
+        return render_python_code(
+            self.__env, self.__code, self.__symbols, self.get_build_hash()
         )
-        template = env.get_template("ulp.py.j2")
-        out = template.render(code=self.__code, symbols=self.__symbols)
+
+    # Returns False if the output was already up to date and left untouched
+    def generate_python_code(self, out_path):
+        if read_build_hash(out_path) == self.get_build_hash():
+            return False
         with open(out_path, "w") as f:
-            f.write(out)
+            f.write(self.render_python_code())
+        return True
 
-    def __get_symbols(self, source_path, symtab):
-        with open(source_path, "r") as f:
-            source_code = f.read()
+    # Returns False if the output was already up to date and left untouched
+    def generate_firmware(self, out_path):
+        firmware = self.get_firmware()
+        if read_bytes(out_path) == firmware:
+            return False
+        with open(out_path, "wb") as f:
+            f.write(firmware)
+        return True
 
-        pattern = r"EXPORT volatile uint8_t ([a-zA-Z_][a-zA-Z_0-9]+)"
-        sensor_symbol_names = re.findall(pattern, source_code)
-        sensors = defaultdict(list)
+    def __get_symbols(self, source_path, symtab, variable_types):
+        with open(source_path, "r") as f:
+            declarations = {
+                name: (c_type, dimensions)
+                for c_type, name, dimensions in re.findall(EXPORT_PATTERN, f.read())
+            }
+        missing = [name for name in REQUIRED_SYMBOLS if name not in declarations]
+        symbols = symtab.get_symbols_by_name(declarations)
+        missing += [name for name, symbol in symbols.items() if symbol is None]
+        if missing:
+            raise Exception(f"Symbols {', '.join(missing)} not found")
 
-        sensor_symbol_names.sort()
+        fields = {}
+        for name, (c_type, dimensions) in declarations.items():
+            symbol = symbols[name]
+            if variable_types is not None and name in variable_types:
+                code, size, length = variable_types[name]
+            else:
+                code = C_TYPE_CODES.get(c_type)
+                if code is None and not dimensions:
+                    code = UNSIGNED_CODES.get(symbol.st_size)
+                size = struct.calcsize(code) if code else symbol.st_size
+                length = symbol.st_size // size if dimensions else 0
+            if size * max(length, 1) != symbol.st_size:
+                raise Exception(
+                    f"{name} is {symbol.st_size} bytes, not {length or 1} of {size}"
+                )
+            # Structs are left to the formats above
+            fields[name] = {
+                "address": symbol.st_value,
+                "code": code,
+                "size": size,
+                "length": length,
+            }
 
-        for symbol_name in sensor_symbol_names:
-            symbol = symtab.get_first_symbol_by_name(symbol_name)
-            if symbol is None:
-                raise Exception(f"Symbol {symbol_name} not found")
-            try:
-                prefix = symbol_name.rsplit("_", 1)[0]
-                sensors[prefix].append(symbol.entry.st_value)
-            except ValueError:
-                sensors[symbol_name].append(symbol.entry.st_value)
+        for name, fmt in (
+            ("readings", READING_FORMAT),
+            ("calibration_stats", CALIBRATION_STATS_FORMAT),
+        ):
+            if symbols[name].st_size % struct.calcsize(fmt):
+                raise Exception(f"{name} doesn't match its format {fmt}")
 
         return {
-            "calibration_ready": symtab.get_first_symbol_by_name(
-                "calibration_ready"
-            ).entry.st_value,
-            "debug": symtab.get_first_symbol_by_name("debug").entry.st_value,
-            "run_mode": symtab.get_first_symbol_by_name("run_mode").entry.st_value,
-            "sensors": sensors,
+            "fields": fields,
+            "readings": {
+                "address": symbols["readings"].st_value,
+                "length": symbols["readings"].st_size
+                // struct.calcsize(READING_FORMAT),
+            },
         }
 
 
-builder = ULPBuilder(
-    os.path.join(project_root, "ulp/main.c"),
-    os.path.join(project_root, "build/ulp"),
-)
-builder.generate_python_code(os.path.join(project_root, "circuitpy/ulp.py"))
+def get_template_environment():
+    return Environment(loader=FileSystemLoader(os.path.join(project_root, "templates")))
+
+
+def render_python_code(env, code, symbols, build_hash):
+    template = env.get_template("ulp.py.j2")
+    return template.render(
+        firmware_header_format=FIRMWARE_HEADER_FORMAT,
+        reading_format=READING_FORMAT,
+        onewire_rom_size=ONEWIRE_ROM_SIZE,
+        calibration_stats_format=CALIBRATION_STATS_FORMAT,
+        sensor_arrays=SENSOR_ARRAY_SYMBOLS,
+        code_length=len(code),
+        code_crc32=zlib.crc32(code),
+        symbols=symbols,
+        layout=get_snapshot_layout(symbols),
+        build_hash=build_hash,
+    )
+
+
+def build_firmware(code):
+    header = struct.pack(FIRMWARE_HEADER_FORMAT, len(code), zlib.crc32(code))
+    return header + code
+
+
+# Describes the smallest contiguous region of shared memory containing every
+# field of SNAPSHOT_SYMBOLS, and a struct format to decode it with a single
+# unpack_from. Each field gets the index of its value in the unpacked tuple.
+def get_snapshot_layout(symbols):
+    fields = symbols["fields"]
+    ordered = sorted(SNAPSHOT_SYMBOLS, key=lambda name: fields[name]["address"])
+    start = fields[ordered[0]]["address"]
+    fmt = "<"
+    position = start
+    for name in ordered:
+        field = fields[name]
+        if field["address"] < position:
+            raise Exception(f"{name} overlaps another snapshot field")
+        if field["address"] > position:
+            fmt += f"{field['address'] - position}x"
+        fmt += field["code"]
+        position = field["address"] + field["size"]
+    return {
+        "start": start,
+        "length": position - start,
+        "format": fmt,
+        "fields": [(name, ordered.index(name)) for name in SNAPSHOT_SYMBOLS],
+    }
+
+
+def read_bytes(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def read_build_hash(out_path):
+    try:
+        with open(out_path, "r") as f:
+            for line in f:
+                match = re.match(r"# Build hash: ([0-9a-f]+)", line)
+                if match:
+                    return match.group(1)
+                if not line.startswith("#"):
+                    break
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate circuitpy/ulp.py and circuitpy/ulp.bin"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with status 1 if ulp.py or ulp.bin need to be regenerated",
+    )
+    args = parser.parse_args()
+
+    out_path = os.path.join(project_root, "circuitpy/ulp.py")
+    firmware_path = os.path.join(project_root, "circuitpy/ulp.bin")
+    builder = ULPBuilder(
+        os.path.join(project_root, "ulp/main.c"),
+        os.path.join(project_root, "build/ulp"),
+        os.path.join(project_root, "build/ulp-debug"),
+    )
+
+    if args.check:
+        if builder.is_up_to_date(out_path, firmware_path):
+            print("ulp.py and ulp.bin are up to date")
+        else:
+            print("ulp.py or ulp.bin need to be regenerated")
+            sys.exit(1)
+        return
+
+    for path, generate in (
+        (out_path, builder.generate_python_code),
+        (firmware_path, builder.generate_firmware),
+    ):
+        name = os.path.basename(path)
+        if generate(path):
+            print(f"Generated {name}")
+        else:
+            print(f"{name} is up to date, leaving it untouched")
+
+
+if __name__ == "__main__":
+    main()
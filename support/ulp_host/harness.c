@@ -0,0 +1,780 @@
+/**
+ * Host harness for ulp/main.c
+ *
+ * Builds the ULP program against the stand-in headers in include/ and replays
+ * a CSV trace of raw sensor values through it on a virtual clock, so a day of
+ * sampling takes milliseconds. Delays advance the clock, the ADC returns the
+ * trace, and the DS18B20s are emulated at the bit level on the 1-Wire pin.
+ * Between runs the clock skips ahead by whatever the ULP wrote to its wake
+ * timer, and a wake of the main processor drains the readings buffer.
+ *
+ * Usage: ulp_host [-n adc_noise] [-e crc_error_rate] [-c calibration_seconds]
+ *                 [-r seed] [-x probe] [-p] trace.csv
+ *
+ * -x swaps the air (0) or water (1) probe for one the firmware doesn't know.
+ * -p parasite powers the probes: they can't hold read slots low while
+ * converting, and a conversion only completes if the bus is driven high
+ * until it's done.
+ *
+ * The trace has a header row, then rows of seconds,pH,DO,air_temp,water_temp
+ * in raw units, i.e. ADC counts and 1/16ths of a degree C. Values are
+ * interpolated between rows and the replay ends at the last one. Totals are
+ * printed as name=value lines, see support/benchmark_ulp.py.
+ */
+#ifdef DEBUG
+/**
+ * A DEBUG build pauses after every update until the main processor resumes
+ * it, so its rate depends on how fast the main processor boots, which isn't
+ * simulated here
+ */
+#error "ulp_host can't replay a DEBUG build"
+#endif
+
+#include <math.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+#define main ulp_main
+#include "main.c"
+#undef main
+
+#define NS_PER_US 1000ULL
+#define NS_PER_S 1000000000ULL
+// Roughly how long the ULP's ADC takes to convert
+#define ADC_READ_NS (20 * NS_PER_US)
+// Reset value of RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE
+#define DEFAULT_SLEEP_CYCLES 200
+
+/**
+ * Virtual clock and counters
+ */
+static uint64_t now;
+static uint64_t calibration_end;
+static uint32_t adc_noise;
+static double crc_error_rate;
+
+static struct
+{
+    uint64_t updates;
+    uint64_t wakes;
+    uint64_t readings;
+    uint64_t adc_reads;
+    uint64_t onewire_resets;
+    uint64_t onewire_bytes;
+    uint64_t conversions;
+    uint64_t crc_errors;
+    uint64_t active_ns;
+    uint64_t modified[SENSOR_COUNT];
+} counters;
+static bool woke;
+
+/**
+ * Deterministic PRNG for noise and errors, so runs are comparable
+ */
+static uint64_t rng_state = 0x853c49e6748fea9bULL;
+
+static uint32_t rng_next(void)
+{
+    rng_state ^= rng_state << 13;
+    rng_state ^= rng_state >> 7;
+    rng_state ^= rng_state << 17;
+    return rng_state >> 32;
+}
+static double rng_uniform(void)
+{
+    return rng_next() / 4294967296.0;
+}
+
+/**
+ * Trace
+ */
+#define TRACE_COLUMNS 5
+
+static double *trace;
+static size_t trace_rows;
+static size_t trace_cursor;
+
+static void load_trace(const char *path)
+{
+    FILE *f = fopen(path, "r");
+    if (!f)
+    {
+        perror(path);
+        exit(1);
+    }
+    char line[256];
+    if (!fgets(line, sizeof(line), f) || strncmp(line, "seconds,pH,DO,air_temp,water_temp", 33) != 0)
+    {
+        fprintf(stderr, "%s: expected a seconds,pH,DO,air_temp,water_temp header\n", path);
+        exit(1);
+    }
+    size_t capacity = 1024;
+    trace = malloc(capacity * TRACE_COLUMNS * sizeof(double));
+    while (fgets(line, sizeof(line), f))
+    {
+        if (trace_rows == capacity)
+        {
+            capacity *= 2;
+            trace = realloc(trace, capacity * TRACE_COLUMNS * sizeof(double));
+        }
+        double *row = &trace[trace_rows * TRACE_COLUMNS];
+        if (sscanf(line, "%lf,%lf,%lf,%lf,%lf", &row[0], &row[1], &row[2], &row[3], &row[4]) != TRACE_COLUMNS)
+        {
+            fprintf(stderr, "%s: bad row %zu\n", path, trace_rows + 2);
+            exit(1);
+        }
+        if (trace_rows > 0 && row[0] < row[-TRACE_COLUMNS])
+        {
+            fprintf(stderr, "%s: rows must be in time order\n", path);
+            exit(1);
+        }
+        trace_rows++;
+    }
+    fclose(f);
+    if (trace_rows == 0)
+    {
+        fprintf(stderr, "%s: no rows\n", path);
+        exit(1);
+    }
+}
+
+static double trace_value(int column)
+{
+    double seconds = (double)now / NS_PER_S;
+    while (trace_cursor + 1 < trace_rows && trace[(trace_cursor + 1) * TRACE_COLUMNS] <= seconds)
+    {
+        trace_cursor++;
+    }
+    double *row = &trace[trace_cursor * TRACE_COLUMNS];
+    if (trace_cursor + 1 == trace_rows || seconds <= row[0])
+    {
+        return row[column];
+    }
+    double *next = row + TRACE_COLUMNS;
+    double position = (seconds - row[0]) / (next[0] - row[0]);
+    return row[column] + (next[column] - row[column]) * position;
+}
+
+/**
+ * Registers
+ */
+#define REGISTER_COUNT 64
+
+static struct
+{
+    uint32_t address;
+    uint32_t value;
+} registers[REGISTER_COUNT];
+static size_t register_count;
+
+uint32_t mock_reg_read(uint32_t address)
+{
+    if (address == RTC_CNTL_TIME_LOW0_REG || address == RTC_CNTL_TIME_HIGH0_REG)
+    {
+        uint64_t slow_clock = now * RTC_SLOW_CLK_HZ / NS_PER_S;
+        return address == RTC_CNTL_TIME_LOW0_REG ? (uint32_t)slow_clock : (uint32_t)(slow_clock >> 32);
+    }
+    for (size_t i = 0; i < register_count; i++)
+    {
+        if (registers[i].address == address)
+        {
+            return registers[i].value;
+        }
+    }
+    return 0;
+}
+void mock_reg_write(uint32_t address, uint32_t value)
+{
+    for (size_t i = 0; i < register_count; i++)
+    {
+        if (registers[i].address == address)
+        {
+            registers[i].value = value;
+            return;
+        }
+    }
+    if (register_count == REGISTER_COUNT)
+    {
+        fprintf(stderr, "Too many registers\n");
+        exit(1);
+    }
+    registers[register_count].address = address;
+    registers[register_count].value = value;
+    register_count++;
+}
+
+/**
+ * Utils
+ */
+void ulp_riscv_delay_cycles(uint32_t cycles)
+{
+    now += (uint64_t)(cycles * 1000.0 / ULP_RISCV_CYCLES_PER_US);
+}
+void ulp_riscv_wakeup_main_processor(void)
+{
+    woke = true;
+    // Python takes the stable mean and ends calibration, see
+    // wait_for_stable_calibration() in circuitpy/main.py
+    if (run_mode == RUN_MODE_CALIBRATION)
+    {
+        run_mode = RUN_MODE_NORMAL;
+    }
+}
+
+/**
+ * ADC
+ */
+int32_t ulp_riscv_adc_read_channel(adc_unit_t adc_n, int channel)
+{
+    now += ADC_READ_NS;
+    counters.adc_reads++;
+
+    // Python gives up on calibration, see calibrate() in circuitpy/main.py
+    if (run_mode == RUN_MODE_CALIBRATION && now >= calibration_end)
+    {
+        run_mode = RUN_MODE_NORMAL;
+    }
+
+    double value;
+    switch (channel)
+    {
+    case PH_ADC_CHANNEL:
+        value = trace_value(1);
+        break;
+    case DO_ADC_CHANNEL:
+        value = trace_value(2);
+        break;
+    default:
+        return 0;
+    }
+    if (adc_noise)
+    {
+        value += (int32_t)(rng_next() % (2 * adc_noise + 1)) - (int32_t)adc_noise;
+    }
+    // 13-bit ADC
+    return value < 0 ? 0 : value > 0x1FFF ? 0x1FFF : lround(value);
+}
+
+/**
+ * DS18B20s
+ *
+ * A slot starts when the master pulls the bus low. Held low for 480us it's a
+ * reset, for 60us a 0 being written. Released straight away it's either a 1
+ * being written or a read, which only becomes clear when the master next
+ * samples the bus or starts another slot.
+ */
+typedef enum
+{
+    DEVICE_ROM_COMMAND,
+    DEVICE_MATCH_ROM,
+    DEVICE_SEARCH,
+    DEVICE_FUNCTION_COMMAND,
+    DEVICE_WRITE_SCRATCHPAD,
+    DEVICE_TRANSMIT,
+    DEVICE_CONVERTING,
+    DEVICE_POWER_SUPPLY,
+    DEVICE_IDLE,
+} device_state_t;
+
+typedef struct
+{
+    uint8_t rom[ONEWIRE_ROM_SIZE];
+    int trace_column;
+    device_state_t state;
+    uint8_t bits;
+    uint8_t byte;
+    // Bytes matched or written, or bits transmitted or searched
+    uint8_t index;
+    // Searching sends each ROM bit, then its complement, then reads a direction
+    uint8_t search_phase;
+    uint8_t scratchpad[9];
+    uint64_t converted_at;
+    // A parasite powered conversion's result, until the strong pull-up ends
+    bool parasite;
+    bool pending;
+    int16_t pending_temp;
+} device_t;
+
+// Stands in for either probe with -x
+#define SPARE_ONEWIRE_ADDRESS {0x28, 0x3c, 0x41, 0x96, 0x25, 0x20, 0x01, 0x7c}
+
+static device_t devices[] = {
+    {.rom = AIR_TEMP_ONEWIRE_ADDRESS, .trace_column = 3},
+    {.rom = WATER_TEMP_ONEWIRE_ADDRESS, .trace_column = 4},
+};
+#define DEVICE_COUNT (sizeof(devices) / sizeof(devices[0]))
+
+static bool bus_low;
+static uint64_t bus_low_since;
+static bool short_slot;
+static bool presence;
+// The bus is driven high rather than pulled up, powering parasite devices
+static bool strong_pullup;
+
+static uint8_t maxim_crc8(const uint8_t *data, uint8_t len)
+{
+    uint8_t crc = 0;
+    for (uint8_t i = 0; i < len; i++)
+    {
+        crc ^= data[i];
+        for (uint8_t j = 0; j < 8; j++)
+        {
+            crc = crc & 1 ? (crc >> 1) ^ 0x8C : crc >> 1;
+        }
+    }
+    return crc;
+}
+
+static uint8_t device_resolution(device_t *device)
+{
+    return ((device->scratchpad[4] >> 5) & 0x3) + 9;
+}
+
+static void device_power_on(device_t *device)
+{
+    // 85C, the factory alarm thresholds and 12 bits
+    uint8_t scratchpad[9] = {0x50, 0x05, 0x4B, 0x46, 0x7F, 0xFF, 0x0C, 0x10, 0};
+    memcpy(device->scratchpad, scratchpad, sizeof(scratchpad));
+    device->state = DEVICE_IDLE;
+}
+
+static void device_convert(device_t *device)
+{
+    uint8_t resolution = device_resolution(device);
+    int16_t temp = lround(trace_value(device->trace_column));
+    temp &= ~((1 << (12 - resolution)) - 1);
+    device->converted_at = now + (DS18B20_MAX_CONVERSION_MS * NS_PER_S / 1000 >> (12 - resolution));
+    counters.conversions++;
+    if (device->parasite)
+    {
+        device->pending = true;
+        device->pending_temp = temp;
+        device->state = DEVICE_IDLE;
+        return;
+    }
+    device->scratchpad[0] = temp & 0xFF;
+    device->scratchpad[1] = (temp >> 8) & 0xFF;
+    device->state = DEVICE_CONVERTING;
+}
+
+// Ends the strong pull-up, which completes parasite powered conversions that
+// had long enough
+static void device_release_strong_pullup(device_t *device)
+{
+    if (device->pending && now >= device->converted_at)
+    {
+        device->scratchpad[0] = device->pending_temp & 0xFF;
+        device->scratchpad[1] = (device->pending_temp >> 8) & 0xFF;
+    }
+    device->pending = false;
+}
+
+static void device_receive_byte(device_t *device, uint8_t byte)
+{
+    switch (device->state)
+    {
+    case DEVICE_ROM_COMMAND:
+        device->index = 0;
+        if (byte == SKIP_ROM)
+        {
+            device->state = DEVICE_FUNCTION_COMMAND;
+        }
+        else if (byte == MATCH_ROM)
+        {
+            device->state = DEVICE_MATCH_ROM;
+        }
+        else if (byte == SEARCH_ROM)
+        {
+            device->state = DEVICE_SEARCH;
+            device->search_phase = 0;
+        }
+        else
+        {
+            device->state = DEVICE_IDLE;
+        }
+        break;
+
+    case DEVICE_MATCH_ROM:
+        if (byte != device->rom[device->index])
+        {
+            device->state = DEVICE_IDLE;
+        }
+        else if (++device->index == ONEWIRE_ROM_SIZE)
+        {
+            device->state = DEVICE_FUNCTION_COMMAND;
+        }
+        break;
+
+    case DEVICE_FUNCTION_COMMAND:
+        device->index = 0;
+        if (byte == CONVERT_T)
+        {
+            device_convert(device);
+        }
+        else if (byte == WRITE_SCRATCHPAD)
+        {
+            device->state = DEVICE_WRITE_SCRATCHPAD;
+        }
+        else if (byte == READ_POWER_SUPPLY)
+        {
+            device->state = DEVICE_POWER_SUPPLY;
+        }
+        else if (byte == READ_SCRATCHPAD)
+        {
+            device->state = DEVICE_TRANSMIT;
+            device->scratchpad[8] = maxim_crc8(device->scratchpad, 8);
+            if (crc_error_rate > 0 && rng_uniform() < crc_error_rate)
+            {
+                device->scratchpad[0] ^= 1 << (rng_next() % 8);
+                counters.crc_errors++;
+            }
+        }
+        else
+        {
+            device->state = DEVICE_IDLE;
+        }
+        break;
+
+    case DEVICE_WRITE_SCRATCHPAD:
+        // TH, TL and the config register, whose low bits always read 1
+        device->scratchpad[2 + device->index] = device->index == 2 ? byte | 0x1F : byte;
+        if (++device->index == 3)
+        {
+            device->state = DEVICE_IDLE;
+        }
+        break;
+
+    default:
+        break;
+    }
+}
+
+static void onewire_reset_devices(void)
+{
+    counters.onewire_resets++;
+    for (size_t i = 0; i < DEVICE_COUNT; i++)
+    {
+        devices[i].state = DEVICE_ROM_COMMAND;
+        devices[i].bits = 0;
+        devices[i].byte = 0;
+    }
+    presence = DEVICE_COUNT > 0;
+}
+
+static void onewire_slot_write(bool bit)
+{
+    bool byte_complete = false;
+    for (size_t i = 0; i < DEVICE_COUNT; i++)
+    {
+        device_t *device = &devices[i];
+        if (device->state == DEVICE_SEARCH)
+        {
+            // Devices whose bit isn't the chosen direction drop out
+            bool rom_bit = (device->rom[device->index / 8] >> (device->index % 8)) & 1;
+            if (device->search_phase != 2 || bit != rom_bit)
+            {
+                device->state = DEVICE_IDLE;
+            }
+            else if (++device->index == ONEWIRE_ROM_SIZE * 8)
+            {
+                device->state = DEVICE_IDLE;
+            }
+            device->search_phase = 0;
+            continue;
+        }
+        if (device->state == DEVICE_IDLE || device->state == DEVICE_TRANSMIT || device->state == DEVICE_CONVERTING ||
+            device->state == DEVICE_POWER_SUPPLY)
+        {
+            continue;
+        }
+        device->byte |= bit << device->bits;
+        if (++device->bits == 8)
+        {
+            uint8_t byte = device->byte;
+            device->bits = 0;
+            device->byte = 0;
+            byte_complete = true;
+            device_receive_byte(device, byte);
+        }
+    }
+    if (byte_complete)
+    {
+        counters.onewire_bytes++;
+    }
+}
+
+static bool onewire_slot_read(void)
+{
+    // Open drain, so any device writing a 0 wins
+    bool level = true;
+    for (size_t i = 0; i < DEVICE_COUNT; i++)
+    {
+        device_t *device = &devices[i];
+        if (device->state == DEVICE_CONVERTING)
+        {
+            if (now < device->converted_at)
+            {
+                level = false;
+            }
+            else
+            {
+                device->state = DEVICE_IDLE;
+            }
+        }
+        else if (device->state == DEVICE_SEARCH)
+        {
+            bool rom_bit = (device->rom[device->index / 8] >> (device->index % 8)) & 1;
+            if (device->search_phase < 2)
+            {
+                level &= device->search_phase == 0 ? rom_bit : !rom_bit;
+                device->search_phase++;
+            }
+        }
+        else if (device->state == DEVICE_POWER_SUPPLY)
+        {
+            level &= !device->parasite;
+            device->state = DEVICE_IDLE;
+        }
+        else if (device->state == DEVICE_TRANSMIT)
+        {
+            uint8_t bit = device->index++;
+            if (bit >= 8 * sizeof(device->scratchpad))
+            {
+                device->state = DEVICE_IDLE;
+                continue;
+            }
+            level &= (device->scratchpad[bit / 8] >> (bit % 8)) & 1;
+        }
+    }
+    return level;
+}
+
+/**
+ * GPIO
+ */
+void ulp_riscv_gpio_init(gpio_num_t gpio_num) {}
+void ulp_riscv_gpio_input_enable(gpio_num_t gpio_num) {}
+void ulp_riscv_gpio_output_enable(gpio_num_t gpio_num) {}
+void ulp_riscv_gpio_pullup(gpio_num_t gpio_num) {}
+void ulp_riscv_gpio_pulldown_disable(gpio_num_t gpio_num) {}
+
+void ulp_riscv_gpio_set_output_mode(gpio_num_t gpio_num, rtc_io_out_mode_t mode)
+{
+    if (gpio_num != ONEWIRE_BUS)
+    {
+        return;
+    }
+    bool was_strong = strong_pullup;
+    strong_pullup = mode == RTCIO_MODE_OUTPUT;
+    if (was_strong && !strong_pullup)
+    {
+        for (size_t i = 0; i < DEVICE_COUNT; i++)
+        {
+            device_release_strong_pullup(&devices[i]);
+        }
+    }
+}
+
+void ulp_riscv_gpio_output_level(gpio_num_t gpio_num, uint8_t level)
+{
+    if (gpio_num != ONEWIRE_BUS)
+    {
+        return;
+    }
+    if (!level)
+    {
+        // Parasite devices lose a conversion the bus stops powering
+        for (size_t i = 0; i < DEVICE_COUNT; i++)
+        {
+            devices[i].pending = false;
+        }
+        if (short_slot)
+        {
+            onewire_slot_write(1);
+            short_slot = false;
+        }
+        presence = false;
+        bus_low = true;
+        bus_low_since = now;
+        return;
+    }
+    if (!bus_low)
+    {
+        return;
+    }
+    bus_low = false;
+    uint64_t held = now - bus_low_since;
+    if (held >= 480 * NS_PER_US)
+    {
+        onewire_reset_devices();
+    }
+    else if (held >= 15 * NS_PER_US)
+    {
+        onewire_slot_write(0);
+    }
+    else
+    {
+        short_slot = true;
+    }
+}
+
+uint8_t ulp_riscv_gpio_get_level(gpio_num_t gpio_num)
+{
+    if (gpio_num != ONEWIRE_BUS)
+    {
+        return 0;
+    }
+    if (bus_low)
+    {
+        return 0;
+    }
+    if (presence)
+    {
+        presence = false;
+        return 0;
+    }
+    if (short_slot)
+    {
+        short_slot = false;
+        return onewire_slot_read();
+    }
+    return 1;
+}
+
+/**
+ * Replay
+ */
+static void run_ulp(void)
+{
+    uint64_t started = now;
+    uint32_t readings_before = readings_head;
+    woke = false;
+
+    ulp_main();
+
+    counters.updates++;
+    counters.active_ns += now - started;
+    counters.readings += readings_head - readings_before;
+    for (int i = 0; i < SENSOR_COUNT; i++)
+    {
+        counters.modified[i] += (modified >> i) & 1;
+    }
+    if (woke)
+    {
+        // The main processor uploads everything buffered
+        counters.wakes++;
+        readings_tail = readings_head;
+    }
+}
+
+int main(int argc, char **argv)
+{
+    double calibration_seconds = 0;
+    int opt;
+    uint8_t spare[ONEWIRE_ROM_SIZE] = SPARE_ONEWIRE_ADDRESS;
+    for (size_t i = 0; i < DEVICE_COUNT; i++)
+    {
+        device_power_on(&devices[i]);
+    }
+    while ((opt = getopt(argc, argv, "n:e:c:r:x:p")) != -1)
+    {
+        switch (opt)
+        {
+        case 'n':
+            adc_noise = strtoul(optarg, NULL, 10);
+            break;
+        case 'e':
+            crc_error_rate = strtod(optarg, NULL);
+            break;
+        case 'c':
+            calibration_seconds = strtod(optarg, NULL);
+            break;
+        case 'r':
+            rng_state = strtoull(optarg, NULL, 10) * 0x9E3779B97F4A7C15ULL | 1;
+            break;
+        case 'x':
+            if (strtoul(optarg, NULL, 10) >= DEVICE_COUNT)
+            {
+                fprintf(stderr, "No probe %s\n", optarg);
+                return 2;
+            }
+            memcpy(devices[strtoul(optarg, NULL, 10)].rom, spare, sizeof(spare));
+            break;
+        case 'p':
+            for (size_t i = 0; i < DEVICE_COUNT; i++)
+            {
+                devices[i].parasite = true;
+            }
+            break;
+        default:
+            fprintf(stderr, "Usage: %s [-n adc_noise] [-e crc_error_rate] [-c calibration_seconds] [-r seed] [-x probe] [-p] trace.csv\n", argv[0]);
+            return 2;
+        }
+    }
+    if (optind != argc - 1)
+    {
+        fprintf(stderr, "Expected a single trace\n");
+        return 2;
+    }
+    load_trace(argv[optind]);
+
+    now = (uint64_t)(trace[0] * NS_PER_S);
+    uint64_t end = (uint64_t)(trace[(trace_rows - 1) * TRACE_COLUMNS] * NS_PER_S);
+    REG_SET_FIELD(RTC_CNTL_ULP_CP_TIMER_1_REG, RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE, DEFAULT_SLEEP_CYCLES);
+
+    // Calibrates DO for up to calibration_seconds, or until the ULP finds its
+    // window stable and wakes the main processor
+    uint64_t calibration_adc_reads = 0;
+    uint64_t calibration_ns = 0;
+    bool calibration_stable = false;
+    if (calibration_seconds > 0)
+    {
+        uint64_t calibration_start = now;
+        run_mode = RUN_MODE_CALIBRATION;
+        calibration_watch = 1 << DO_SENSOR_ID;
+        calibration_end = now + (uint64_t)(calibration_seconds * NS_PER_S);
+        run_ulp();
+        calibration_watch = 0;
+        calibration_adc_reads = counters.adc_reads;
+        calibration_ns = now - calibration_start;
+        calibration_stable = counters.wakes > 0;
+        memset(&counters, 0, sizeof(counters));
+    }
+
+    uint64_t start = now;
+    while (now < end)
+    {
+        run_ulp();
+        uint32_t cycles = (REG_READ(RTC_CNTL_ULP_CP_TIMER_1_REG) >> RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE_S) & RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE_V;
+        now += (uint64_t)cycles * NS_PER_S / RTC_SLOW_CLK_HZ;
+    }
+
+    printf("seconds=%.3f\n", (double)(now - start) / NS_PER_S);
+    printf("updates=%llu\n", (unsigned long long)counters.updates);
+    printf("wakes=%llu\n", (unsigned long long)counters.wakes);
+    printf("readings=%llu\n", (unsigned long long)counters.readings);
+    printf("adc_reads=%llu\n", (unsigned long long)counters.adc_reads);
+    printf("calibration_adc_reads=%llu\n", (unsigned long long)calibration_adc_reads);
+    printf("calibration_seconds=%.3f\n", (double)calibration_ns / NS_PER_S);
+    printf("calibration_stable=%d\n", calibration_stable);
+    printf("calibration_DO=%u\n", calibration_stats.mean[DO_SENSOR_ID]);
+    printf("onewire_resets=%llu\n", (unsigned long long)counters.onewire_resets);
+    printf("onewire_bytes=%llu\n", (unsigned long long)counters.onewire_bytes);
+    printf("conversions=%llu\n", (unsigned long long)counters.conversions);
+    printf("crc_errors=%llu\n", (unsigned long long)counters.crc_errors);
+    printf("active_seconds=%.3f\n", (double)counters.active_ns / NS_PER_S);
+    printf("modified=%llu,%llu,%llu,%llu\n",
+           (unsigned long long)counters.modified[PH_SENSOR_ID],
+           (unsigned long long)counters.modified[DO_SENSOR_ID],
+           (unsigned long long)counters.modified[AIR_TEMP_SENSOR_ID],
+           (unsigned long long)counters.modified[WATER_TEMP_SENSOR_ID]);
+    printf("sample_interval=%u\n", sample_interval);
+    printf("noise=%u,%u,%u,%u\n", noise[0], noise[1], noise[2], noise[3]);
+    printf("onewire_found=%u\n", onewire_found_count);
+    printf("temperatures=%d,%d\n", air_temp, water_temp);
+    return 0;
+}
@@ -0,0 +1,3 @@
+#pragma once
+
+// Nothing from here is used on the host
@@ -0,0 +1,20 @@
+#pragma once
+
+/**
+ * Host stand-ins for the parts of esp-idf ulp/main.c uses, see harness.c.
+ * Registers are a sparse map the harness reads back, e.g. for the wake timer.
+ */
+#include <stdint.h>
+#include <stdlib.h>
+
+#define DR_REG_RTCCNTL_BASE 0x3f408000
+
+uint32_t mock_reg_read(uint32_t address);
+void mock_reg_write(uint32_t address, uint32_t value);
+
+#define REG_READ(_r) mock_reg_read(_r)
+#define REG_WRITE(_r, _v) mock_reg_write((_r), (_v))
+#define REG_SET_BIT(_r, _b) REG_WRITE((_r), REG_READ(_r) | (_b))
+#define REG_CLR_BIT(_r, _b) REG_WRITE((_r), REG_READ(_r) & ~(_b))
+#define REG_SET_FIELD(_r, _f, _v) \
+    REG_WRITE((_r), ((REG_READ(_r) & ~((_f##_V) << (_f##_S))) | (((_v) & (_f##_V)) << (_f##_S))))
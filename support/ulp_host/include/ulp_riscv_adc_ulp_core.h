@@ -0,0 +1,25 @@
+#pragma once
+
+#include <stdint.h>
+
+typedef enum
+{
+    ADC_UNIT_1,
+    ADC_UNIT_2,
+} adc_unit_t;
+
+typedef enum
+{
+    ADC_CHANNEL_0,
+    ADC_CHANNEL_1,
+    ADC_CHANNEL_2,
+    ADC_CHANNEL_3,
+    ADC_CHANNEL_4,
+    ADC_CHANNEL_5,
+    ADC_CHANNEL_6,
+    ADC_CHANNEL_7,
+    ADC_CHANNEL_8,
+    ADC_CHANNEL_9,
+} adc_channel_t;
+
+int32_t ulp_riscv_adc_read_channel(adc_unit_t adc_n, int channel);
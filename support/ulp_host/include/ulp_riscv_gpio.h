@@ -0,0 +1,44 @@
+#pragma once
+
+#include <stdint.h>
+
+typedef enum
+{
+    GPIO_NUM_0,
+    GPIO_NUM_1,
+    GPIO_NUM_2,
+    GPIO_NUM_3,
+    GPIO_NUM_4,
+    GPIO_NUM_5,
+    GPIO_NUM_6,
+    GPIO_NUM_7,
+    GPIO_NUM_8,
+    GPIO_NUM_9,
+    GPIO_NUM_10,
+    GPIO_NUM_11,
+    GPIO_NUM_12,
+    GPIO_NUM_13,
+    GPIO_NUM_14,
+    GPIO_NUM_15,
+    GPIO_NUM_16,
+    GPIO_NUM_17,
+    GPIO_NUM_18,
+    GPIO_NUM_19,
+    GPIO_NUM_20,
+    GPIO_NUM_21,
+} gpio_num_t;
+
+typedef enum
+{
+    RTCIO_MODE_OUTPUT,
+    RTCIO_MODE_OUTPUT_OD,
+} rtc_io_out_mode_t;
+
+void ulp_riscv_gpio_init(gpio_num_t gpio_num);
+void ulp_riscv_gpio_input_enable(gpio_num_t gpio_num);
+void ulp_riscv_gpio_output_enable(gpio_num_t gpio_num);
+void ulp_riscv_gpio_set_output_mode(gpio_num_t gpio_num, rtc_io_out_mode_t mode);
+void ulp_riscv_gpio_pullup(gpio_num_t gpio_num);
+void ulp_riscv_gpio_pulldown_disable(gpio_num_t gpio_num);
+void ulp_riscv_gpio_output_level(gpio_num_t gpio_num, uint8_t level);
+uint8_t ulp_riscv_gpio_get_level(gpio_num_t gpio_num);
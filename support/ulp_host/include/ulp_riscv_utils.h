@@ -0,0 +1,9 @@
+#pragma once
+
+#include <stdint.h>
+
+#define ULP_RISCV_CYCLES_PER_US 8.5
+#define ULP_RISCV_CYCLES_PER_MS (int)(1000 * ULP_RISCV_CYCLES_PER_US)
+
+void ulp_riscv_delay_cycles(uint32_t cycles);
+void ulp_riscv_wakeup_main_processor(void);
@@ -16,12 +16,19 @@
 #define RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE 0x00FFFFFF
 #define RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE_V 0xFFFFFF
 #define RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE_S 8
+#define RTC_CNTL_TIME_UPDATE_REG (DR_REG_RTCCNTL_BASE + 0x000C)
+#define RTC_CNTL_TIME_UPDATE (1UL << 31)
+#define RTC_CNTL_TIME_LOW0_REG (DR_REG_RTCCNTL_BASE + 0x0010)
+#define RTC_CNTL_TIME_HIGH0_REG (DR_REG_RTCCNTL_BASE + 0x0014)
 
 #undef ULP_RISCV_CYCLES_PER_MS
 #define ULP_RISCV_CYCLES_PER_MS (int)(1000 * ULP_RISCV_CYCLES_PER_US)
 
 /**
  * Wake-up thresholds
+ *
+ * These are the defaults, the main processor can change them at runtime. See
+ * thresholds below.
  */
 
 // DS18B20 returns temperature in 1/16ths of a degree C, wake every 0.5C
@@ -41,6 +48,74 @@
 // but this is a good happy medium without causing unnecessary wake-ups
 #define DO_THRESHOLD 60
 
+// Reversing the last reported change has to clear the threshold plus this, so
+// a reading sitting on the edge of a threshold doesn't flap back and forth
+#define DS18B20_HYSTERESIS 2
+#define PH_HYSTERESIS 20
+#define DO_HYSTERESIS 15
+
+// Changes this many times larger than the threshold wake the main processor
+// immediately instead of waiting for the readings buffer to fill up
+#define URGENT_THRESHOLD_MULTIPLIER 4
+
+/**
+ * Filtering
+ *
+ * Analog sensors are read `oversample` times and combined with the mean, or
+ * the median to reject spikes. Any sensor can additionally be smoothed across
+ * updates with an exponential moving average weighted 1/2^filter_ema_shift.
+ */
+#define FILTER_NONE 0
+#define FILTER_MEDIAN 1
+#define FILTER_EMA 2
+// ADC has 13-bit resolution, 2^16 / 2^13 = 2^3 = 8 samples fit the mean in 16 bits
+#define ANALOG_OVERSAMPLE 8
+#define MAX_OVERSAMPLE 32
+#define EMA_SHIFT 2
+#define EMA_FRACTION_BITS 8
+// Noise is tracked as a moving average of the change between samples, weighted
+// 1/2^NOISE_SHIFT and in 1/2^NOISE_FRACTION_BITS of a raw unit
+#define NOISE_SHIFT 3
+#define NOISE_FRACTION_BITS 4
+
+/**
+ * Calibration
+ *
+ * While calibrating, the analog sensors are sampled every
+ * CALIBRATION_SAMPLE_MS and summarized over the last CALIBRATION_WINDOW
+ * samples. A window is stable once it's full and spans less than
+ * calibration_threshold.
+ */
+#define CALIBRATION_SAMPLE_MS 100
+#define CALIBRATION_WINDOW 10
+#define CALIBRATION_THRESHOLD 80
+
+/**
+ * Readings buffer
+ *
+ * Readings are appended to a ring buffer rather than waking the main processor
+ * for each one, so it can upload them in one WiFi session. The main processor
+ * is woken when the buffer reaches the high water mark, or for urgent changes.
+ */
+#define READINGS_LENGTH 32
+#define READINGS_HIGH_WATER_MARK 24
+
+/**
+ * Sampling interval
+ *
+ * The interval between updates adapts to how fast the readings are changing.
+ * It drops to the minimum for urgent changes, shrinks by the back-off factor
+ * when a reading crosses its threshold and grows by it while they're stable.
+ * The bounds and factor are exported so the main processor can tune them.
+ */
+#define RTC_SLOW_CLK_HZ 90000
+#define SAMPLE_INTERVAL_MIN 15
+#define SAMPLE_INTERVAL_MAX 180
+// Percent, so 150 is a factor of 1.5
+#define SAMPLE_INTERVAL_BACKOFF 150
+// The longest interval the 24-bit ULP timer can count, in seconds
+#define SAMPLE_INTERVAL_LIMIT (RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE_V / RTC_SLOW_CLK_HZ)
+
 /**
  * GPIO
  */
@@ -50,8 +125,37 @@
 #define DO_ADC_CHANNEL ADC_CHANNEL_4
 #define DO_ADC_PIN GPIO_NUM_5
 #define ONEWIRE_BUS GPIO_NUM_8
-static uint8_t AIR_TEMP_ONEWIRE_ADDRESS[] = {0x28, 0x18, 0x1e, 0x78, 0x25, 0x20, 0x01, 0xb0};
-static uint8_t WATER_TEMP_ONEWIRE_ADDRESS[] = {0x28, 0x6e, 0x0d, 0x80, 0x25, 0x20, 0x01, 0xc5};
+// The probes' addresses until a ROM search finds otherwise, see onewire_roms
+#define AIR_TEMP_ONEWIRE_ADDRESS {0x28, 0x18, 0x1e, 0x78, 0x25, 0x20, 0x01, 0xb0}
+#define WATER_TEMP_ONEWIRE_ADDRESS {0x28, 0x6e, 0x0d, 0x80, 0x25, 0x20, 0x01, 0xc5}
+
+/**
+ * Settling
+ *
+ * The analog sensors settle while the DS18B20s convert, and are read once
+ * both have had long enough. A conversion is polled for rather than waited
+ * out, unless a probe is parasite powered, and takes 750ms at 12 bits, halving
+ * with each bit less. 10 bits is 0.25C, plenty for DS18B20_THRESHOLD.
+ */
+#define ANALOG_SETTLE_MS 300
+#define DS18B20_RESOLUTION 10
+#define DS18B20_MAX_CONVERSION_MS 750
+#define DS18B20_POLL_MS 1
+
+/**
+ * These are used as flags to indicate which sensor reading has been updated,
+ * and to index the per-sensor settings and statistics
+ */
+#define PH_SENSOR_ID 0
+#define DO_SENSOR_ID 1
+#define AIR_TEMP_SENSOR_ID 2
+#define WATER_TEMP_SENSOR_ID 3
+#define SENSOR_COUNT 4
+// Analog sensors have the lowest IDs
+#define ANALOG_SENSOR_COUNT 2
+#define ONEWIRE_SENSOR_COUNT 2
+#define ONEWIRE_ROM_SIZE 8
+#define MAX_ONEWIRE_DEVICES 4
 
 typedef enum
 {
@@ -61,10 +165,36 @@ typedef enum
 } run_mode_t;
 
 /**
- * Shared memory values are always 8-bit integers, so to pass larger numbers
- * (ADC has 13-bit resolution) we need to split the number into 2 bytes.
- *
- * See convert_uint16_to_uint8 below and __get_uint16 in ulp.py
+ * Must match CALIBRATION_STATS_FORMAT in support/ulp_builder.py. Arrays are
+ * indexed by sensor ID and stable is a mask of sensor ID bits.
+ */
+typedef struct
+{
+    uint32_t sequence;
+    uint16_t mean[2];
+    uint16_t minimum[2];
+    uint16_t maximum[2];
+    uint16_t count;
+    uint8_t stable;
+} calibration_stats_t;
+
+/**
+ * Must match READING_FORMAT in support/ulp_builder.py
+ */
+typedef struct
+{
+    uint32_t ticks;
+    int16_t pH;
+    int16_t DO;
+    int16_t air_temp;
+    int16_t water_temp;
+    uint8_t modified;
+} reading_t;
+
+/**
+ * support/ulp_builder.py types each export from its declaration, so ulp.py
+ * reads it whole. Sensor readings are raw: ADC counts for pH and DO, and
+ * 1/16ths of a degree C for the DS18B20s, which go negative below freezing.
  */
 #ifdef DEBUG
 EXPORT volatile bool debug = true;
@@ -74,28 +204,80 @@ EXPORT volatile bool debug = false;
 EXPORT volatile bool calibration_ready;
 EXPORT volatile run_mode_t run_mode;
 EXPORT volatile uint8_t modified;
-EXPORT volatile uint8_t pH_0x00;
-EXPORT volatile uint8_t pH_0x01;
-EXPORT volatile uint8_t DO_0x00;
-EXPORT volatile uint8_t DO_0x01;
-EXPORT volatile uint8_t air_temp_0x00;
-EXPORT volatile uint8_t air_temp_0x01;
-EXPORT volatile uint8_t water_temp_0x00;
-EXPORT volatile uint8_t water_temp_0x01;
+EXPORT volatile int16_t pH;
+EXPORT volatile int16_t DO;
+EXPORT volatile int16_t air_temp;
+EXPORT volatile int16_t water_temp;
 
 /**
- * These are used as flags to indicate which sensor reading has been updated
+ * readings_head is the number of readings ever written and is only written by
+ * the ULP, readings_tail the number drained and only written by the main
+ * processor.
  */
-#define PH_SENSOR_ID 0
-#define DO_SENSOR_ID 1
-#define AIR_TEMP_SENSOR_ID 2
-#define WATER_TEMP_SENSOR_ID 3
+EXPORT volatile reading_t readings[READINGS_LENGTH];
+EXPORT volatile uint32_t readings_head;
+EXPORT volatile uint32_t readings_tail;
 
-void convert_uint16_to_uint8(uint32_t input, volatile uint8_t bytes[2])
-{
-    bytes[0] = input & 0xFF;
-    bytes[1] = (input >> 8) & 0xFF;
-}
+/**
+ * Sampling interval bounds, in seconds, and the back-off factor in percent.
+ * Only written by the main processor. sample_interval is the interval until
+ * the next update and only written by the ULP.
+ */
+EXPORT volatile uint16_t sample_interval_min = SAMPLE_INTERVAL_MIN;
+EXPORT volatile uint16_t sample_interval_max = SAMPLE_INTERVAL_MAX;
+EXPORT volatile uint16_t sample_interval_backoff = SAMPLE_INTERVAL_BACKOFF;
+EXPORT volatile uint16_t sample_interval = SAMPLE_INTERVAL_MIN;
+
+/**
+ * Change detection settings, indexed by sensor ID and only written by the main
+ * processor. See Wake-up thresholds and Filtering above.
+ */
+EXPORT volatile uint16_t thresholds[SENSOR_COUNT] = {PH_THRESHOLD, DO_THRESHOLD, DS18B20_THRESHOLD, DS18B20_THRESHOLD};
+EXPORT volatile uint16_t hysteresis[SENSOR_COUNT] = {PH_HYSTERESIS, DO_HYSTERESIS, DS18B20_HYSTERESIS, DS18B20_HYSTERESIS};
+EXPORT volatile uint8_t filters[SENSOR_COUNT] = {FILTER_NONE, FILTER_NONE, FILTER_NONE, FILTER_NONE};
+EXPORT volatile uint8_t oversample[ANALOG_SENSOR_COUNT] = {ANALOG_OVERSAMPLE, ANALOG_OVERSAMPLE};
+EXPORT volatile uint8_t filter_ema_shift = EMA_SHIFT;
+
+/**
+ * Noise statistics, indexed by sensor ID. noise is the moving average of the
+ * change between samples and noise_peak the largest change since the main
+ * processor last zeroed it.
+ */
+EXPORT volatile uint16_t noise[SENSOR_COUNT];
+EXPORT volatile uint16_t noise_peak[SENSOR_COUNT];
+
+/**
+ * OneWire devices
+ *
+ * onewire_found holds the ROMs of the devices found by the last search.
+ * onewire_roms are the air and water probes, which the main processor can
+ * set. A probe that isn't on the bus is replaced by the first found device
+ * not already in use, so swapping a probe doesn't need a firmware rebuild.
+ */
+EXPORT volatile uint8_t onewire_roms[ONEWIRE_SENSOR_COUNT][ONEWIRE_ROM_SIZE] = {AIR_TEMP_ONEWIRE_ADDRESS, WATER_TEMP_ONEWIRE_ADDRESS};
+EXPORT volatile uint8_t onewire_found[MAX_ONEWIRE_DEVICES][ONEWIRE_ROM_SIZE];
+EXPORT volatile uint32_t onewire_found_count;
+EXPORT volatile uint8_t onewire_resolution = DS18B20_RESOLUTION;
+EXPORT volatile uint16_t analog_settle_ms = ANALOG_SETTLE_MS;
+
+/**
+ * calibration_stats is only written by the ULP. Its sequence is odd while
+ * it's being written and goes up by 2 for each sample, see
+ * read_calibration_stats in ulp.py. The main processor sets calibration_watch
+ * to the sensor ID bits whose stable window should wake it.
+ */
+EXPORT volatile calibration_stats_t calibration_stats;
+EXPORT volatile uint16_t calibration_threshold = CALIBRATION_THRESHOLD;
+EXPORT volatile uint8_t calibration_watch = 0;
+
+static bool urgent;
+// Direction of the last reported change of each sensor, 1 up and -1 down
+static int8_t last_direction[SENSOR_COUNT];
+// The previous sample and moving average of each sensor, once valid_samples
+// has its bit set
+static int16_t previous_sample[SENSOR_COUNT];
+static int32_t ema[SENSOR_COUNT];
+static uint8_t valid_samples;
 
 void sleep_us(uint32_t us)
 {
@@ -106,26 +288,171 @@ void sleep_ms(uint32_t ms)
     sleep_us(ms * 1000);
 }
 
+/**
+ * RTC slow clock ticks >> 16, about 0.73s per tick at the default 90kHz
+ */
+uint32_t rtc_ticks()
+{
+    REG_SET_BIT(RTC_CNTL_TIME_UPDATE_REG, RTC_CNTL_TIME_UPDATE);
+    uint32_t low = REG_READ(RTC_CNTL_TIME_LOW0_REG);
+    uint32_t high = REG_READ(RTC_CNTL_TIME_HIGH0_REG);
+    return (high << 16) | (low >> 16);
+}
+
+/**
+ * Low 32 bits of the RTC slow clock, wrapping about every 13 hours
+ */
+uint32_t rtc_cycles()
+{
+    REG_SET_BIT(RTC_CNTL_TIME_UPDATE_REG, RTC_CNTL_TIME_UPDATE);
+    return REG_READ(RTC_CNTL_TIME_LOW0_REG);
+}
+
+/**
+ * Sleeps until `ms` after the RTC slow clock read `since`
+ */
+void sleep_since(uint32_t since, uint32_t ms)
+{
+    uint32_t elapsed_ms = (rtc_cycles() - since) / (RTC_SLOW_CLK_HZ / 1000);
+    if (elapsed_ms < ms)
+    {
+        sleep_ms(ms - elapsed_ms);
+    }
+}
+
 /**
  * Shared memory helpers
  */
-void maybe_update_sensor_reading(int8_t sensor_id,
-                                 uint16_t new_reading,
-                                 uint8_t threshold,
-                                 volatile uint8_t *low_byte,
-                                 volatile uint8_t *high_byte)
-{
-    uint8_t bytes[2];
-    convert_uint16_to_uint8(new_reading, bytes);
-    // Thresholds are below 255, so only need to check low byte
-    if (run_mode == RUN_MODE_CALIBRATION || abs(*low_byte - bytes[0]) > threshold)
-    {
-        *low_byte = bytes[0];
-        *high_byte = bytes[1];
+void maybe_update_sensor_reading(uint8_t sensor_id, int32_t new_reading, volatile int16_t *reading)
+{
+    int32_t delta = new_reading - *reading;
+    int8_t direction = delta < 0 ? -1 : 1;
+    uint32_t distance = abs(delta);
+    uint32_t threshold = thresholds[sensor_id];
+    if (distance > threshold * URGENT_THRESHOLD_MULTIPLIER)
+    {
+        urgent = true;
+    }
+    if (direction != last_direction[sensor_id])
+    {
+        threshold += hysteresis[sensor_id];
+    }
+    if (run_mode == RUN_MODE_CALIBRATION || distance > threshold)
+    {
+        *reading = new_reading;
+        modified |= 1 << sensor_id;
+        if (distance > 0)
+        {
+            last_direction[sensor_id] = direction;
+        }
+    }
+}
+
+/**
+ * Reports a failed read as 0, without waking the main processor for it, and
+ * restarts the sensor's filter
+ */
+void clear_sensor_reading(uint8_t sensor_id, volatile int16_t *reading)
+{
+    valid_samples &= ~(1 << sensor_id);
+    if (*reading)
+    {
+        *reading = 0;
         modified |= 1 << sensor_id;
     }
 }
 
+/**
+ * Updates the sensor's noise statistics with a new sample and returns it
+ * smoothed by its filter
+ */
+int32_t filter_sensor_reading(uint8_t sensor_id, int16_t sample)
+{
+    uint8_t mask = 1 << sensor_id;
+    if (!(valid_samples & mask))
+    {
+        valid_samples |= mask;
+        previous_sample[sensor_id] = sample;
+        ema[sensor_id] = sample * (1 << EMA_FRACTION_BITS);
+        return sample;
+    }
+
+    uint32_t change = abs((int32_t)sample - previous_sample[sensor_id]);
+    previous_sample[sensor_id] = sample;
+    if (change > noise_peak[sensor_id])
+    {
+        noise_peak[sensor_id] = change;
+    }
+    int32_t scaled_change = change << NOISE_FRACTION_BITS;
+    int32_t average = noise[sensor_id] + ((scaled_change - noise[sensor_id]) >> NOISE_SHIFT);
+    noise[sensor_id] = average > UINT16_MAX ? UINT16_MAX : average;
+
+    // Calibration wants the unsmoothed readings, it judges stability itself
+    if (filters[sensor_id] != FILTER_EMA || run_mode == RUN_MODE_CALIBRATION)
+    {
+        ema[sensor_id] = sample * (1 << EMA_FRACTION_BITS);
+        return sample;
+    }
+    ema[sensor_id] += (sample * (1 << EMA_FRACTION_BITS) - ema[sensor_id]) >> filter_ema_shift;
+    return (ema[sensor_id] + (1 << (EMA_FRACTION_BITS - 1))) >> EMA_FRACTION_BITS;
+}
+
+void update_sensor_reading(uint8_t sensor_id, int16_t sample, volatile int16_t *reading)
+{
+    maybe_update_sensor_reading(sensor_id, filter_sensor_reading(sensor_id, sample), reading);
+}
+
+void append_reading()
+{
+    volatile reading_t *reading = &readings[readings_head % READINGS_LENGTH];
+    reading->ticks = rtc_ticks();
+    reading->pH = pH;
+    reading->DO = DO;
+    reading->air_temp = air_temp;
+    reading->water_temp = water_temp;
+    reading->modified = modified;
+    readings_head++;
+}
+
+bool readings_above_high_water_mark()
+{
+    return readings_head - readings_tail >= READINGS_HIGH_WATER_MARK;
+}
+
+void schedule_next_update()
+{
+    uint32_t interval = sample_interval;
+    uint32_t backoff = sample_interval_backoff > 100 ? sample_interval_backoff : SAMPLE_INTERVAL_BACKOFF;
+    uint32_t max = sample_interval_max < SAMPLE_INTERVAL_LIMIT ? sample_interval_max : SAMPLE_INTERVAL_LIMIT;
+    uint32_t min = sample_interval_min > 0 ? sample_interval_min : 1;
+
+    if (urgent)
+    {
+        interval = min;
+    }
+    else if (modified > 0)
+    {
+        interval = interval * 100 / backoff;
+    }
+    else
+    {
+        // Round up so short intervals still grow
+        interval = (interval * backoff + 99) / 100;
+    }
+
+    if (interval > max)
+    {
+        interval = max;
+    }
+    if (interval < min)
+    {
+        interval = min;
+    }
+
+    sample_interval = interval;
+    REG_SET_FIELD(RTC_CNTL_ULP_CP_TIMER_1_REG, RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE, interval * RTC_SLOW_CLK_HZ);
+}
+
 /**
  * Analog sensors
  */
@@ -144,19 +471,45 @@ void disable_analog_sensors()
 {
     ulp_riscv_gpio_output_level(ANALOG_SENSORS_ENABLE_PIN, 0);
 }
-uint16_t read_analog_sensor(adc_channel_t adc_channel)
+uint16_t read_analog_sensor(uint8_t sensor_id, adc_channel_t adc_channel)
 {
-    // ADC has 13-bit resolution, 2^16 / 2^13 = 2^3 = 8 samples
-    uint16_t sum = 0;
-    for (uint8_t i = 0; i < 8; i++)
+    uint8_t count = oversample[sensor_id];
+    if (count < 1)
+    {
+        count = 1;
+    }
+    else if (count > MAX_OVERSAMPLE)
+    {
+        count = MAX_OVERSAMPLE;
+    }
+
+    if (filters[sensor_id] == FILTER_MEDIAN)
+    {
+        // Insertion sort, the samples are few and mostly close together
+        uint16_t samples[MAX_OVERSAMPLE];
+        for (uint8_t i = 0; i < count; i++)
+        {
+            uint16_t sample = ulp_riscv_adc_read_channel(ADC_UNIT_1, adc_channel);
+            uint8_t j = i;
+            for (; j > 0 && samples[j - 1] > sample; j--)
+            {
+                samples[j] = samples[j - 1];
+            }
+            samples[j] = sample;
+        }
+        return samples[count / 2];
+    }
+
+    uint32_t sum = 0;
+    for (uint8_t i = 0; i < count; i++)
     {
         sum += ulp_riscv_adc_read_channel(ADC_UNIT_1, adc_channel);
     }
-    return sum / 8;
+    return sum / count;
 }
-void update_analog_sensor_reading(uint8_t sensor_id, adc_channel_t adc_channel, uint8_t threshold, volatile uint8_t *msb, volatile uint8_t *lsb)
+void update_analog_sensor_reading(uint8_t sensor_id, adc_channel_t adc_channel, volatile int16_t *reading)
 {
-    maybe_update_sensor_reading(sensor_id, read_analog_sensor(adc_channel), threshold, msb, lsb);
+    update_sensor_reading(sensor_id, read_analog_sensor(sensor_id, adc_channel), reading);
 }
 
 /**
@@ -171,6 +524,21 @@ void update_analog_sensor_reading(uint8_t sensor_id, adc_channel_t adc_channel,
 #define MATCH_ROM 0x55
 #define CONVERT_T 0x44
 #define READ_SCRATCHPAD 0xBE
+#define WRITE_SCRATCHPAD 0x4E
+#define SEARCH_ROM 0xF0
+#define READ_POWER_SUPPLY 0xB4
+#define DS18B20_FAMILY 0x28
+// Factory alarm thresholds, alarms aren't used
+#define DS18B20_TH 0x4B
+#define DS18B20_TL 0x46
+#define DS18B20_CONFIG(resolution) ((((resolution) - 9) << 5) | 0x1F)
+
+// Resolution the DS18B20s were last configured with, 0 if they need it
+static uint8_t configured_resolution;
+// Set when a probe stops responding, to search the bus again
+static bool onewire_rescan;
+// Set when a DS18B20 on the bus draws its power from the data line
+static bool onewire_parasite_power;
 
 static void onewire_write_bit(bool bit)
 {
@@ -220,7 +588,7 @@ bool onewire_reset(void)
     sleep_us(420);
     return presence_pulse;
 }
-bool onewire_match_rom(uint8_t *onewire_address)
+bool onewire_match_rom(volatile uint8_t *onewire_address)
 {
     if (!onewire_reset())
     {
@@ -243,7 +611,7 @@ bool onewire_convert_t()
     onewire_write_byte(CONVERT_T);
     return true;
 }
-uint8_t crc8(const uint8_t *data, uint8_t len)
+uint8_t crc8(const volatile uint8_t *data, uint8_t len)
 {
     uint8_t crc = 0;
     for (uint8_t i = 0; i < len; i++)
@@ -272,7 +640,190 @@ void init_onewire()
     ulp_riscv_gpio_pulldown_disable(ONEWIRE_BUS);
 }
 
-void update_onewire_sensor_reading(uint8_t sensor_id, uint8_t *onewire_address, volatile uint8_t *low_byte, volatile uint8_t *high_byte)
+/**
+ * Finds the next device in ROM order, following AN187 from Maxim. `rom` and
+ * `last_discrepancy` carry over between calls, and start zeroed. The search
+ * is over when last_discrepancy is zero again.
+ */
+bool onewire_search(uint8_t rom[ONEWIRE_ROM_SIZE], uint8_t *last_discrepancy)
+{
+    if (!onewire_reset())
+    {
+        return false;
+    }
+    onewire_write_byte(SEARCH_ROM);
+
+    uint8_t last_zero = 0;
+    for (uint8_t bit_number = 1; bit_number <= ONEWIRE_ROM_SIZE * 8; bit_number++)
+    {
+        uint8_t byte = (bit_number - 1) / 8;
+        uint8_t mask = 1 << ((bit_number - 1) % 8);
+        bool bit = onewire_read_bit();
+        bool complement = onewire_read_bit();
+        bool direction;
+        if (bit && complement)
+        {
+            // Nothing responded
+            return false;
+        }
+        else if (bit != complement)
+        {
+            direction = bit;
+        }
+        else
+        {
+            // Devices differ here, take the 1 branch once the 0 branch is done
+            if (bit_number < *last_discrepancy)
+            {
+                direction = rom[byte] & mask;
+            }
+            else
+            {
+                direction = bit_number == *last_discrepancy;
+            }
+            if (!direction)
+            {
+                last_zero = bit_number;
+            }
+        }
+        rom[byte] = direction ? rom[byte] | mask : rom[byte] & ~mask;
+        onewire_write_bit(direction);
+    }
+
+    *last_discrepancy = last_zero;
+    return crc8(rom, ONEWIRE_ROM_SIZE - 1) == rom[ONEWIRE_ROM_SIZE - 1];
+}
+
+bool onewire_rom_equal(const volatile uint8_t *a, const volatile uint8_t *b)
+{
+    for (int i = 0; i < ONEWIRE_ROM_SIZE; i++)
+    {
+        if (a[i] != b[i])
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+/**
+ * Parasite powered DS18B20s answer READ_POWER_SUPPLY by pulling the read slot
+ * low. Checked at init and with every search, as a probe can be swapped.
+ */
+void detect_onewire_power()
+{
+    onewire_parasite_power = false;
+    if (!onewire_reset())
+    {
+        return;
+    }
+    onewire_write_byte(SKIP_ROM);
+    onewire_write_byte(READ_POWER_SUPPLY);
+    onewire_parasite_power = !onewire_read_bit();
+}
+
+void search_onewire_devices()
+{
+    uint8_t rom[ONEWIRE_ROM_SIZE] = {0};
+    uint8_t last_discrepancy = 0;
+    uint32_t count = 0;
+    do
+    {
+        if (!onewire_search(rom, &last_discrepancy))
+        {
+            break;
+        }
+        for (int i = 0; i < ONEWIRE_ROM_SIZE; i++)
+        {
+            onewire_found[count][i] = rom[i];
+        }
+        count++;
+    } while (last_discrepancy && count < MAX_ONEWIRE_DEVICES);
+    onewire_found_count = count;
+    onewire_rescan = false;
+    detect_onewire_power();
+
+    // Probes that are missing take over unclaimed DS18B20s
+    bool claimed[MAX_ONEWIRE_DEVICES] = {false};
+    bool present[ONEWIRE_SENSOR_COUNT] = {false};
+    for (int sensor = 0; sensor < ONEWIRE_SENSOR_COUNT; sensor++)
+    {
+        for (uint32_t device = 0; device < count; device++)
+        {
+            if (onewire_rom_equal(onewire_roms[sensor], onewire_found[device]))
+            {
+                claimed[device] = present[sensor] = true;
+            }
+        }
+    }
+    for (int sensor = 0; sensor < ONEWIRE_SENSOR_COUNT; sensor++)
+    {
+        for (uint32_t device = 0; device < count && !present[sensor]; device++)
+        {
+            if (!claimed[device] && onewire_found[device][0] == DS18B20_FAMILY)
+            {
+                for (int i = 0; i < ONEWIRE_ROM_SIZE; i++)
+                {
+                    onewire_roms[sensor][i] = onewire_found[device][i];
+                }
+                claimed[device] = present[sensor] = true;
+            }
+        }
+    }
+}
+
+uint8_t ds18b20_resolution()
+{
+    uint8_t resolution = onewire_resolution;
+    return resolution < 9 || resolution > 12 ? DS18B20_RESOLUTION : resolution;
+}
+
+/**
+ * Sets every DS18B20's resolution in its scratchpad. It isn't copied to
+ * EEPROM, a probe that loses power is noticed by its config and set again.
+ */
+void configure_ds18b20s()
+{
+    uint8_t resolution = ds18b20_resolution();
+    if (!onewire_reset())
+    {
+        return;
+    }
+    onewire_write_byte(SKIP_ROM);
+    onewire_write_byte(WRITE_SCRATCHPAD);
+    onewire_write_byte(DS18B20_TH);
+    onewire_write_byte(DS18B20_TL);
+    onewire_write_byte(DS18B20_CONFIG(resolution));
+    configured_resolution = resolution;
+}
+
+/**
+ * After CONVERT_T, externally powered DS18B20s hold read slots low until
+ * every conversion is done. A parasite powered one can't signal, and needs
+ * the bus driven high rather than pulled up for the whole conversion, so it
+ * gets the longest the configured resolution can take.
+ */
+bool onewire_wait_for_conversion()
+{
+    if (onewire_parasite_power)
+    {
+        ulp_riscv_gpio_set_output_mode(ONEWIRE_BUS, RTCIO_MODE_OUTPUT);
+        sleep_us(DS18B20_MAX_CONVERSION_MS * 1000 >> (12 - ds18b20_resolution()));
+        ulp_riscv_gpio_set_output_mode(ONEWIRE_BUS, RTCIO_MODE_OUTPUT_OD);
+        return true;
+    }
+    for (uint32_t waited = 0; waited <= DS18B20_MAX_CONVERSION_MS; waited += DS18B20_POLL_MS)
+    {
+        if (onewire_read_bit())
+        {
+            return true;
+        }
+        sleep_ms(DS18B20_POLL_MS);
+    }
+    return false;
+}
+
+void update_onewire_sensor_reading(uint8_t sensor_id, volatile uint8_t *onewire_address, volatile int16_t *reading)
 {
     if (!onewire_match_rom(onewire_address))
     {
@@ -287,11 +838,23 @@ void update_onewire_sensor_reading(uint8_t sensor_id, uint8_t *onewire_address,
     uint8_t crc = crc8(scratchpad, 8);
     if (crc != scratchpad[8])
     {
-        maybe_update_sensor_reading(-1, 0, DS18B20_THRESHOLD, low_byte, high_byte);
+        clear_sensor_reading(sensor_id, reading);
+        onewire_rescan = true;
         return;
     }
-    uint16_t temp = (scratchpad[1] << 8) | scratchpad[0];
-    maybe_update_sensor_reading(sensor_id, temp, DS18B20_THRESHOLD, low_byte, high_byte);
+    if (scratchpad[4] != DS18B20_CONFIG(ds18b20_resolution()))
+    {
+        configured_resolution = 0;
+        // Without polling there's no knowing its conversion had time to finish
+        if (onewire_parasite_power)
+        {
+            return;
+        }
+    }
+    // Bits below the resolution the reading was taken at are undefined
+    uint8_t resolution = ((scratchpad[4] >> 5) & 0x3) + 9;
+    int16_t temp = (int16_t)((scratchpad[1] << 8) | scratchpad[0]) & ~((1 << (12 - resolution)) - 1);
+    update_sensor_reading(sensor_id, temp, reading);
 }
 
 /**
@@ -301,34 +864,91 @@ void update_onewire_sensor_reading(uint8_t sensor_id, uint8_t *onewire_address,
 void update()
 {
     enable_analog_sensors();
+    uint32_t analog_enabled_at = rtc_cycles();
 
-    bool onewire_convert_t_success = onewire_convert_t();
-
-    // Wait for ds18b20s t conversion to complete and analog sensors to stabilize
-    sleep_ms(750);
+    if (configured_resolution != ds18b20_resolution())
+    {
+        configure_ds18b20s();
+    }
+    bool onewire_convert_t_success = onewire_convert_t() && onewire_wait_for_conversion();
 
     modified = 0;
+    urgent = false;
+
+    // Read the temperatures while the analog sensors finish settling
+    if (onewire_convert_t_success)
+    {
+        update_onewire_sensor_reading(AIR_TEMP_SENSOR_ID, onewire_roms[0], &air_temp);
+        update_onewire_sensor_reading(WATER_TEMP_SENSOR_ID, onewire_roms[1], &water_temp);
+    }
 
-    update_analog_sensor_reading(PH_SENSOR_ID, PH_ADC_CHANNEL, PH_THRESHOLD, &pH_0x00, &pH_0x01);
-    update_analog_sensor_reading(DO_SENSOR_ID, DO_ADC_CHANNEL, DO_THRESHOLD, &DO_0x00, &DO_0x01);
+    sleep_since(analog_enabled_at, analog_settle_ms);
+    update_analog_sensor_reading(PH_SENSOR_ID, PH_ADC_CHANNEL, &pH);
+    update_analog_sensor_reading(DO_SENSOR_ID, DO_ADC_CHANNEL, &DO);
     disable_analog_sensors();
 
-    if (onewire_convert_t_success)
+    if (onewire_rescan)
     {
-        update_onewire_sensor_reading(AIR_TEMP_SENSOR_ID, AIR_TEMP_ONEWIRE_ADDRESS, &air_temp_0x00, &air_temp_0x01);
-        update_onewire_sensor_reading(WATER_TEMP_SENSOR_ID, WATER_TEMP_ONEWIRE_ADDRESS, &water_temp_0x00, &water_temp_0x01);
+        search_onewire_devices();
     }
 }
 
+void publish_calibration_stats(uint16_t window[ANALOG_SENSOR_COUNT][CALIBRATION_WINDOW], uint32_t samples)
+{
+    uint16_t count = samples < CALIBRATION_WINDOW ? samples : CALIBRATION_WINDOW;
+    calibration_stats.sequence++;
+    uint8_t stable = 0;
+    for (int sensor_id = 0; sensor_id < ANALOG_SENSOR_COUNT; sensor_id++)
+    {
+        uint32_t sum = 0;
+        uint16_t minimum = UINT16_MAX;
+        uint16_t maximum = 0;
+        for (int i = 0; i < count; i++)
+        {
+            uint16_t value = window[sensor_id][i];
+            sum += value;
+            minimum = value < minimum ? value : minimum;
+            maximum = value > maximum ? value : maximum;
+        }
+        calibration_stats.mean[sensor_id] = (sum + count / 2) / count;
+        calibration_stats.minimum[sensor_id] = minimum;
+        calibration_stats.maximum[sensor_id] = maximum;
+        if (count == CALIBRATION_WINDOW && maximum - minimum < calibration_threshold)
+        {
+            stable |= 1 << sensor_id;
+        }
+    }
+    calibration_stats.count = count;
+    calibration_stats.stable = stable;
+    calibration_stats.sequence++;
+}
+
 void start_calibration()
 {
     enable_analog_sensors();
-    sleep_ms(750);
+    sleep_ms(analog_settle_ms);
     calibration_ready = true;
+
+    uint16_t window[ANALOG_SENSOR_COUNT][CALIBRATION_WINDOW];
+    uint32_t samples = 0;
     while (run_mode == RUN_MODE_CALIBRATION)
     {
-        update_analog_sensor_reading(PH_SENSOR_ID, PH_ADC_CHANNEL, PH_THRESHOLD, &pH_0x00, &pH_0x01);
-        update_analog_sensor_reading(DO_SENSOR_ID, DO_ADC_CHANNEL, DO_THRESHOLD, &DO_0x00, &DO_0x01);
+        update_analog_sensor_reading(PH_SENSOR_ID, PH_ADC_CHANNEL, &pH);
+        update_analog_sensor_reading(DO_SENSOR_ID, DO_ADC_CHANNEL, &DO);
+
+        uint8_t slot = samples % CALIBRATION_WINDOW;
+        window[PH_SENSOR_ID][slot] = pH;
+        window[DO_SENSOR_ID][slot] = DO;
+        samples++;
+        publish_calibration_stats(window, samples);
+
+        // Keeps waking the main processor while it's watching a stable window,
+        // it decides whether the window is recent enough
+        if (calibration_stats.stable & calibration_watch)
+        {
+            ulp_riscv_wakeup_main_processor();
+        }
+        sleep_ms(CALIBRATION_SAMPLE_MS);
     }
     disable_analog_sensors();
     calibration_ready = false;
@@ -336,11 +956,14 @@ void start_calibration()
 
 int main(void)
 {
-    if (!run_mode)
+    // The ULP's memory survives between runs, so this only happens once
+    static bool initialized;
+    if (!initialized)
     {
         init_analog_sensors();
         init_onewire();
-        run_mode = RUN_MODE_NORMAL;
+        search_onewire_devices();
+        initialized = true;
     }
 
     switch (run_mode)
@@ -367,17 +990,22 @@ int main(void)
          * while avoiding conflicts with the main processor
          */
         run_mode = RUN_MODE_PAUSED;
+        append_reading();
         ulp_riscv_wakeup_main_processor();
 #else
         /*
          * Using ulp_set_wakeup_period causes all sorts of madness with the compiler configuration,
-         * so set the timer register directly. This is less precise and readable, but ends up being
-         * about 3 minutes which is perfect for the EPD refresh rate.
+         * so set the timer register directly. This is less precise and readable, as the slow clock
+         * is only roughly 90kHz, but close enough for sampling.
          */
-        REG_SET_FIELD(RTC_CNTL_ULP_CP_TIMER_1_REG, RTC_CNTL_ULP_CP_TIMER_SLP_CYCLE, UINT32_MAX);
+        schedule_next_update();
         if (modified > 0)
         {
-            ulp_riscv_wakeup_main_processor();
+            append_reading();
+            if (urgent || readings_above_high_water_mark())
+            {
+                ulp_riscv_wakeup_main_processor();
+            }
         }
 #endif
     }